@@ -5,6 +5,8 @@ from dataclasses import dataclass
 from dateutil.relativedelta import relativedelta
 from typing import List, Dict, Any
 from FrequencyClass import Frequency
+from ScheduleClasses import generate_schedule, generate_schedules
+from CashFlowClasses import CashFlowMatrix, discount_factors, discount_factor_derivatives
 
 
 
@@ -57,14 +59,8 @@ class CorpBond:
 
         :type modelling_date: date
         """
-        delta = relativedelta(months=(12 // self.frequency))
-        this_date = self.issue_date - delta
-        while this_date < self.maturity_date:  # Coupon payment dates
-            this_date = this_date + delta
-            if this_date < modelling_date: #Not interested in past payments
-                continue
-            if this_date <= self.maturity_date:
-                yield this_date
+        # Coupon payment dates on or after the modelling date, past payments are skipped arithmetically
+        yield from generate_schedule(self.issue_date, self.maturity_date, self.frequency, modelling_date).tolist()
 
     def term_to_maturity(self, modelling_date: date)->int:
         """
@@ -141,6 +137,8 @@ class CorpBondPortfolio():
 
     def create_maturity_cashflow(self, modelling_date: date) -> dict:
         """
+        Create the dictionary of dates at which the notional amounts are paid back and the total amounts for
+        all corporate bonds in the portfolio, for dates on or after the modelling date
 
         :rtype: dict
         """
@@ -150,12 +148,358 @@ class CorpBondPortfolio():
 
         for asset_id in self.corporate_bonds:
             corp_bond = self.corporate_bonds[asset_id]
+            maturity_date = corp_bond.maturity_date
+            if maturity_date < modelling_date: #Not interested in past payments
+                continue
             if maturity_date in maturities:
                 maturities[maturity_date] += corp_bond.notional_amount
             else:
-                maturities.update({corp_bond.maturity_date:corp_bond.notional_amount})
+                maturities.update({maturity_date:corp_bond.notional_amount})
         return maturities
 
+@dataclass
+class ZSpreadResult:
+    """
+    Z-spreads solved by CorpBondArrayPortfolio.solve_z_spread, one element per bond.
+    """
+    asset_id: np.ndarray
+    z_spread: np.ndarray
+    price_error: np.ndarray  # Model price minus market price at the returned z-spread
+    iterations: np.ndarray
+    converged: np.ndarray
+
+    @property
+    def non_converged(self) -> np.ndarray:
+        # Asset ids of the bonds without a z-spread within the bracket and precision
+        return self.asset_id[~self.converged]
+
+
+class CorpBondArrayPortfolio():
+    def __init__(self, asset_id, nace, issue_date, maturity_date, coupon_rate, notional_amount, frequency,
+                 recovery_rate, default_probability, market_price):
+        """
+        Initialize a portfolio of corporate bonds stored column by column. Each attribute of the bonds is held in a
+        numpy array with one element per bond, so that cash flows of the whole portfolio can be generated with array
+        operations instead of one bond at a time.
+
+        Parameters
+        ----------
+        :type asset_id: array-like of int
+        :type nace: array-like of str
+            Stored as integer codes (nace_code) into the array of distinct NACE codes (nace_categories).
+        :type issue_date: array-like of datetime.date or numpy.datetime64
+        :type maturity_date: array-like of datetime.date or numpy.datetime64
+        :type coupon_rate: array-like of float
+        :type notional_amount: array-like of float
+        :type frequency: array-like of Frequency
+        :type recovery_rate: array-like of float
+        :type default_probability: array-like of float
+        :type market_price: array-like of float
+        """
+        self.asset_id = np.asarray(asset_id, dtype=np.int64)
+        [self.nace_categories, nace_code] = np.unique(np.asarray(nace, dtype=str), return_inverse=True)
+        self.nace_code = nace_code.astype(np.int32)
+        self.issue_date = np.asarray(issue_date, dtype="datetime64[D]")
+        self.maturity_date = np.asarray(maturity_date, dtype="datetime64[D]")
+        self.coupon_rate = np.asarray(coupon_rate, dtype=float)
+        self.notional_amount = np.asarray(notional_amount, dtype=float)
+        self.frequency = np.asarray(frequency, dtype=np.int8)
+        self.recovery_rate = np.asarray(recovery_rate, dtype=float)
+        self.default_probability = np.asarray(default_probability, dtype=float)
+        self.market_price = np.asarray(market_price, dtype=float)
+        self._cash_flow_matrix = None
+        self.validate()
+
+    @classmethod
+    def from_bonds(cls, corporate_bonds):
+        """
+        Build the portfolio in bulk from CorpBond instances, for example the generator returned by
+        ImportData.get_corporate_bonds or the values of CorpBondPortfolio.corporate_bonds.
+
+        :type corporate_bonds: iterable of CorpBond
+        """
+        corporate_bonds = list(corporate_bonds)
+        return cls(asset_id=[corp_bond.asset_id for corp_bond in corporate_bonds],
+                   nace=[corp_bond.nace for corp_bond in corporate_bonds],
+                   issue_date=[corp_bond.issue_date for corp_bond in corporate_bonds],
+                   maturity_date=[corp_bond.maturity_date for corp_bond in corporate_bonds],
+                   coupon_rate=[corp_bond.coupon_rate for corp_bond in corporate_bonds],
+                   notional_amount=[corp_bond.notional_amount for corp_bond in corporate_bonds],
+                   frequency=[corp_bond.frequency for corp_bond in corporate_bonds],
+                   recovery_rate=[corp_bond.recovery_rate for corp_bond in corporate_bonds],
+                   default_probability=[corp_bond.default_probability for corp_bond in corporate_bonds],
+                   market_price=[corp_bond.market_price for corp_bond in corporate_bonds])
+
+    def __len__(self) -> int:
+        return self.asset_id.size
+
+    @property
+    def nace(self) -> np.ndarray:
+        return self.nace_categories[self.nace_code]
+
+    @property
+    def dividend_amount(self) -> np.ndarray:
+        return self.coupon_rate * self.notional_amount
+
+    def IsEmpty(self) -> bool:
+        return len(self) == 0
+
+    def validate(self) -> None:
+        """
+        Check all bonds against the same rules as CorpBond. Every rule is checked for the whole portfolio at once and
+        a single ValueError lists every rule that is broken together with the asset ids of the offending bonds.
+        """
+        frequencies = [Frequency.MONTHLY, Frequency.QUARTERLY, Frequency.TRIANNUAL, Frequency.BIANNUAL,
+                       Frequency.ANNUAL]
+        [_, position, count] = np.unique(self.asset_id, return_inverse=True, return_counts=True)
+        checks = [(self.asset_id <= 0, "Asset ID must be greater than 0"),
+                  (count[position] > 1, "Asset ID must be unique"),
+                  (self.coupon_rate < 0, "Coupon rate cannot be negative"),
+                  (self.coupon_rate > 1, "Coupon rate cannot be greater than 1"),
+                  (self.recovery_rate < 0, "Recovery rate cannot be negative"),
+                  (self.recovery_rate > 1, "Recovery rate cannot be greater than 1"),
+                  (self.default_probability < 0, "Default probability cannot be negative"),
+                  (self.default_probability > 1, "Default probability cannot be greater than 1"),
+                  (self.market_price < 0, "Market price cannot be negative"),
+                  (~np.isin(self.frequency, frequencies),
+                   "Frequency must be either Monthly, Quarterly,Triannual, SemiAnnual or Annual"),
+                  (self.notional_amount <= 0, "Notional amount must be greater than 0"),
+                  (self.maturity_date <= self.issue_date, "Maturity date cannot be before issue date")]
+
+        errors = []
+        for failed, message in checks:
+            if failed.any():
+                errors.append(message + " (asset ids: " + str(self.asset_id[failed].tolist()) + ")")
+        if errors:
+            raise ValueError("\n".join(errors))
+
+    def generate_coupon_dates(self, modelling_date: date, bonds=slice(None)) -> list:
+        """
+        Generate the coupon payment dates of all bonds in the portfolio that are on or after the modelling date and
+        not after the maturity of the bond. Coupons are paid every 12/frequency months counting from the issue date.
+
+        :type modelling_date: datetime.date
+        :type bonds: slice or array of int
+            Optional selection of the bonds for which the coupons are generated, by default all bonds.
+
+        Returns
+        -------
+        :rtype list with two elements:
+            bond_index: numpy array with the position (in the portfolio) of the bond paying each coupon.
+            coupon_dates: numpy datetime64 array with the date of each coupon.
+        """
+        bond_index = np.arange(len(self))[bonds]
+        [owner, coupon_dates] = generate_schedules(self.issue_date[bonds], self.maturity_date[bonds],
+                                                   self.frequency[bonds], modelling_date)
+        return [bond_index[owner], coupon_dates]
+
+    def create_aggregate_coupon_dates(self, modelling_date: date, chunk_size: int = 100000) -> dict:
+        """
+        Create the dictionary of dates at which the coupons are paid out and the total amounts for all corporate
+        bonds in the portfolio, for dates on or after the modelling date. Same output as
+        CorpBondPortfolio.create_aggregate_coupon_dates.
+
+        :type modelling_date: datetime.date
+        :type chunk_size: int
+            Number of bonds for which the coupons are generated at once, limits the memory used for large portfolios.
+        :rtype: dict
+        """
+        first_day = np.datetime64(modelling_date, "D")
+        n_days = int((self.maturity_date.max(initial=first_day) - first_day).astype(np.int64)) + 1
+        amounts = np.zeros(n_days)
+        n_coupons = np.zeros(n_days, dtype=np.int64)
+        dividend_amount = self.dividend_amount
+        for start in range(0, len(self), chunk_size):
+            [bond_index, coupon_dates] = self.generate_coupon_dates(modelling_date, slice(start, start + chunk_size))
+            day = (coupon_dates - first_day).astype(np.int64)
+            amounts += np.bincount(day, weights=dividend_amount[bond_index], minlength=n_days)
+            n_coupons += np.bincount(day, minlength=n_days)
+        paid = np.flatnonzero(n_coupons)
+        return dict(zip((first_day + paid).tolist(), amounts[paid].tolist()))
+
+    def create_maturity_cashflow(self, modelling_date: date) -> dict:
+        """
+        Create the dictionary of dates at which the notional amounts are paid back and the total amounts for all
+        corporate bonds in the portfolio, for dates on or after the modelling date. Same output as
+        CorpBondPortfolio.create_maturity_cashflow.
+
+        :type modelling_date: datetime.date
+        :rtype: dict
+        """
+        alive = self.maturity_date >= np.datetime64(modelling_date, "D")
+        [unique_dates, position] = np.unique(self.maturity_date[alive], return_inverse=True)
+        amounts = np.bincount(position, weights=self.notional_amount[alive], minlength=unique_dates.size)
+        return dict(zip(unique_dates.tolist(), amounts.tolist()))
+
+    def create_cash_flow_matrix(self, modelling_date: date) -> CashFlowMatrix:
+        """
+        Create the sparse bond x date matrix with all coupons and notional repayments on or after the modelling
+        date. The matrix is kept for the last modelling date, so repeated valuations reuse it.
+
+        :type modelling_date: datetime.date
+        :rtype: CashFlowMatrix
+        """
+        if self._cash_flow_matrix is not None and self._cash_flow_matrix.modelling_date == modelling_date:
+            return self._cash_flow_matrix
+
+        [bond_index, coupon_dates] = self.generate_coupon_dates(modelling_date)
+        alive = np.flatnonzero(self.maturity_date >= np.datetime64(modelling_date, "D"))
+        rows = np.concatenate([bond_index, alive])
+        cash_flow_dates = np.concatenate([coupon_dates, self.maturity_date[alive]])
+        amounts = np.concatenate([self.dividend_amount[bond_index], self.notional_amount[alive]])
+
+        self._cash_flow_matrix = CashFlowMatrix.from_cash_flows(rows, cash_flow_dates, amounts, modelling_date,
+                                                                len(self))
+        return self._cash_flow_matrix
+
+    def sector_spread(self, spread_by_nace: dict) -> np.ndarray:
+        """
+        Look up the spread of each bond by its NACE code, for example from ImportData.get_sector_spread. The lookup is
+        done once per distinct NACE code.
+
+        :type spread_by_nace: dict[str, float]
+        :rtype: numpy.ndarray
+        """
+        category_spread = np.array([spread_by_nace[nace] for nace in self.nace_categories.tolist()], dtype=float)
+        return category_spread[self.nace_code]
+
+    def price(self, modelling_date: date, zero_rates, compounding: int = 1, spread: np.ndarray = None) -> np.ndarray:
+        """
+        Price all bonds in the portfolio. The term structure is evaluated once on the distinct cash-flow dates of the
+        whole portfolio and the prices follow from a single pass over the sparse cash-flow matrix.
+
+        Parameters
+        ----------
+        :type modelling_date: datetime.date
+        :type zero_rates: callable
+            Function returning the zero rates for a numpy array of year fractions, for example
+            lambda t: curves.SWExtrapolate(t, m_obs, b, curves.ufr, alpha)
+        :type compounding: int
+            Set to -1 for continuous compounding, 0 for simple compounding and n for n times per year compounding.
+            Defaults to annual compounding, the convention of the Smith-Wilson zero rates.
+        :type spread: numpy.ndarray
+            Optional spread of each bond added to the zero rates, for example the sector spread plus the z-spread.
+
+        Returns
+        -------
+        :rtype numpy.ndarray
+            Price of each bond.
+        """
+        cash_flow_matrix = self.create_cash_flow_matrix(modelling_date)
+        rates = cash_flow_matrix.zero_rates_on_grid(zero_rates)
+        return cash_flow_matrix.present_value(rates, compounding, spread)
+
+
+    def solve_z_spread(self, modelling_date: date, zero_rates, compounding: int = 1, spread: np.ndarray = None,
+                       market_price: np.ndarray = None, x_start: float = -0.2, x_end: float = 0.2,
+                       precision: float = 1e-10, max_iter: int = 100) -> ZSpreadResult:
+        """
+        Solve the z-spread of every bond so that its model price equals its market price. All bonds are solved
+        together with a safeguarded Newton iteration: the derivative of the price comes analytically from the same
+        cash-flow matrix, every bond keeps its own bracket [x_start, x_end] that shrinks with each step and a Newton
+        step falling outside the bracket is replaced by a bisection step. Bonds stop iterating as soon as they have
+        converged, only the cash flows of the remaining bonds are discounted again.
+
+        Parameters
+        ----------
+        :type modelling_date: datetime.date
+        :type zero_rates: callable
+            Function returning the zero rates for a numpy array of year fractions, see price.
+        :type compounding: int
+            Set to -1 for continuous compounding, 0 for simple compounding and n for n times per year compounding.
+            Defaults to annual compounding, the convention of the Smith-Wilson zero rates.
+        :type spread: numpy.ndarray
+            Optional spread of each bond on top of which the z-spread is solved, for example the sector spread.
+        :type market_price: numpy.ndarray
+            Target price of each bond, defaults to the market price of the portfolio.
+        :type x_start: float
+            Lowest allowed z-spread.
+        :type x_end: float
+            Highest allowed z-spread.
+        :type precision: float
+            A bond has converged when its price error or half the width of its bracket is below the precision.
+        :type max_iter: int
+            Maximum number of Newton iterations.
+
+        Returns
+        -------
+        :rtype ZSpreadResult
+            Bonds whose market price is outside the prices at x_start and x_end get the closest bound and bonds
+            without cash flows get nan; neither is marked as converged.
+        """
+        n_bonds = len(self)
+        cash_flow_matrix = self.create_cash_flow_matrix(modelling_date)
+        rows = cash_flow_matrix.rows
+        target = self.market_price if market_price is None else np.asarray(market_price, dtype=float)
+        base_spread = np.zeros(n_bonds) if spread is None else np.asarray(spread, dtype=float)
+        grid_rates = cash_flow_matrix.zero_rates_on_grid(zero_rates)
+        # Rate, year fraction and amount of the cash flows still being discounted, dropped once their bond converges
+        flows = [rows, grid_rates[cash_flow_matrix.columns] + base_spread[rows],
+                 cash_flow_matrix.year_fractions[cash_flow_matrix.columns], cash_flow_matrix.amounts]
+
+        def price_error(z_spread, with_slope=True):
+            # Price error and its derivative with respect to the z-spread of the bonds that have cash flows in flows
+            [flow_rows, flow_rates, flow_time, amounts] = flows
+            rates = flow_rates + z_spread[flow_rows]
+            if not with_slope:
+                discount = discount_factors(rates, flow_time, compounding)
+                return [np.bincount(flow_rows, weights=amounts * discount, minlength=n_bonds) - target, None]
+            [discount, derivative] = discount_factor_derivatives(rates, flow_time, compounding)
+            price = np.bincount(flow_rows, weights=amounts * discount, minlength=n_bonds)
+            slope = np.bincount(flow_rows, weights=amounts * derivative, minlength=n_bonds)
+            return [price - target, slope]
+
+        # The price falls as the spread rises, so a root is bracketed if the error changes sign from x_start to x_end
+        lower = np.full(n_bonds, float(x_start))
+        upper = np.full(n_bonds, float(x_end))
+        [error_start, _] = price_error(lower, with_slope=False)
+        [error_end, _] = price_error(upper, with_slope=False)
+        at_start = np.abs(error_start) < precision
+        at_end = np.abs(error_end) < precision
+        bracketed = (error_start > 0) & (error_end < 0) & cash_flow_matrix.has_cash_flows
+
+        z_spread = np.where(error_start < 0, lower, upper)
+        z_spread[at_end] = x_end
+        z_spread[at_start] = x_start
+        z_spread[~cash_flow_matrix.has_cash_flows] = np.nan
+        z_spread[bracketed] = (lower[bracketed] + upper[bracketed]) / 2
+        error = np.where(at_start, error_start, error_end)
+        converged = (at_start | at_end) & cash_flow_matrix.has_cash_flows
+        active = bracketed & ~converged
+        iterations = np.zeros(n_bonds, dtype=np.int64)
+
+        for _ in range(max_iter):
+            if not active.any():
+                break
+            keep = active[flows[0]]
+            if keep.sum() < keep.size / 2:
+                flows = [values[keep] for values in flows]
+            [active_error, slope] = price_error(z_spread)
+            error[active] = active_error[active]
+            iterations[active] += 1
+
+            done = active & (np.abs(error) < precision)
+            converged |= done
+            active &= ~done
+
+            # Shrink the bracket around the root, then take the Newton step if it stays inside the bracket
+            too_low = active & (error > 0)
+            lower[too_low] = z_spread[too_low]
+            too_high = active & (error < 0)
+            upper[too_high] = z_spread[too_high]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                newton = z_spread - error / slope
+            bisection = (lower + upper) / 2
+            step = np.where((newton > lower) & (newton < upper), newton, bisection)
+            z_spread[active] = step[active]
+
+            done = active & ((upper - lower) / 2 < precision)
+            converged |= done
+            active &= ~done
+
+        return ZSpreadResult(asset_id=self.asset_id, z_spread=z_spread, price_error=error, iterations=iterations,
+                             converged=converged)
+
 class CorporateBond:
     def __init__(
         self,
@@ -498,16 +842,16 @@ class CorporateBond:
             # Add to skip if empty
             MV_CP = (
                 self.ratestodics(
-                    couponmaturities[iAsset],
                     couponrates[iAsset] + sSpread[iAsset] + zSpread[iAsset],
+                    couponmaturities[iAsset],
                     self.compounding,
                 )
                 * couponcf[iAsset]
             )
             MV_NOT = (
                 self.ratestodics(
-                    notionalmaturities[iAsset],
                     notionalrates[iAsset] + sSpread[iAsset] + zSpread[iAsset],
+                    notionalmaturities[iAsset],
                     self.compounding,
                 )
                 * notionalcf[iAsset]
@@ -528,13 +872,13 @@ class CorporateBond:
     ):
         MV_CP = (
             self.ratestodics(
-                couponmaturities, couponrates + sSpread + zSpread, self.compounding
+                couponrates + sSpread + zSpread, couponmaturities, self.compounding
             )
             * couponcf
         )
         MV_NOT = (
             self.ratestodics(
-                notionalmaturities, notionalrates + sSpread + zSpread, self.compounding
+                notionalrates + sSpread + zSpread, notionalmaturities, self.compounding
             )
             * notionalcf
         )
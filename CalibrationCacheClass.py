@@ -0,0 +1,151 @@
+import os
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from dataclasses import dataclass
+from Curves import Curves, AlphaResult, calibrate_curves
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    disk_hits: int = 0  # Hits that had to be read from the on-disk store, also counted in hits
+    misses: int = 0
+    evictions: int = 0
+
+
+class CalibrationCache:
+    def __init__(self, max_size: int = 128, directory: str = None):
+        """
+        Cache of calibrated Smith-Wilson curves (alpha and b), keyed by a hash of everything the calibration depends
+        on. The most recently used max_size calibrations are kept in memory, older ones are evicted. If a directory is
+        given (for example Intermediate/calibration_cache) every calibration is also stored there as an .npz file, so
+        later runs on the same inputs do not calibrate at all.
+
+        Parameters
+        ----------
+        :type max_size: int
+            Maximum number of calibrations kept in memory.
+        :type directory: str
+            Optional folder of the on-disk store, created when needed.
+        """
+        if max_size <= 0:
+            raise ValueError("Cache size must be greater than 0")
+        self.max_size = max_size
+        self.directory = directory
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(country, m_obs, r_obs, ufr, tau, precision, x_start=0.05, x_end=0.5, solver="brent") -> str:
+        """
+        Hash of the calibration inputs. Maturities and rates are hashed by their float64 bytes, so the key does not
+        depend on whether they are passed as lists, Series or arrays. The root finder of alpha is part of the key:
+        calibrate (Brent) and calibrate_all (batched Illinois) agree only up to the precision, so a stored
+        calibration is only returned to the path that computed it.
+        """
+        digest = hashlib.sha256()
+        digest.update(str(country).encode())
+        digest.update(str(solver).encode())
+        for values in (m_obs, r_obs, [ufr, tau, precision, x_start, x_end]):
+            values = np.ascontiguousarray(values, dtype=np.float64)
+            digest.update(str(values.size).encode())
+            digest.update(values.tobytes())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key: str):
+        """
+        Returns the cached [alpha, b, alpha_result] for the key or None. A hit on disk is loaded into memory.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return self._entries[key]
+        if self.directory is not None and os.path.exists(self._path(key)):
+            with np.load(self._path(key)) as stored:
+                alpha_result = AlphaResult(alpha=float(stored["alpha"]), iterations=int(stored["iterations"]),
+                                           residual=float(stored["residual"]), converged=bool(stored["converged"]))
+                entry = [alpha_result.alpha, stored["b"], alpha_result]
+            self._remember(key, entry)
+            self.stats.hits += 1
+            self.stats.disk_hits += 1
+            return entry
+        self.stats.misses += 1
+        return None
+
+    def put(self, key: str, alpha, b, alpha_result: AlphaResult) -> None:
+        entry = [float(alpha), np.asarray(b, dtype=float), alpha_result]
+        self._remember(key, entry)
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            np.savez(self._path(key), alpha=entry[0], b=entry[1], iterations=alpha_result.iterations,
+                     residual=alpha_result.residual, converged=alpha_result.converged)
+
+    def _remember(self, key: str, entry: list) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)  # Least recently used
+            self.stats.evictions += 1
+
+    def calibrate(self, curves: Curves, m_obs, r_obs, x_start=0.05, x_end=0.5, max_iter=1000) -> Curves:
+        """
+        Calibrates alpha (Curves.BrentAlpha) and b (Curves.SWCalibrate) of the curve unless the same calibration is
+        in the cache, and stores M_Obs, r_Obs, alpha, b and alpha_result on the curve.
+
+        :type curves: Curves
+        :rtype: Curves
+        """
+        m_obs = np.asarray(m_obs, dtype=float)
+        r_obs = np.asarray(r_obs, dtype=float)
+        key = self.key(curves.Country, m_obs, r_obs, curves.ufr, curves.Tau, curves.Precision, x_start, x_end,
+                       "brent")
+        entry = self.get(key)
+        if entry is None:
+            alpha_result = curves.BrentAlpha(x_start, x_end, m_obs, r_obs, curves.ufr, curves.Tau, curves.Precision,
+                                             max_iter)
+            b = curves.SWCalibrate(r_obs, m_obs, curves.ufr, alpha_result.alpha)
+            entry = [alpha_result.alpha, b, alpha_result]
+            self.put(key, *entry)
+        [curves.alpha, curves.b, curves.alpha_result] = entry
+        curves.M_Obs = m_obs
+        curves.r_Obs = r_obs
+        return curves
+
+    def calibrate_all(self, m_obs: dict, r_obs: dict, ufr: dict, precision, tau, initial_date, x_start=0.05,
+                      x_end=0.5, max_iter=1000) -> dict:
+        """
+        Same as Curves.calibrate_curves, but only the countries that are not in the cache are calibrated. Entries
+        stored by calibrate are not used, they were found with another root finder.
+
+        :rtype: dict country -> Curves
+        """
+        keys = {country: self.key(country, m_obs[country], r_obs[country], ufr[country], tau, precision, x_start,
+                                  x_end, "illinois")
+                for country in m_obs}
+        entries = {country: self.get(keys[country]) for country in m_obs}
+        missing = [country for country in m_obs if entries[country] is None]
+        calibrated = calibrate_curves({country: m_obs[country] for country in missing},
+                                      {country: r_obs[country] for country in missing},
+                                      {country: ufr[country] for country in missing}, precision, tau, initial_date,
+                                      x_start, x_end, max_iter)
+        for country, curve in calibrated.items():
+            self.put(keys[country], curve.alpha, curve.b, curve.alpha_result)
+
+        curves = {}
+        for country in m_obs:
+            if country in calibrated:
+                curves[country] = calibrated[country]
+                continue
+            curve = Curves(ufr[country], precision, tau, initial_date, country)
+            [curve.alpha, curve.b, curve.alpha_result] = entries[country]
+            curve.M_Obs = np.asarray(m_obs[country], dtype=float)
+            curve.r_Obs = np.asarray(r_obs[country], dtype=float)
+            curves[country] = curve
+        return curves
@@ -0,0 +1,333 @@
+import numpy as np
+import pandas as pd
+from datetime import date
+from enum import IntEnum
+from itertools import chain
+
+try:
+    from scipy import sparse as sp
+except ImportError:  # scipy is only needed when a sparse cash-flow matrix is requested
+    sp = None
+
+
+class EventType(IntEnum):
+    DIVIDEND = 1
+    TERMINAL = 2
+    COUPON = 3
+    REDEMPTION = 4
+    LIABILITY = 5
+
+
+class CashFlowEventQueue:
+    def __init__(self, event_dates: dict):
+        """
+        Merge the cash-flow dates of several sources into a single queue sorted by date. Each event remembers its
+        type and the position (column) of the date in the list it came from, so that the caller can find the
+        cash-flow amounts that belong to it.
+
+        Parameters
+        ----------
+        :type event_dates: dict[EventType, list of datetime.date]
+            For each type of event, the dates at which the cash flows of that type are paid out. The position of a
+            date in its list is reported back as the column of the event.
+        """
+        dates = []
+        types = []
+        columns = []
+        for event_type, one_event_dates in event_dates.items():
+            one_event_dates = np.asarray(one_event_dates, dtype="datetime64[D]")
+            dates.append(one_event_dates)
+            types.append(np.full(one_event_dates.size, int(event_type), dtype=np.int8))
+            columns.append(np.arange(one_event_dates.size))
+
+        dates = np.concatenate(dates) if dates else np.array([], dtype="datetime64[D]")
+        types = np.concatenate(types) if types else np.array([], dtype=np.int8)
+        columns = np.concatenate(columns) if columns else np.array([], dtype=int)
+
+        order = np.lexsort((columns, types, dates))  # Sort by date, then by type, then by column
+        self.dates = dates[order]
+        self.types = types[order]
+        self.columns = columns[order]
+        self.cursor = 0  # Position of the first event not yet settled
+
+    def __len__(self) -> int:
+        return self.dates.size - self.cursor
+
+    def pop_until(self, deadline: date) -> list:
+        """
+        Remove all the events that are due on or before the deadline from the queue. Events that are already settled
+        are never looked at again.
+
+        Parameters
+        ----------
+        :type deadline: datetime.date
+            The last date for which the events are settled.
+
+        Returns
+        -------
+        :rtype list with two elements:
+            types: numpy array with the EventType of each event that is due, sorted by date.
+            columns: numpy array with the column of each event that is due.
+        """
+        end = self.cursor + np.searchsorted(self.dates[self.cursor:], np.datetime64(deadline, "D"), side="right")
+        types = self.types[self.cursor:end]
+        columns = self.columns[self.cursor:end]
+        self.cursor = end
+        return [types, columns]
+
+
+def stack_profiles(cash_flow_profile: list) -> list:
+    """
+    Flatten a list of cash-flow profiles into arrays with one element per cash flow, without a Python loop over the
+    assets: the dates and amounts of all profiles are read in one pass, each distinct date is converted once and the
+    asset of each cash flow follows from the number of cash flows per profile.
+
+    :type cash_flow_profile: list of dictionaries {date: amount}, one per asset
+    :rtype list with three elements:
+        rows: numpy int64 array with the asset (position in the profile list) of each cash flow.
+        cash_flow_dates: numpy datetime64[D] array with the date of each cash flow.
+        amounts: numpy float array with the size of each cash flow.
+    """
+    n_cash_flows = np.fromiter(map(len, cash_flow_profile), dtype=np.int64, count=len(cash_flow_profile))
+    total = int(n_cash_flows.sum())
+    rows = np.repeat(np.arange(len(cash_flow_profile)), n_cash_flows)
+    # Dates repeat across assets, so only the distinct dates are converted to datetime64
+    [codes, distinct_dates] = pd.factorize(np.fromiter(chain.from_iterable(cash_flow_profile), dtype=object,
+                                                       count=total))
+    cash_flow_dates = np.array(list(distinct_dates), dtype="datetime64[D]").reshape(distinct_dates.size)[codes]
+    amounts = np.fromiter(chain.from_iterable(one_profile.values() for one_profile in cash_flow_profile),
+                          dtype=float, count=total)
+    return [rows, cash_flow_dates, amounts]
+
+
+def build_cash_flow_matrix(cash_flow_profile: list, unique_dates: list, sparse: bool = False):
+    """
+    Scatter a list of cash-flow profiles into an asset x date matrix in a single vectorized pass. The profiles are
+    stacked with stack_profiles and the column of each cash flow is found with a binary search in the sorted dates.
+
+    Parameters
+    ----------
+    :type cash_flow_profile: list of dictionaries
+        Each element of the list represents a single asset. Each element contains a dictionary where keys are the
+        dates at which the cash flows are paid out and the values are the size of the payment in local currency.
+    :type unique_dates: list of datetime.date
+        The dates of the columns of the matrix. Every date in the profiles must be present.
+    :type sparse: bool
+        If True, return a scipy.sparse CSR matrix instead of a dense numpy array. Useful when most assets only pay
+        out on a few of the dates.
+
+    Returns
+    -------
+    :rtype numpy.ndarray or scipy.sparse.csr_matrix
+        Matrix with one row per asset and one column per date in unique_dates.
+    """
+    [rows, cash_flow_dates, values] = stack_profiles(cash_flow_profile)
+    column_dates = np.array(unique_dates, dtype="datetime64[D]").reshape(len(unique_dates))
+    order = np.argsort(column_dates, kind="stable")
+    position = np.searchsorted(column_dates[order], cash_flow_dates)
+    found = position < column_dates.size
+    found[found] = column_dates[order][position[found]] == cash_flow_dates[found]
+    if not found.all():
+        raise KeyError(cash_flow_dates[~found][0].item())
+    columns = order[position]
+
+    shape = (len(cash_flow_profile), len(unique_dates))
+    if sparse:
+        if sp is None:
+            raise ImportError("scipy is required to build a sparse cash-flow matrix")
+        return sp.csr_matrix((values, (rows, columns)), shape=shape)
+
+    cash_flow_matrix = np.zeros(shape)
+    cash_flow_matrix[rows, columns] = values
+    return cash_flow_matrix
+
+
+def discount_factors(rates, time_frac, compounding: int):
+    """
+    Convert rates to discount factors using a selected compounding convention. Same conventions as
+    CorporateBond.ratestodics.
+
+    Parameters
+    ----------
+    :type rates: numpy.ndarray
+        An array of discount rates.
+    :type time_frac: numpy.ndarray
+        An array of year fractions, broadcast against rates.
+    :type compounding: int
+        Set to -1 for continuous compounding, 0 for simple compounding and n (positive integer) for n times per year
+        compounding.
+
+    Returns
+    -------
+    :rtype numpy.ndarray
+        An array of discount factors.
+    """
+    if compounding == -1:  # Continuous time convention
+        return np.exp(-rates * time_frac)
+    elif compounding == 0:
+        return (1 + rates * time_frac) ** (-1)
+    else:
+        return (1 + rates / compounding) ** (-time_frac * compounding)
+
+
+def discount_factor_derivatives(rates, time_frac, compounding: int) -> list:
+    """
+    Convert rates to discount factors like discount_factors and also return the derivative of each discount factor
+    with respect to its rate, for example to solve for spreads with Newton's method.
+
+    Returns
+    -------
+    :rtype list with two elements:
+        discount: numpy array of discount factors.
+        derivative: numpy array with the derivative of each discount factor with respect to its rate.
+    """
+    if compounding == -1:  # Continuous time convention
+        discount = np.exp(-rates * time_frac)
+        return [discount, -time_frac * discount]
+    elif compounding == 0:
+        discount = (1 + rates * time_frac) ** (-1)
+        return [discount, -time_frac * discount ** 2]
+    else:
+        discount = (1 + rates / compounding) ** (-time_frac * compounding)
+        return [discount, -time_frac * discount / (1 + rates / compounding)]
+
+
+class CashFlowMatrix:
+    def __init__(self, rows, columns, amounts, dates, modelling_date: date, n_assets: int):
+        """
+        Sparse asset x date matrix of cash flows, stored as the row, column and amount of each non-zero cash flow.
+        The columns are the sorted unique dates of the cash flows, so discount factors only need to be evaluated once
+        for each date no matter how many assets pay on it.
+
+        Parameters
+        ----------
+        :type rows: numpy.ndarray of int
+            Asset (row) of each cash flow.
+        :type columns: numpy.ndarray of int
+            Position of the date of each cash flow in dates.
+        :type amounts: numpy.ndarray of float
+            Size of each cash flow. Several cash flows with the same row and column are added together.
+        :type dates: numpy.ndarray of datetime64[D]
+            Sorted dates of the columns.
+        :type modelling_date: datetime.date
+            Date from which the year fractions of the dates are measured.
+        :type n_assets: int
+            Number of rows, assets without any cash flow have a present value of 0.
+        """
+        order = np.argsort(rows, kind="stable")  # Keep the cash flows of each asset together
+        self.rows = np.asarray(rows, dtype=np.int64)[order]
+        self.columns = np.asarray(columns, dtype=np.int64)[order]
+        self.amounts = np.asarray(amounts, dtype=float)[order]
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.modelling_date = modelling_date
+        self.year_fractions = (self.dates - np.datetime64(modelling_date, "D")).astype(np.int64) / 365.25
+        self.shape = (n_assets, self.dates.size)
+
+        n_cash_flows = np.bincount(self.rows, minlength=n_assets)
+        self.row_start = np.cumsum(n_cash_flows) - n_cash_flows
+        self.has_cash_flows = n_cash_flows > 0
+        self._csr = None
+
+    @classmethod
+    def from_cash_flows(cls, rows, cash_flow_dates, amounts, modelling_date: date, n_assets: int):
+        """
+        Build the matrix from the row, date and amount of each cash flow. The date grid is made of the distinct dates
+        of the cash flows; dates are indexed by their distance in days from the earliest date, which avoids sorting
+        all the cash flows.
+        """
+        cash_flow_dates = np.asarray(cash_flow_dates, dtype="datetime64[D]")
+        if cash_flow_dates.size == 0:
+            return cls(rows, np.array([], dtype=np.int64), amounts, cash_flow_dates, modelling_date, n_assets)
+        first_day = cash_flow_dates.min()
+        day = (cash_flow_dates - first_day).astype(np.int64)
+        paid = np.bincount(day) > 0
+        column_of_day = np.cumsum(paid) - 1
+        return cls(rows, column_of_day[day], amounts, first_day + np.flatnonzero(paid), modelling_date, n_assets)
+
+    @classmethod
+    def from_profiles(cls, cash_flow_profile: list, modelling_date: date):
+        """
+        Build the matrix from a cash-flow profile with one dictionary {date: amount} per asset, like the dividend and
+        terminal profiles of EquitySharePortfolio. Cash flows before the modelling date are left out. A single
+        liability is one profile: [dict(zip(liability.cash_flow_dates, liability.cash_flow_series))].
+
+        :type cash_flow_profile: list of dict
+        :type modelling_date: datetime.date
+        :rtype: CashFlowMatrix
+        """
+        [rows, cash_flow_dates, amounts] = stack_profiles(cash_flow_profile)
+        future = cash_flow_dates >= np.datetime64(modelling_date, "D")
+        return cls.from_cash_flows(rows[future], cash_flow_dates[future], amounts[future], modelling_date,
+                                   len(cash_flow_profile))
+
+    def to_dense(self) -> np.ndarray:
+        dense = np.zeros(self.shape)
+        np.add.at(dense, (self.rows, self.columns), self.amounts)
+        return dense
+
+    def to_csr(self):
+        # The scipy matrix is built once and kept
+        if sp is None:
+            raise ImportError("scipy is required to build a sparse cash-flow matrix")
+        if self._csr is None:
+            self._csr = sp.csr_matrix((self.amounts, (self.rows, self.columns)), shape=self.shape)
+        return self._csr
+
+    def zero_rates_on_grid(self, zero_rates) -> np.ndarray:
+        """
+        Evaluate a term structure once on the date grid of the matrix. Cash flows paid on the modelling date are not
+        discounted, so the term structure is only evaluated for dates after the modelling date.
+
+        :type zero_rates: callable
+            Function returning the zero rates (1-D) or several stacked curves (2-D, one curve per row) for a numpy
+            array of year fractions.
+        """
+        future = self.year_fractions > 0
+        rates = np.asarray(zero_rates(self.year_fractions[future]), dtype=float)
+        grid_rates = np.zeros(rates.shape[:-1] + (self.dates.size,))
+        grid_rates[..., future] = rates
+        return grid_rates
+
+    def row_sums(self, values: np.ndarray) -> np.ndarray:
+        # Sum the values of the cash flows (last axis) of each asset
+        sums = np.zeros(values.shape[:-1] + (self.shape[0],))
+        if values.shape[-1] > 0:
+            sums[..., self.has_cash_flows] = np.add.reduceat(values, self.row_start[self.has_cash_flows], axis=-1)
+        return sums
+
+    def present_value(self, rates: np.ndarray, compounding: int = 1, spread: np.ndarray = None) -> np.ndarray:
+        """
+        Discount all cash flows and add them up by asset.
+
+        Parameters
+        ----------
+        :type rates: numpy.ndarray
+            Zero rates on the date grid of the matrix (see zero_rates_on_grid), either a single curve (1-D) or
+            several stacked curves (2-D, one curve per row).
+        :type compounding: int
+            Compounding convention, see discount_factors. Defaults to annual compounding, the convention of the
+            Smith-Wilson zero rates.
+        :type spread: numpy.ndarray
+            Optional spread added to the rates of each asset, for example a sector spread plus a z-spread.
+
+        Returns
+        -------
+        :rtype numpy.ndarray
+            Present value of each asset, with one row per curve if several curves are given.
+        """
+        rates = np.asarray(rates, dtype=float)
+        if spread is None:
+            # One discount factor per date, shared by all assets paying on that date
+            grid_discount = discount_factors(rates, self.year_fractions, compounding)
+            if grid_discount.ndim == 2 and sp is not None:
+                # Several curves: one sparse matrix product, without a copy of the cash flows for every curve
+                return np.asarray(self.to_csr() @ grid_discount.transpose()).transpose()
+            return self.row_sums(self.amounts * grid_discount[..., self.columns])
+        [unique_spread, spread_of_asset] = np.unique(np.asarray(spread, dtype=float), return_inverse=True)
+        if unique_spread.size * self.dates.size <= self.rows.size:
+            # Few distinct spreads (e.g. one per sector): one discount factor per spread and date
+            grid_rates = rates[..., np.newaxis, :] + unique_spread[:, np.newaxis]
+            grid_discount = discount_factors(grid_rates, self.year_fractions, compounding)
+            return self.row_sums(self.amounts * grid_discount[..., spread_of_asset[self.rows], self.columns])
+        rates = rates[..., self.columns] + unique_spread[spread_of_asset[self.rows]]
+        return self.row_sums(self.amounts * discount_factors(rates, self.year_fractions[self.columns], compounding))
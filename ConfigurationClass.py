@@ -2,10 +2,15 @@ class Configuration:
     def __init__(self) -> None:
         self.bond_portfolio: str = ""
         self.trace_enabled: bool = False
+        self.profile_enabled: bool = False
+        self.profile_interval: float = 0.005
+        self.profile_memory: bool = True
         self.intermediate_path: str = ""
         self.intermediate_enabled: bool = False
         self.intermediate_equity_portfolio: str = ""
         self.intermediate_cash_portfolio: str = ""
+        self.input_cache_enabled: bool = False
+        self.input_cache_path: str = ""
         self.input_path: str = ""
         self.input_cash_portfolio: str = ""
         self.input_curves: str = ""
@@ -1,5 +1,157 @@
 import numpy as np
 import pandas as pd
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+try:
+    from scipy.linalg import cho_factor, cho_solve
+except ImportError:  # scipy is optional, fall back to a general solver
+    cho_factor = None
+try:
+    from scipy import sparse as sp
+except ImportError:  # without scipy the instrument cash-flow matrices are dense
+    sp = None
+
+
+def _wilson_heart(alpha, u_plus_v, u_minus_v):
+    # Heart of the Wilson function from paragraph 132, given the alpha independent matrices u + v and |u - v|
+    return 0.5 * (alpha * u_plus_v + np.exp(-alpha * u_plus_v) - alpha * u_minus_v - np.exp(-alpha * u_minus_v))
+
+
+def _sandwich(C, A):
+    # C A C' for a symmetric n_dates x n_dates matrix A and a dense or sparse n_instruments x n_dates matrix C, as a
+    # dense ndarray. Only products of C with dense matrices are formed, C is never densified.
+    CA = np.asarray(C @ A)
+    return np.asarray(C @ CA.transpose())
+
+
+def _date_weights(C, b):
+    # C' b for a calibration vector b (n_instruments) or one calibration vector per row (k x n_instruments)
+    return np.asarray(C.transpose() @ np.transpose(b)).transpose()
+
+
+def instrument_cash_flows(rates, maturities, frequency=1) -> list:
+    """
+    Cash-flow matrix of par instruments (swaps or par bonds) paying the fixed rate frequency times a year and the
+    notional 1 at maturity. The cash flows of each instrument are a row, the columns are the distinct payment times.
+
+    Args:
+        rates =      n x 1 ndarray of par rates. Ex. rates = [0.01, 0.02, 0.03]
+        maturities = n x 1 ndarray of maturities in years, multiples of 1 / frequency. Ex. maturities = [1, 2, 5]
+        frequency =  number of payments per year, the same for all instruments. Ex. frequency = 2
+
+    Returns:
+        list with three elements:
+            C =             n x N scipy.sparse CSR matrix of cash flows (a dense ndarray if scipy is not installed).
+            payment_times = N x 1 ndarray of the payment times in years, in increasing order.
+            prices =        n x 1 ndarray of the prices of the instruments, 1 for par instruments.
+    """
+
+    rates = np.asarray(rates, dtype=float)
+    n_payments = np.rint(np.asarray(maturities, dtype=float) * frequency).astype(np.int64)
+    rows = np.repeat(np.arange(rates.size), n_payments)
+    offset = np.cumsum(n_payments) - n_payments
+    columns = np.arange(rows.size) - offset[rows]  # Payment k - 1 of each instrument is at time k / frequency
+    amounts = rates[rows] / frequency
+    amounts[offset + n_payments - 1] += 1  # Notional at maturity
+    shape = (rates.size, int(n_payments.max(initial=0)))
+    if sp is None:
+        C = np.zeros(shape)
+        C[rows, columns] = amounts
+    else:
+        C = sp.csr_matrix((amounts, (rows, columns)), shape=shape)
+    payment_times = np.arange(1, shape[1] + 1) / frequency
+    return [C, payment_times, np.ones(rates.size)]
+
+
+@dataclass
+class AlphaResult:
+    """
+    Convergence speed parameter alpha found by Curves.BrentAlpha.
+    """
+    alpha: float
+    iterations: int
+    residual: float  # Value of Galfa at alpha
+    converged: bool
+
+
+@dataclass
+class ForwardCurveFamily:
+    """
+    Smith-Wilson curves implied for each projection year by the forward rates of the initial curve, made by
+    Curves.ProjectForwardCurves. The curves have different lengths (the curve of year t has the maturities 1 to
+    n - t), so they are stored back to back in flat arrays: the maturities, rates and calibration vector of year t are
+    the elements offsets[t] to offsets[t + 1].
+    """
+    curves: "Curves"
+    offsets: np.ndarray
+    maturities: np.ndarray
+    rates: np.ndarray
+    b: np.ndarray
+    alpha: np.ndarray
+    iterations: np.ndarray
+    residual: np.ndarray
+    converged: np.ndarray
+
+    def __len__(self) -> int:
+        return self.alpha.size
+
+    def curve(self, year: int) -> list:
+        # [maturities, rates, b, alpha] of the curve of the projection year, the arrays are views into the family
+        start, end = self.offsets[year], self.offsets[year + 1]
+        return [self.maturities[start:end], self.rates[start:end], self.b[start:end], self.alpha[year]]
+
+    def zero_rates(self, year: int):
+        # Zero rate function of the curve of the projection year, for example for CorpBondArrayPortfolio.price
+        [maturities, rates, b, alpha] = self.curve(year)
+        return lambda t: self.curves.SWExtrapolate(t, maturities, b, self.curves.ufr, alpha)
+
+
+def _brent_alpha(galfa, x_start, x_end, precision, max_iter) -> AlphaResult:
+    # Brent's method on a Galfa function of alpha alone, see Curves.BrentAlpha
+    x_pre, x_cur = x_start, x_end
+    f_pre, f_cur = galfa(x_pre), galfa(x_cur)
+    if np.abs(f_pre) < precision: # If initial point already satisfies the conditions return start point
+        return AlphaResult(alpha=x_start, iterations=0, residual=f_pre, converged=True)
+    if np.abs(f_cur) < precision: # If final point already satisfies the conditions return end point
+        return AlphaResult(alpha=x_end, iterations=0, residual=f_cur, converged=True)
+    if np.sign(f_pre) == np.sign(f_cur): # No sign change, bisection would move towards the end point
+        return AlphaResult(alpha=x_end, iterations=0, residual=f_cur, converged=False)
+
+    x_blk, f_blk = x_pre, f_pre # Contrapoint, the root is always between x_cur and x_blk
+    s_pre = s_cur = x_cur - x_pre # Previous two steps
+    for i_iter in range(1, max_iter + 1):
+        if f_pre * f_cur < 0:
+            x_blk, f_blk = x_pre, f_pre
+            s_pre = s_cur = x_cur - x_pre
+        if np.abs(f_blk) < np.abs(f_cur): # Keep the best estimate in x_cur
+            x_pre, x_cur, x_blk = x_cur, x_blk, x_cur
+            f_pre, f_cur, f_blk = f_cur, f_blk, f_cur
+
+        delta = (precision + 4 * np.finfo(float).eps * np.abs(x_cur)) / 2
+        s_bis = (x_blk - x_cur) / 2
+        if f_cur == 0 or np.abs(s_bis) < delta: # Solution found
+            return AlphaResult(alpha=x_cur, iterations=i_iter, residual=f_cur, converged=True)
+
+        if np.abs(s_pre) > delta and np.abs(f_cur) < np.abs(f_pre):
+            if x_pre == x_blk: # Secant step
+                s_try = -f_cur * (x_cur - x_pre) / (f_cur - f_pre)
+            else: # Inverse quadratic interpolation
+                d_pre = (f_pre - f_cur) / (x_pre - x_cur)
+                d_blk = (f_blk - f_cur) / (x_blk - x_cur)
+                s_try = -f_cur * (f_blk * d_blk - f_pre * d_pre) / (d_blk * d_pre * (f_blk - f_pre))
+            if 2 * np.abs(s_try) < min(np.abs(s_pre), 3 * np.abs(s_bis) - delta): # Accept the interpolation
+                s_pre, s_cur = s_cur, s_try
+            else: # Interpolation too slow, bisect
+                s_pre = s_cur = s_bis
+        else: # Bisect
+            s_pre = s_cur = s_bis
+
+        x_pre, f_pre = x_cur, f_cur
+        x_cur += s_cur if np.abs(s_cur) > delta else np.copysign(delta, s_bis)
+        f_cur = galfa(x_cur)
+    return AlphaResult(alpha=x_cur, iterations=max_iter, residual=f_cur, converged=False)
+
 
 class Curves:
     def __init__(self, ufr, precision, tau, initial_date, country):
@@ -15,6 +167,7 @@ class Curves:
         self.Tau = tau
         self.alpha = pd.DataFrame(data=None)
         self.b = pd.DataFrame(data=None)
+        self.alpha_result = None
 
     def SWHeart(self, u, v, alpha):
     # SWHEART Calculate the heart of the Wilson function.
@@ -33,9 +186,27 @@ class Curves:
     # For more information see https://www.eiopa.europa.eu/sites/default/files/risk_free_interest_rate/12092019-technical_documentation.pdf
 
     
-        u_mat = np.tile(u, [v.size, 1]).transpose()
-        v_mat = np.tile(v, [u.size, 1])
-        return 0.5 * (alpha * (u_mat + v_mat) + np.exp(-alpha * (u_mat + v_mat)) - alpha * np.absolute(u_mat-v_mat) - np.exp(-alpha * np.absolute(u_mat-v_mat))); # Heart of the Wilson function from paragraph 132
+        return _wilson_heart(alpha, np.add.outer(u, v), np.absolute(np.subtract.outer(u, v))) # Heart of the Wilson function from paragraph 132
+
+    def SWSolve(self, A, y):
+    # SWSOLVE Solve the Smith-Wilson system A x = y.
+    # A = Q' H Q is symmetric positive definite for distinct maturities, so it is solved with a Cholesky
+    # factorization. If scipy is not installed or the factorization fails (A is numerically not positive definite)
+    # a general LU solve is used instead.
+    #
+    # Arguments:
+    #    A = n x n ndarray, Q' H Q from paragraph 149.
+    #    y = n ndarray or n x k ndarray of right hand sides.
+    #
+    # Returns:
+    #    ndarray x with the shape of y.
+
+        if cho_factor is not None:
+            try:
+                return cho_solve(cho_factor(A), y)
+            except np.linalg.LinAlgError:
+                pass
+        return np.linalg.solve(A, y)
 
     def SWCalibrate(self, r, M, ufr, alpha):
     # SWCALIBRATE Calculate the calibration vector using a Smith-Wilson algorithm
@@ -44,23 +215,23 @@ class Curves:
     #
     # Arguments: 
     #    r =     n x 1 ndarray of rates, for which you wish to calibrate the algorithm. Each rate belongs to an observable zero coupon bond with a known maturity. Ex. r = [[0.0024], [0.0034]]
+    #            Several sets of rates for the same maturities can be calibrated at once as a k x n ndarray (one set per row), Q'HQ is then only factorized once.
     #    M =     n x 1 ndarray of maturities of bonds, that have rates provided in input (r). Ex. u=[[1], [3]]
     #    ufr =   1 x 1 floating number, representing the ultimate forward rate. Ex. ufr = 0.042
     #    alpha = 1 x 1 floating number representing the convergence speed parameter alpha. Ex. alpha = 0.05
     #
     # Returns:
     #    n x 1 ndarray array for the calibration vector needed to interpolate and extrapolate b =[[14], [-21]]
-    #    rates
+    #    rates, or a k x n ndarray with one calibration vector per row if r is k x n
     # For more information see https://www.eiopa.europa.eu/sites/default/files/risk_free_interest_rate/12092019-technical_documentation.pdf
 
-        C = np.identity(M.size)
+        # The cash flow matrix C is the identity for zero coupon bonds, so Q = diag(d) and q = d and the products with
+        # the diagonal matrix Q are done by broadcasting.
         p = (1+r) **(-M)  # Transform rates to implied market prices of a ZCB bond
         d = np.exp(-np.log(1+ufr) * M)    # Calculate vector d described in paragraph 138
-        Q = np.diag(d) @ C                  # Matrix Q described in paragraph 139
-        q = C.transpose() @ d                         # Vector q described in paragraph 139
         H = self.SWHeart(M, M, alpha) # Heart of the Wilson function from paragraph 132
 
-        return np.linalg.inv(Q.transpose() @ H @ Q) @ (p-q)          # Calibration vector b from paragraph 149
+        return self.SWSolve(d[:, np.newaxis] * H * d, (p-d).transpose()).transpose()          # Calibration vector b from paragraph 149
     
     def SWExtrapolate(self, M_Target, M_Obs, b, ufr, alpha):
     # SWEXTRAPOLATE Interpolate or/and extrapolate rates for targeted maturities using a Smith-Wilson algorithm.
@@ -69,7 +240,7 @@ class Curves:
     # Arguments: 
     #    M_Target = k x 1 ndarray. Each element represents a bond maturity of interest. Ex. M_Target = [[1], [2], [3], [5]]
     #    M_Obs =    n x 1 ndarray. Observed bond maturities used for calibrating the calibration vector b. Ex. M_Obs = [[1], [3]]
-    #    b =        n x 1 ndarray calibration vector calculated on observed bonds.
+    #    b =        n x 1 ndarray calibration vector calculated on observed bonds, or a j x n ndarray with one calibration vector per row.
     #    ufr =      1 x 1 floating number, representing the ultimate forward rate.
     #       Ex. ufr = 0.042
     #    alpha =    1 x 1 floating number representing the convergence speed parameter alpha. Ex. alpha = 0.05
@@ -77,14 +248,14 @@ class Curves:
     #
     # Returns:
     #    k x 1 ndarray. Represents the targeted rates for a zero-coupon bond. Each rate belongs to a targeted zero-coupon bond with a maturity from T_Target. Ex. r = [0.0024; 0.0029; 0.0034; 0.0039]
+    #    If b has one calibration vector per row the result is a j x k ndarray with one curve per row.
     #
     # For more information see https://www.eiopa.europa.eu/sites/default/files/risk_free_interest_rate/12092019-technical_documentation.pdf
 
-        C = np.identity(M_Obs.size)
         d = np.exp(-np.log(1+ufr) * M_Obs)                                                # Calculate vector d described in paragraph 138
-        Q = np.diag(d) @ C                                                             # Matrix Q described in paragraph 139
         H = self.SWHeart(M_Target, M_Obs, alpha)                                          # Heart of the Wilson function from paragraph 132
-        p = np.exp(-np.log(1+ufr)* M_Target) + np.diag(np.exp(-np.log(1+ufr) * M_Target)) @ H @ Q @ b # Discount pricing function for targeted maturities from paragraph 147
+        ufr_discount = np.exp(-np.log(1+ufr) * M_Target)
+        p = ufr_discount + ufr_discount * ((d * b) @ H.transpose()) # Discount pricing function for targeted maturities from paragraph 147, Q @ b = d * b
         return p ** (-1/ M_Target) -1 # Convert obtained prices to rates and return prices
 
     def Galfa(self, m_obs: np.ndarray, r_obs: np.ndarray, ufr, alpha, tau):
@@ -120,15 +291,37 @@ class Curves:
         Implemented by Gregor Fabjan from Qnity Consultants on 17/12/2021.
         """
         
+        return self.GalfaFunction(m_obs, r_obs, ufr, tau)(alpha)
+
+    def GalfaFunction(self, m_obs: np.ndarray, r_obs: np.ndarray, ufr, tau):
+        """
+        Returns Galfa as a function of alpha alone, for root finders that evaluate it many times. Everything that does
+        not depend on alpha (the maturity sums and differences of the Wilson heart, the vector d and the implied zero
+        coupon prices) is calculated once here instead of in every evaluation.
+
+        Args:
+            m_obs, r_obs, ufr, tau as in Galfa.
+
+        Returns:
+            function of one floating number alpha, returning the same value as Galfa(m_obs, r_obs, ufr, alpha, tau)
+        """
+
         U = max(m_obs)                                # Find maximum liquid maturity from input
         T = max(U + 40, 60)                             # Define the convergence point as defined in paragraph 120 and again in 157
-        C = np.identity(m_obs.size)                   # Construct cash flow matrix described in paragraph 137 assuming the input is ZCB bonds with notional value of 1
         d = np.exp(-np.log(1 + ufr) * m_obs)            # Calculate vector d described in paragraph 138
-        Q = np.diag(d) @ C                            # Matrix Q described in paragraph 139
-        b = self.SWCalibrate(r_obs, m_obs, ufr, alpha)     # Calculate the calibration vector b using the equation from paragraph 149
+        p = (1 + r_obs) ** (-m_obs)                     # Implied market prices of the zero coupon bonds
+        u_plus_v = np.add.outer(m_obs, m_obs)
+        u_minus_v = np.absolute(np.subtract.outer(m_obs, m_obs))
+
+        def galfa(alpha):
+            H = _wilson_heart(alpha, u_plus_v, u_minus_v)
+            b = self.SWSolve(d[:, np.newaxis] * H * d, p - d)  # Calibration vector b from paragraph 149, as in SWCalibrate
+            Qb = d * b                                    # Q @ b with Q = diag(d) for zero coupon bonds, paragraph 139
 
-        K = (1+alpha * m_obs @ Q@ b) / (np.sinh(alpha * m_obs.transpose())@ Q@ b) # Calculate kappa as defined in the paragraph 155
-        return( alpha/np.abs(1 - K*np.exp(alpha*T))-tau) # Size of the gap at the convergence point between the allowable tolerance Tau and the actual curve. Defined in paragraph 158
+            K = (1+alpha * m_obs @ Qb) / (np.sinh(alpha * m_obs.transpose()) @ Qb) # Calculate kappa as defined in the paragraph 155
+            return( alpha/np.abs(1 - K*np.exp(alpha*T))-tau) # Size of the gap at the convergence point between the allowable tolerance Tau and the actual curve. Defined in paragraph 158
+
+        return galfa
 
     def BisectionAlpha(self, x_start, x_end, m_obs, r_obs, ufr, tau, precision, max_iter):
         """
@@ -190,4 +383,394 @@ class Curves:
                 else: # If the start point and the middle point have a different sign than by mean value theorem the interval must contain at least one root
                     x_end = x_mid
         #self.alpha = None
-        return None
\ No newline at end of file
+        return None
+
+    def BrentAlpha(self, x_start, x_end, m_obs, r_obs, ufr, tau, precision, max_iter) -> AlphaResult:
+        """
+        Brent's root finding algorithm for the convergence speed parameter alpha, a faster replacement of
+        BisectionAlpha. Inverse quadratic interpolation and secant steps are used while they shrink the bracket fast
+        enough, otherwise the step falls back to bisection, so the root stays bracketed. Galfa is evaluated through
+        GalfaFunction, which prepares the alpha independent matrices only once.
+
+        Args:
+            x_start, x_end, m_obs, r_obs, ufr, tau, precision, max_iter as in BisectionAlpha.
+
+        Returns:
+            AlphaResult with alpha, the number of iterations, the residual Galfa(alpha) and whether the root was found.
+            If Galfa has the same sign at both ends of the interval there is no root to bracket and x_end is returned,
+            which is where BisectionAlpha ends up in that case; converged is then False.
+
+        For more information see https://en.wikipedia.org/wiki/Brent%27s_method
+        """
+
+        return _brent_alpha(self.GalfaFunction(m_obs, r_obs, ufr, tau), x_start, x_end, precision, max_iter)
+
+    def SWCalibrateInstruments(self, p, C, u, ufr, alpha):
+    # SWCALIBRATEINSTRUMENTS Calculate the calibration vector of a Smith-Wilson curve fitted to coupon instruments.
+    # b = SWCalibrateInstruments(p, C, u, ufr, alpha) is the general form of SWCalibrate from paragraphs 137-149,
+    # where each instrument pays the cash flows in its row of C at the payment times u. With Q = diag(d) C' the
+    # system Q'HQ b = p - C d is formed as C (diag(d) H diag(d)) C', so C can be a scipy.sparse matrix and neither
+    # Q nor a dense C is ever built.
+    #
+    # Arguments:
+    #    p =     n x 1 ndarray of market prices of the instruments, or a k x n ndarray with one set of prices per row. Ex. p = [1, 1]
+    #    C =     n x N ndarray or scipy.sparse matrix of cash flows of the instruments at the payment times u, see instrument_cash_flows.
+    #    u =     N x 1 ndarray of payment times in years. Ex. u = [1, 2, 3]
+    #    ufr =   1 x 1 floating number, representing the ultimate forward rate. Ex. ufr = 0.042
+    #    alpha = 1 x 1 floating number representing the convergence speed parameter alpha. Ex. alpha = 0.05
+    #
+    # Returns:
+    #    n x 1 ndarray calibration vector with one element per instrument, or k x n if p is k x n. Use
+    #    SWExtrapolateInstruments, or SWExtrapolate with u and C' b, to calculate rates.
+    #
+    # For more information see https://www.eiopa.europa.eu/sites/default/files/risk_free_interest_rate/12092019-technical_documentation.pdf
+
+        d = np.exp(-np.log(1+ufr) * u)    # Calculate vector d described in paragraph 138
+        H = self.SWHeart(u, u, alpha) # Heart of the Wilson function from paragraph 132
+        q = np.asarray(C @ d) # Vector q = C d from paragraph 139
+
+        return self.SWSolve(_sandwich(C, d[:, np.newaxis] * H * d), (np.asarray(p) - q).transpose()).transpose() # Calibration vector b from paragraph 149
+
+    def SWExtrapolateInstruments(self, M_Target, u, b, C, ufr, alpha):
+    # SWEXTRAPOLATEINSTRUMENTS Interpolate or/and extrapolate rates of a curve calibrated with SWCalibrateInstruments.
+    # Q b = d * (C' b), so this is SWExtrapolate with the payment times u as observed maturities and C' b as the
+    # calibration vector.
+    #
+    # Arguments:
+    #    M_Target = k x 1 ndarray of maturities of interest.
+    #    u, C, ufr, alpha as in SWCalibrateInstruments.
+    #    b =        n x 1 ndarray calibration vector from SWCalibrateInstruments, or j x n with one per row.
+    #
+    # Returns:
+    #    k x 1 ndarray of zero coupon rates, or j x k if b is j x n.
+
+        return self.SWExtrapolate(M_Target, u, _date_weights(C, b), ufr, alpha)
+
+    def GalfaInstrumentsFunction(self, p, C, u, ufr, tau):
+        """
+        Galfa of a curve calibrated to coupon instruments (SWCalibrateInstruments) as a function of alpha alone, the
+        counterpart of GalfaFunction. The largest payment time is the last liquid point.
+
+        Args:
+            p, C, u, ufr as in SWCalibrateInstruments; tau as in Galfa.
+
+        Returns:
+            function of one floating number alpha
+        """
+
+        U = max(u)                                      # Last liquid point
+        T = max(U + 40, 60)                             # Convergence point as defined in paragraph 120 and again in 157
+        d = np.exp(-np.log(1 + ufr) * u)                # Calculate vector d described in paragraph 138
+        y = np.asarray(p) - np.asarray(C @ d)           # p - q from paragraph 149
+        u_plus_v = np.add.outer(u, u)
+        u_minus_v = np.absolute(np.subtract.outer(u, u))
+
+        def galfa(alpha):
+            H = _wilson_heart(alpha, u_plus_v, u_minus_v)
+            b = self.SWSolve(_sandwich(C, d[:, np.newaxis] * H * d), y)
+            Qb = d * _date_weights(C, b)                  # Q @ b, paragraph 139
+
+            K = (1+alpha * u @ Qb) / (np.sinh(alpha * u) @ Qb) # Calculate kappa as defined in the paragraph 155
+            return( alpha/np.abs(1 - K*np.exp(alpha*T))-tau) # Gap at the convergence point, paragraph 158
+
+        return galfa
+
+    def BrentAlphaInstruments(self, x_start, x_end, p, C, u, ufr, tau, precision, max_iter) -> AlphaResult:
+        """
+        BrentAlpha for a curve calibrated to coupon instruments, see GalfaInstrumentsFunction.
+
+        Args:
+            x_start, x_end, tau, precision, max_iter as in BisectionAlpha; p, C, u, ufr as in SWCalibrateInstruments.
+
+        Returns:
+            AlphaResult, as BrentAlpha.
+        """
+
+        return _brent_alpha(self.GalfaInstrumentsFunction(p, C, u, ufr, tau), x_start, x_end, precision, max_iter)
+
+    def CalibrateInstruments(self, p, C, u, x_start=0.05, x_end=0.5, max_iter=1000) -> AlphaResult:
+        """
+        Calibrates alpha and b of this curve to coupon instruments with the ufr, tau and precision of the object. The
+        calibration is stored as its equivalent on the payment times (M_Obs = u and b = C' b), so the curve can be
+        used with SWExtrapolate and DiscountCurve like a curve calibrated to zero coupon rates.
+
+        Args:
+            p, C, u as in SWCalibrateInstruments; x_start, x_end, max_iter as in BisectionAlpha.
+
+        Returns:
+            AlphaResult, also stored as alpha_result.
+        """
+
+        u = np.asarray(u, dtype=float)
+        alpha_result = self.BrentAlphaInstruments(x_start, x_end, p, C, u, self.ufr, self.Tau, self.Precision,
+                                                  max_iter)
+        b = self.SWCalibrateInstruments(p, C, u, self.ufr, alpha_result.alpha)
+        self.M_Obs = u
+        self.alpha = alpha_result.alpha
+        self.b = _date_weights(C, b)
+        self.alpha_result = alpha_result
+        return alpha_result
+
+    def ProjectForwardCurves(self, m_obs, r_obs, n_years, x_start=0.05, x_end=0.5, max_iter=1000,
+                             max_workers=None) -> ForwardCurveFamily:
+        """
+        Calculates the curves implied by the initial curve for the start of each projection year and calibrates alpha
+        and b for each of them. The rate of the year t curve for maturity m is the forward rate between t and t + m of
+        the initial curve:
+            (1 + r_t(m)) ** m = (1 + r(t + m)) ** (t + m) / (1 + r(t)) ** t
+        All forward curves are calculated at once from the cumulative log discount factors of the initial curve and
+        calibrated together as one padded stack (see calibrate_curves), or in chunks of years on separate processes.
+
+        Args:
+            m_obs =       n x 1 ndarray of maturities 1, 2, ..., n of the initial curve.
+            r_obs =       n x 1 ndarray of the zero coupon rates of the initial curve.
+            n_years =     number of projection years, curves are made for the years 0, 1, ..., n_years - 1.
+            x_start, x_end, max_iter as in BisectionAlpha; the precision and tau of the object are used.
+            max_workers = number of processes; by default all curves are calibrated in this process.
+
+        Returns:
+            ForwardCurveFamily
+        """
+
+        m_obs = np.asarray(m_obs, dtype=float)
+        r_obs = np.asarray(r_obs, dtype=float)
+        n_obs = m_obs.size
+        if not np.array_equal(m_obs, np.arange(1, n_obs + 1)):
+            raise ValueError("Forward curves need the maturities 1, 2, ..., n of an annual curve")
+        if not 0 < n_years < n_obs:
+            raise ValueError("Number of projection years must be between 1 and the number of maturities - 1")
+
+        # log (1 + r(m)) ** m for m = 0, 1, ..., n
+        log_capitalisation = np.concatenate([[0.0], m_obs * np.log1p(r_obs)])
+        years = np.arange(n_years)
+        n_maturities = n_obs - years
+        offsets = np.concatenate([[0], np.cumsum(n_maturities)])
+        year = np.repeat(years, n_maturities)
+        maturities = (np.arange(offsets[-1]) - offsets[year] + 1).astype(float)
+        rates = np.expm1((log_capitalisation[year + maturities.astype(int)] - log_capitalisation[year]) / maturities)
+
+        # Padded stack with one curve per year, see _calibrate_stack
+        valid = np.arange(n_obs) < n_maturities[:, np.newaxis]
+        M = np.zeros((n_years, n_obs))
+        R = np.zeros((n_years, n_obs))
+        M[valid] = maturities
+        R[valid] = rates
+        ufr = np.full(n_years, float(self.ufr))
+
+        if max_workers is None or max_workers == 1:
+            [alpha, b, iterations, residual, converged] = _calibrate_stack(M, R, ufr, self.Precision, self.Tau,
+                                                                           x_start, x_end, max_iter, valid)
+        else:
+            chunks = np.array_split(years, min(max_workers, n_years))
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(_calibrate_stack, [M[chunk] for chunk in chunks],
+                                            [R[chunk] for chunk in chunks], [ufr[chunk] for chunk in chunks],
+                                            repeat(self.Precision), repeat(self.Tau), repeat(x_start),
+                                            repeat(x_end), repeat(max_iter), [valid[chunk] for chunk in chunks]))
+            [alpha, b, iterations, residual, converged] = [np.concatenate(part) for part in zip(*results)]
+
+        return ForwardCurveFamily(curves=self, offsets=offsets, maturities=maturities, rates=rates, b=b[valid],
+                                  alpha=alpha, iterations=iterations, residual=residual, converged=converged)
+
+
+def _calibrate_stack(M, R, ufr, precision, tau, x_start, x_end, max_iter, valid=None):
+    # Calibrates a stack of curves: M, R are n_curves x n arrays and ufr has one value per curve. Curves with fewer
+    # maturities are padded; valid marks the real maturities, padded maturities must be 0. Padded rows and columns
+    # of Q'HQ are replaced by the identity and padded right hand sides by 0, so they give b = 0 and do not change
+    # Galfa. Returns [alpha, b, iterations, residual, converged] with one element (row of b) per curve.
+    n_curves = M.shape[0]
+    valid = np.ones(M.shape, dtype=bool) if valid is None else valid
+    d = np.exp(-np.log(1 + ufr)[:, np.newaxis] * M)   # Everything that does not depend on alpha, as in GalfaFunction
+    y = np.where(valid, (1 + R) ** (-M) - d, 0)
+    u_plus_v = M[:, :, np.newaxis] + M[:, np.newaxis, :]
+    u_minus_v = np.absolute(M[:, :, np.newaxis] - M[:, np.newaxis, :])
+    padded = ~(valid[:, :, np.newaxis] & valid[:, np.newaxis, :])
+    identity = np.identity(M.shape[1])
+    T = np.maximum(M.max(axis=1) + 40, 60)
+
+    def calibrate(alpha, rows):
+        H = _wilson_heart(alpha[:, np.newaxis, np.newaxis], u_plus_v[rows], u_minus_v[rows])
+        A = np.where(padded[rows], identity, d[rows][:, :, np.newaxis] * H * d[rows][:, np.newaxis, :])
+        return np.linalg.solve(A, y[rows][:, :, np.newaxis])[:, :, 0]
+
+    def galfa(alpha, rows):
+        Qb = d[rows] * calibrate(alpha, rows)
+        K = (1 + alpha * (M[rows] * Qb).sum(axis=1)) / (np.sinh(alpha[:, np.newaxis] * M[rows]) * Qb).sum(axis=1)
+        return alpha / np.abs(1 - K * np.exp(alpha * T[rows])) - tau
+
+    everything = np.arange(n_curves)
+    lower = np.full(n_curves, float(x_start))
+    upper = np.full(n_curves, float(x_end))
+    f_lower = galfa(lower, everything)
+    f_upper = galfa(upper, everything)
+
+    alpha = upper.copy()
+    residual = f_upper.copy()
+    iterations = np.zeros(n_curves, dtype=int)
+    at_start = np.abs(f_lower) < precision
+    at_end = (np.abs(f_upper) < precision) & ~at_start
+    alpha[at_start] = x_start
+    residual[at_start] = f_lower[at_start]
+    converged = at_start | at_end
+    active = ~converged & (np.sign(f_lower) != np.sign(f_upper))
+    last_side = np.zeros(n_curves, dtype=int)  # -1 if lower was replaced in the last step, 1 if upper was
+
+    for _ in range(max_iter):
+        rows = np.flatnonzero(active)
+        if rows.size == 0:
+            break
+        x = (lower[rows] * f_upper[rows] - upper[rows] * f_lower[rows]) / (f_upper[rows] - f_lower[rows])
+        fx = galfa(x, rows)
+        step = np.abs(x - alpha[rows])
+        alpha[rows] = x
+        residual[rows] = fx
+        iterations[rows] += 1
+
+        # Replace the end point with the same sign; if the same end point is replaced twice in a row, halve the
+        # function value at the other end point (Illinois modification) so that it does not stay forever
+        replace_lower = np.sign(fx) == np.sign(f_lower[rows])
+        rows_lower = rows[replace_lower]
+        rows_upper = rows[~replace_lower]
+        f_upper[rows_lower[last_side[rows_lower] == -1]] /= 2
+        f_lower[rows_upper[last_side[rows_upper] == 1]] /= 2
+        lower[rows_lower] = x[replace_lower]
+        f_lower[rows_lower] = fx[replace_lower]
+        upper[rows_upper] = x[~replace_lower]
+        f_upper[rows_upper] = fx[~replace_lower]
+        last_side[rows_lower] = -1
+        last_side[rows_upper] = 1
+
+        done = (fx == 0) | (step < precision) | (upper[rows] - lower[rows] < 2 * precision)
+        converged[rows[done]] = True
+        active[rows[done]] = False
+
+    b = calibrate(alpha, everything)  # Calibration vectors at the final alpha of every curve
+    return [alpha, b, iterations, residual, converged]
+
+
+def calibrate_curves(m_obs: dict, r_obs: dict, ufr: dict, precision, tau, initial_date, x_start=0.05, x_end=0.5,
+                     max_iter=1000) -> dict:
+    """
+    Calibrates alpha and the calibration vector b of many Smith-Wilson curves at once, for example every country in
+    the EIOPA files (see ImportData.import_SWEiopa_all). Curves with the same number of maturities are stacked and
+    calibrated together: every Galfa evaluation is one batched solve over all curves of the stack that are still
+    searching, and alpha is found for all of them together with the Illinois variant of regula falsi.
+
+    Args:
+        m_obs =     dict country -> n x 1 ndarray of observed maturities.
+        r_obs =     dict country -> n x 1 ndarray of observed zero coupon rates.
+        ufr =       dict country -> ultimate forward rate. Ex. ufr = 0.042
+        precision, tau, x_start, x_end, max_iter as in Curves.BisectionAlpha.
+        initial_date = modelling date stored on the curves.
+
+    Returns:
+        dict country -> Curves with M_Obs, r_Obs, alpha, b and alpha_result (an AlphaResult) filled in. Countries
+        where Galfa does not change sign between x_start and x_end get alpha = x_end and converged False, as in
+        Curves.BrentAlpha.
+    """
+
+    stacks = {}
+    for country in m_obs:
+        stacks.setdefault(np.size(m_obs[country]), []).append(country)
+
+    curves = {}
+    for countries in stacks.values():
+        M = np.array([m_obs[country] for country in countries], dtype=float)
+        R = np.array([r_obs[country] for country in countries], dtype=float)
+        ufr_stack = np.array([ufr[country] for country in countries], dtype=float)
+        [alpha, b, iterations, residual, converged] = _calibrate_stack(M, R, ufr_stack, precision, tau, x_start,
+                                                                       x_end, max_iter)
+        for i_curve, country in enumerate(countries):
+            curve = Curves(ufr_stack[i_curve], precision, tau, initial_date, country)
+            curve.M_Obs = M[i_curve]
+            curve.r_Obs = R[i_curve]
+            curve.alpha = alpha[i_curve]
+            curve.b = b[i_curve]
+            curve.alpha_result = AlphaResult(alpha=alpha[i_curve], iterations=int(iterations[i_curve]),
+                                             residual=residual[i_curve], converged=bool(converged[i_curve]))
+            curves[country] = curve
+    return {country: curves[country] for country in m_obs}
+
+
+class DiscountCurve:
+    def __init__(self, curves: Curves, modelling_date=None, horizon_years: int = 150, chunk_size: int = 8192):
+        """
+        Tabulates a calibrated Smith-Wilson curve on a daily grid from the modelling date to the horizon (about 55 000
+        points for 150 years), so that valuations look up rates and discount factors instead of evaluating the Wilson
+        functions again. Queries by date index the grid directly; queries by year fraction interpolate it linearly.
+
+        Parameters
+        ----------
+        :type curves: Curves
+            Calibrated curve with M_Obs, b and alpha filled in, for example from calibrate_curves.
+        :type modelling_date: datetime.date
+            First date of the grid, defaults to the initial date of the curve.
+        :type horizon_years: int
+            Length of the grid in years. Year fractions beyond it are evaluated with SWExtrapolate.
+        :type chunk_size: int
+            Number of grid points evaluated at once, limits the size of the Wilson heart matrices.
+        """
+        if np.size(curves.b) == 0:
+            raise ValueError("Curve " + str(curves.Country) + " must be calibrated before it can be tabulated")
+        self.curves = curves
+        self.m_obs = np.asarray(curves.M_Obs, dtype=float)
+        self.b = np.asarray(curves.b, dtype=float)
+        self.alpha = float(curves.alpha)
+        self.modelling_date = curves.InitialDate if modelling_date is None else modelling_date
+        self.start_day = np.datetime64(self.modelling_date, "D")
+
+        n_days = int(np.ceil(horizon_years * 365.25))
+        self.year_fractions = np.arange(n_days + 1) / 365.25  # Same day count as the cash-flow matrices
+        self.horizon = self.year_fractions[-1]
+
+        # Zero rates in chunks; the rate at t = 0 is the limit of the rates for short maturities
+        zero_rate = np.empty(n_days + 1)
+        for start in range(1, n_days + 1, chunk_size):
+            stop = min(start + chunk_size, n_days + 1)
+            zero_rate[start:stop] = self._extrapolate(self.year_fractions[start:stop])
+        zero_rate[0] = zero_rate[1]
+        self.zero_rate = zero_rate
+        self.discount_factor = (1 + zero_rate) ** (-self.year_fractions)
+        # Annual forward rate from each day to the next one, the last day repeats the one before
+        forward_rate = np.empty(n_days + 1)
+        forward_rate[:-1] = (self.discount_factor[:-1] / self.discount_factor[1:]) ** 365.25 - 1
+        forward_rate[-1] = forward_rate[-2]
+        self.forward_rate = forward_rate
+
+    def _extrapolate(self, year_fractions: np.ndarray) -> np.ndarray:
+        return self.curves.SWExtrapolate(year_fractions, self.m_obs, self.b, self.curves.ufr, self.alpha)
+
+    def _grid_position(self, dates) -> np.ndarray:
+        position = (np.asarray(dates, dtype="datetime64[D]") - self.start_day).astype(np.int64)
+        if position.size and (position.min() < 0 or position.max() >= self.year_fractions.size):
+            raise ValueError("Dates must be between the modelling date and the horizon of the discount curve")
+        return position
+
+    def zero_rates_on(self, dates) -> np.ndarray:
+        return self.zero_rate[self._grid_position(dates)]
+
+    def discount_factors_on(self, dates) -> np.ndarray:
+        return self.discount_factor[self._grid_position(dates)]
+
+    def forward_rates_on(self, dates) -> np.ndarray:
+        return self.forward_rate[self._grid_position(dates)]
+
+    def zero_rates(self, year_fractions) -> np.ndarray:
+        """
+        Zero rates for year fractions from the modelling date, interpolated on the grid. Can be passed wherever a
+        zero rate function is expected, for example CorpBondArrayPortfolio.price(modelling_date,
+        discount_curve.zero_rates).
+
+        :type year_fractions: numpy.ndarray
+        :rtype numpy.ndarray
+        """
+        year_fractions = np.asarray(year_fractions, dtype=float)
+        rates = np.interp(year_fractions, self.year_fractions, self.zero_rate)
+        beyond = year_fractions > self.horizon
+        if beyond.any():
+            rates[beyond] = self._extrapolate(year_fractions[beyond])
+        return rates
+
+    def discount_factors(self, year_fractions) -> np.ndarray:
+        year_fractions = np.asarray(year_fractions, dtype=float)
+        return (1 + self.zero_rates(year_fractions)) ** (-year_fractions)
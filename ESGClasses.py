@@ -0,0 +1,255 @@
+import numpy as np
+from dataclasses import dataclass
+from Curves import Curves
+
+
+def block_stream(seed_sequence: np.random.SeedSequence, block: int) -> np.random.Generator:
+    """
+    Random stream of scenario block number block, the same as child number block of seed_sequence.spawn, so any
+    block can be drawn on its own and in any order.
+    """
+    child = np.random.SeedSequence(seed_sequence.entropy, spawn_key=seed_sequence.spawn_key + (block,),
+                                   pool_size=seed_sequence.pool_size)
+    return np.random.default_rng(child)
+
+
+def chunk_ranges(n_scenarios: int, chunk_size: int, memory_budget: int, bytes_per_scenario: int,
+                 block_size: int) -> list:
+    """
+    Splits scenarios 0 to n_scenarios - 1 into [start, stop] ranges of chunk_size scenarios. Without a chunk size
+    the chunks are the largest multiple of the block size within the memory budget, or all scenarios at once if
+    there is no budget.
+    """
+    if chunk_size is None:
+        if memory_budget is None:
+            chunk_size = max(n_scenarios, 1)
+        else:
+            chunk_size = memory_budget // bytes_per_scenario
+            if chunk_size >= block_size:
+                chunk_size -= chunk_size % block_size  # Whole blocks, no stream is drawn twice
+            if chunk_size <= 0:
+                raise ValueError("Memory budget is smaller than one scenario")
+    return [[start, min(start + chunk_size, n_scenarios)] for start in range(0, n_scenarios, chunk_size)]
+
+
+@dataclass
+class ScenarioChunk:
+    """
+    Risk neutral interest rate scenarios start, start + 1, ..., start + n - 1 made by
+    EconomicScenarioGenerator.generate. Column k of the arrays belongs to the time times[k], column 0 to the
+    modelling date.
+    """
+    start: int  # Number of the first scenario of the chunk
+    times: np.ndarray  # Projection times in years
+    short_rate: np.ndarray  # Scenarios x times, continuously compounded short rate
+    deflator: np.ndarray  # Scenarios x times, exp(-integral of the short rate from 0 to the time)
+
+    def __len__(self) -> int:
+        return self.short_rate.shape[0]
+
+    @property
+    def scenarios(self) -> np.ndarray:
+        return np.arange(self.start, self.start + len(self))
+
+
+class HullWhite:
+    def __init__(self, curves: Curves, mean_reversion: float, volatility: float, bump: float = 1e-4):
+        """
+        Hull-White one factor short rate model dr = (theta(t) - a r) dt + sigma dW fitted to a calibrated
+        Smith-Wilson curve. The short rate is r(t) = x(t) + phi(t), where x is an Ornstein-Uhlenbeck process starting
+        at 0 and phi(t) = f(0, t) + sigma^2 / (2 a^2) (1 - exp(-a t))^2 makes the model reprice the zero coupon bonds
+        of the curve.
+
+        Parameters
+        ----------
+        :type curves: Curves
+            Calibrated curve with M_Obs, b and alpha filled in, for example from calibrate_curves.
+        :type mean_reversion: float
+            Mean reversion speed a, greater than 0.
+        :type volatility: float
+            Volatility sigma of the short rate.
+        :type bump: float
+            Step in years of the central difference used for the instantaneous forward rates f(0, t).
+        """
+        if mean_reversion <= 0:
+            raise ValueError("Mean reversion must be greater than 0")
+        if np.size(curves.b) == 0:
+            raise ValueError("Curve " + str(curves.Country) + " must be calibrated before it can be simulated")
+        self.curves = curves
+        self.a = float(mean_reversion)
+        self.sigma = float(volatility)
+        self.bump = bump
+
+    def log_discount(self, times) -> np.ndarray:
+        """
+        log P(0, t) of the Smith-Wilson curve, with annually compounded zero rates.
+
+        :type times: numpy.ndarray
+        :rtype numpy.ndarray
+        """
+        times = np.asarray(times, dtype=float)
+        log_discount = np.zeros(times.shape)
+        positive = times > 0
+        rates = self.curves.SWExtrapolate(times[positive], np.asarray(self.curves.M_Obs, dtype=float),
+                                          np.asarray(self.curves.b, dtype=float), self.curves.ufr,
+                                          float(self.curves.alpha))
+        log_discount[positive] = -times[positive] * np.log1p(rates)
+        return log_discount
+
+    def forward_rates(self, times) -> np.ndarray:
+        """
+        Instantaneous forward rates f(0, t) = -d log P(0, t) / dt, by central differences (one sided at t = 0).
+
+        :type times: numpy.ndarray
+        :rtype numpy.ndarray
+        """
+        times = np.asarray(times, dtype=float)
+        lower = np.maximum(times - self.bump, 0)
+        upper = lower + 2 * self.bump
+        return (self.log_discount(lower) - self.log_discount(upper)) / (upper - lower)
+
+    def _variance_integral(self, times) -> np.ndarray:
+        # Variance of the integral of x from 0 to t divided by sigma^2 / a^2
+        a = self.a
+        return times - 2 * (1 - np.exp(-a * times)) / a + (1 - np.exp(-2 * a * times)) / (2 * a)
+
+    def phi(self, times) -> np.ndarray:
+        """
+        Deterministic part phi(t) of the short rate.
+
+        :type times: numpy.ndarray
+        :rtype numpy.ndarray
+        """
+        times = np.asarray(times, dtype=float)
+        return self.forward_rates(times) + self.sigma ** 2 / (2 * self.a ** 2) * (1 - np.exp(-self.a * times)) ** 2
+
+    def phi_integral(self, times) -> np.ndarray:
+        """
+        Integral of phi from 0 to t, -log P(0, t) + sigma^2 / (2 a^2) V(t), so that the expected deflator is P(0, t).
+
+        :type times: numpy.ndarray
+        :rtype numpy.ndarray
+        """
+        times = np.asarray(times, dtype=float)
+        return -self.log_discount(times) + self.sigma ** 2 / (2 * self.a ** 2) * self._variance_integral(times)
+
+    def step_covariance(self, time_step: float) -> list:
+        """
+        Exact transition of x over one step: x(t + dt) = exp(-a dt) x(t) + e1 and the integral of x over the step is
+        (1 - exp(-a dt)) / a x(t) + e2, where (e1, e2) are jointly normal.
+
+        Returns
+        -------
+        :rtype list with two elements:
+            decay: numpy array [exp(-a dt), (1 - exp(-a dt)) / a].
+            covariance: 2 x 2 numpy array, covariance of (e1, e2).
+        """
+        a, sigma, dt = self.a, self.sigma, float(time_step)
+        e1 = np.exp(-a * dt)
+        var_x = sigma ** 2 / (2 * a) * (1 - np.exp(-2 * a * dt))
+        var_integral = sigma ** 2 / a ** 2 * self._variance_integral(dt)
+        covariance = sigma ** 2 / (2 * a ** 2) * (1 - e1) ** 2
+        return [np.array([e1, (1 - e1) / a]), np.array([[var_x, covariance], [covariance, var_integral]])]
+
+
+class EconomicScenarioGenerator:
+    def __init__(self, model: HullWhite, n_steps: int, time_step: float = 1.0, seed=None, block_size: int = 1024):
+        """
+        Generates risk neutral short rate scenarios of a Hull-White model on an equally spaced time grid. The
+        scenarios are simulated with the exact transition of the model, so the mean of the deflators converges to
+        the discount factors of the curve without discretisation bias.
+
+        The random numbers of scenario blocks 0-1023, 1024-2047, ... come from independent streams spawned from one
+        numpy SeedSequence. A scenario therefore does not depend on how the scenarios are split into chunks or on
+        which process generates it, and any range of scenarios can be generated on its own.
+
+        Parameters
+        ----------
+        :type model: HullWhite
+        :type n_steps: int
+            Number of projection steps.
+        :type time_step: float
+            Length of a step in years.
+        :type seed: int or numpy.random.SeedSequence
+            Seed of the scenario set; by default fresh entropy is drawn, see seed_sequence.entropy to reproduce it.
+        :type block_size: int
+            Number of scenarios sharing one random stream.
+        """
+        if n_steps <= 0:
+            raise ValueError("Number of steps must be greater than 0")
+        if block_size <= 0:
+            raise ValueError("Block size must be greater than 0")
+        self.model = model
+        self.n_steps = n_steps
+        self.time_step = float(time_step)
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.block_size = block_size
+
+        self.times = np.arange(n_steps + 1) * self.time_step
+        self.phi = model.phi(self.times)
+        self.phi_integral = model.phi_integral(self.times)
+        [self.decay, covariance] = model.step_covariance(self.time_step)
+        self.cholesky = np.linalg.cholesky(covariance) if model.sigma > 0 else np.zeros((2, 2))
+
+    def bytes_per_scenario(self) -> int:
+        # Short rates and deflators of one scenario, and the random numbers used to make them
+        return 8 * (self.n_steps + 1) * 2 + 8 * self.n_steps * 2
+
+    def _shocks(self, start: int, stop: int) -> np.ndarray:
+        # Standard normal numbers of scenarios start to stop - 1, scenarios x steps x 2. A block stream yields its
+        # scenarios in order, so the scenarios of the block before start are drawn into the output and overwritten,
+        # and drawing stops at stop: no more than the chunk is ever held in memory
+        shocks = np.empty((stop - start, self.n_steps, 2))
+        for block in range(start // self.block_size, (stop - 1) // self.block_size + 1):
+            block_start = block * self.block_size
+            first = max(start, block_start)
+            last = min(stop, block_start + self.block_size)
+            rows = shocks[first - start:last - start]
+            stream = block_stream(self.seed_sequence, block)
+            for skipped in range(block_start, first, last - first):
+                stream.standard_normal(out=rows[:min(last - first, first - skipped)])
+            stream.standard_normal(out=rows)
+        return shocks
+
+    def simulate(self, start: int, stop: int) -> ScenarioChunk:
+        """
+        Scenarios start, start + 1, ..., stop - 1.
+
+        :type start: int
+        :type stop: int
+        :rtype ScenarioChunk
+        """
+        if not 0 <= start < stop:
+            raise ValueError("Scenario range must not be empty and must start at 0 or later")
+        n_scenarios = stop - start
+        noise = self._shocks(start, stop) @ self.cholesky.transpose()  # Correlated (e1, e2) of every step
+
+        x = np.zeros((n_scenarios, self.n_steps + 1))
+        integral = np.zeros((n_scenarios, self.n_steps + 1))  # Integral of x from 0 to each time
+        for step in range(self.n_steps):
+            integral[:, step + 1] = integral[:, step] + self.decay[1] * x[:, step] + noise[:, step, 1]
+            x[:, step + 1] = self.decay[0] * x[:, step] + noise[:, step, 0]
+
+        return ScenarioChunk(start=start, times=self.times, short_rate=x + self.phi,
+                             deflator=np.exp(-(integral + self.phi_integral)))
+
+    def generate(self, n_scenarios: int, chunk_size: int = None, memory_budget: int = None):
+        """
+        Generates n_scenarios scenarios in chunks, so that only one chunk is held in memory at a time.
+
+        Parameters
+        ----------
+        :type n_scenarios: int
+        :type chunk_size: int
+            Number of scenarios per chunk; by default the largest multiple of the block size within the memory
+            budget, or all scenarios at once if there is no budget.
+        :type memory_budget: int
+            Maximum size of a chunk in bytes.
+
+        Returns
+        -------
+        :rtype generator of ScenarioChunk
+        """
+        for [start, stop] in chunk_ranges(n_scenarios, chunk_size, memory_budget, self.bytes_per_scenario(),
+                                          self.block_size):
+            yield self.simulate(start, stop)
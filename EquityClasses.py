@@ -6,7 +6,9 @@ from datetime import date
 from dataclasses import dataclass
 from dateutil.relativedelta import relativedelta
 from FrequencyClass import Frequency
+from ScheduleClasses import generate_schedule, generate_schedules
 from TraceClass import Trace, tracer
+from CashFlowClasses import build_cash_flow_matrix
 
 
 @dataclass
@@ -46,14 +48,8 @@ class EquityShare:
         :type end_date: date
         
         """
-        delta = relativedelta(months=(12 // self.frequency))
-        this_date = self.issue_date - delta
-        while this_date < end_date:  # Coupon payment dates
-            this_date = this_date + delta
-            if this_date < modelling_date:  # Not interested in past payments
-                continue
-            if this_date <= end_date:
-                yield this_date  # ? What is the advantage of yield here?
+        # Dividend payment dates on or after the modelling date, past payments are skipped arithmetically
+        yield from generate_schedule(self.issue_date, end_date, self.frequency, modelling_date).tolist()
 
 
 class EquitySharePortfolio():
@@ -314,35 +310,17 @@ class EquitySharePortfolio():
             cash_flow_matrix
         """
 
-        # define list of unique dates
-        unique_dates = []
+        # define set of unique dates (a set avoids searching the list of dates found so far for every cash flow)
+        unique_dates = set()
         for one_dividend_array in cashflow_profile:
-            for one_dividend_date in list(one_dividend_array.keys()):  # for each dividend date of the selected equity
-                if one_dividend_date in unique_dates:  # If two cash flows on same date
-                    pass
-                    # Do nothing since dividend amounts are calibrated afterwards for equity
-                    # dividends[dividend_date] = dividend_amount + dividends[dividend_date] # ? Why is here a plus? (you agregate coupon amounts if same date?)
-                else:  # New cash flow date
-                    unique_dates.append(one_dividend_date)
+            unique_dates.update(one_dividend_array.keys())
 
         return sorted(unique_dates)
 
     def cash_flow_profile_list_to_matrix(self, cash_flow_profile: list) -> list:
 
         unique_dates = self.unique_dates_profile(cash_flow_profile)
-        width = len(unique_dates)
-        height = len(cash_flow_profile)
-
-        cash_flow_matrix = np.zeros((height, width))
-        row = 0
-        for one_cash_flow_array in cash_flow_profile:
-            count = 0
-            values = list(one_cash_flow_array.values())
-            for one_cash_flow in one_cash_flow_array:
-                column = unique_dates.index(one_cash_flow)
-                cash_flow_matrix[row, column] = values[count]
-                count += 1
-            row += 1
+        cash_flow_matrix = build_cash_flow_matrix(cash_flow_profile, unique_dates)
         return [
             unique_dates,
             cash_flow_matrix]
@@ -486,6 +464,155 @@ class EquitySharePortfolio():
 # Missing create cash flows
 
 
+class EquityShareArrayPortfolio():
+    def __init__(self, asset_id, nace, issue_date, dividend_yield, frequency, market_price, growth_rate):
+        """
+        Initialize a portfolio of equity shares stored column by column, the counterpart of CorpBondArrayPortfolio.
+        Each attribute of the shares is held in a numpy array with one element per share. The cash flow methods give
+        the same output as those of EquitySharePortfolio, with the dividend schedules of all shares generated at once.
+
+        Parameters
+        ----------
+        :type asset_id: array-like of int
+        :type nace: array-like of str
+            Stored as integer codes (nace_code) into the array of distinct NACE codes (nace_categories).
+        :type issue_date: array-like of datetime.date or numpy.datetime64
+        :type dividend_yield: array-like of float
+        :type frequency: array-like of Frequency
+        :type market_price: array-like of float
+        :type growth_rate: array-like of float
+        """
+        self.asset_id = np.asarray(asset_id, dtype=np.int64)
+        [self.nace_categories, nace_code] = np.unique(np.asarray(nace, dtype=str), return_inverse=True)
+        self.nace_code = nace_code.astype(np.int32)
+        self.issue_date = np.asarray(issue_date, dtype="datetime64[D]")
+        self.dividend_yield = np.asarray(dividend_yield, dtype=float)
+        self.frequency = np.asarray(frequency, dtype=np.int8)
+        self.market_price = np.asarray(market_price, dtype=float)
+        self.growth_rate = np.asarray(growth_rate, dtype=float)
+        self.validate()
+
+    @classmethod
+    def from_shares(cls, equity_shares):
+        """
+        Build the portfolio in bulk from EquityShare instances, for example the generator returned by
+        ImportData.get_EquityShare or the values of EquitySharePortfolio.equity_share.
+
+        :type equity_shares: iterable of EquityShare
+        """
+        equity_shares = list(equity_shares)
+        return cls(asset_id=[equity_share.asset_id for equity_share in equity_shares],
+                   nace=[equity_share.nace for equity_share in equity_shares],
+                   issue_date=[equity_share.issue_date for equity_share in equity_shares],
+                   dividend_yield=[equity_share.dividend_yield for equity_share in equity_shares],
+                   frequency=[equity_share.frequency for equity_share in equity_shares],
+                   market_price=[equity_share.market_price for equity_share in equity_shares],
+                   growth_rate=[equity_share.growth_rate for equity_share in equity_shares])
+
+    def __len__(self) -> int:
+        return self.asset_id.size
+
+    @property
+    def nace(self) -> np.ndarray:
+        return self.nace_categories[self.nace_code]
+
+    def IsEmpty(self) -> bool:
+        return len(self) == 0
+
+    def validate(self) -> None:
+        """
+        Check all shares at once. A single ValueError lists every rule that is broken together with the asset ids of
+        the offending shares.
+        """
+        frequencies = [Frequency.MONTHLY, Frequency.QUARTERLY, Frequency.TRIANNUAL, Frequency.BIANNUAL,
+                       Frequency.ANNUAL]
+        [_, position, count] = np.unique(self.asset_id, return_inverse=True, return_counts=True)
+        checks = [(self.asset_id <= 0, "Asset ID must be greater than 0"),
+                  (count[position] > 1, "Asset ID must be unique"),
+                  (self.market_price < 0, "Market price cannot be negative"),
+                  (~np.isin(self.frequency, frequencies),
+                   "Frequency must be either Monthly, Quarterly,Triannual, SemiAnnual or Annual")]
+
+        errors = []
+        for failed, message in checks:
+            if failed.any():
+                errors.append(message + " (asset ids: " + str(self.asset_id[failed].tolist()) + ")")
+        if errors:
+            raise ValueError("\n".join(errors))
+
+    def generate_market_value(self, modelling_date: date, evaluated_date) -> np.ndarray:
+        """
+        Market value of the shares at the evaluated dates, grown at their growth rates as in
+        EquityShare.generate_market_value.
+
+        :type modelling_date: datetime.date
+        :type evaluated_date: datetime.date or numpy datetime64 array with one date per share
+        :rtype numpy.ndarray
+        """
+        days = (np.asarray(evaluated_date, dtype="datetime64[D]") - np.datetime64(modelling_date, "D"))
+        return self.market_price * (1 + self.growth_rate) ** (days.astype(np.int64) / 365.5)
+
+    def _per_share(self, owner: np.ndarray, dates: np.ndarray, amounts: np.ndarray) -> list:
+        # One {date: amount} dictionary per share from the flat arrays of cash flows sorted by share
+        bounds = np.searchsorted(owner, np.arange(len(self) + 1))
+        dates = dates.tolist()
+        amounts = amounts.tolist()
+        return [dict(zip(dates[start:stop], amounts[start:stop])) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def create_dividend_dates(self, modelling_date: date, end_date: date) -> list:
+        """
+        Dividend dates and amounts of all shares on or after the modelling date but not after the end date. Same
+        output as EquitySharePortfolio.create_dividend_dates.
+
+        :type modelling_date: datetime.date
+        :type end_date: datetime.date
+        :rtype list of dictionaries with date keys and dividend amount values, one per share
+        """
+        [owner, dividend_dates] = generate_schedules(self.issue_date, np.full(len(self), end_date, "datetime64[D]"),
+                                                     self.frequency, modelling_date)
+        days = (dividend_dates - np.datetime64(modelling_date, "D")).astype(np.int64)
+        market_value = self.market_price[owner] * (1 + self.growth_rate[owner]) ** (days / 365.5)
+        return self._per_share(owner, dividend_dates, market_value * self.dividend_yield[owner])
+
+    def create_terminal_dates(self, modelling_date: date, terminal_date: date, terminal_rate: float) -> list:
+        """
+        Terminal cash flow of all shares, paid on the terminal date. Same output as
+        EquitySharePortfolio.create_terminal_dates.
+
+        :type modelling_date: datetime.date
+        :type terminal_date: datetime.date
+        :type terminal_rate: float
+        :rtype list of dictionaries with the terminal date as key and the terminal amount as value, one per share
+        """
+        amounts = self.generate_market_value(modelling_date, terminal_date) / (terminal_rate - self.growth_rate)
+        return [{terminal_date: amount} for amount in amounts.tolist()]
+
+    def unique_dates_profile(self, cashflow_profile: List) -> list:
+        """
+        Sorted list of the dates at which any share in the portfolio has a cash flow.
+
+        :type cashflow_profile: list of dictionaries as returned by create_dividend_dates or create_terminal_dates
+        :rtype list
+        """
+        unique_dates = set()
+        for one_profile in cashflow_profile:
+            unique_dates.update(one_profile.keys())
+        return sorted(unique_dates)
+
+    def init_equity_portfolio_to_dataframe(self, modelling_date: date) -> list:
+        """
+        Market prices and growth rates of the shares at the modelling date, as single column data frames indexed by
+        asset id. Same output as EquitySharePortfolio.init_equity_portfolio_to_dataframe.
+
+        :type modelling_date: datetime.date
+        :rtype list with two pandas.DataFrame: market_price, growth_rate
+        """
+        index = self.asset_id.tolist()
+        market_price = pd.DataFrame(data=self.market_price, index=index, columns=[modelling_date])
+        growth_rate = pd.DataFrame(data=self.growth_rate, index=index, columns=[modelling_date])
+        return [market_price, growth_rate]
+
+
 # class Equity:
 #    def __init__(self, nace, issuedate, issuername, dividendyield, frequency, marketprice,terminalvalue,enddate):
 #        """
@@ -1,15 +1,18 @@
 import os
+import numpy as np
 import pandas as pd
 import csv
 import configparser
 from ConfigurationClass import Configuration
-from BondClasses import CorpBond
-from EquityClasses import EquityShare
+from BondClasses import CorpBond, CorpBondArrayPortfolio
+from EquityClasses import EquityShare, EquityShareArrayPortfolio
 from SettingsClasses import Settings
 from datetime import datetime
 from CashClass import Cash
 from LiabilityClasses import Liability
 
+DATE_FORMAT = "%d/%m/%Y"
+
 
 def get_configuration(ini_file: str, op_sys, config_parser=configparser.ConfigParser()) -> Configuration:
     """
@@ -25,7 +28,11 @@ def get_configuration(ini_file: str, op_sys, config_parser=configparser.ConfigPa
         configuration.base_folder = op_sys.getcwd()
 
     if "TRACE" in config_parser:
-        configuration.trace_enabled = bool(config_parser["TRACE"]["enabled"])
+        trace = config_parser["TRACE"]
+        configuration.trace_enabled = trace.getboolean("enabled", fallback=False)
+        configuration.profile_enabled = trace.getboolean("profile", fallback=False)
+        configuration.profile_interval = trace.getfloat("profile_interval", fallback=0.005)
+        configuration.profile_memory = trace.getboolean("profile_memory", fallback=True)
     else:
         configuration.trace_enabled = False
 
@@ -38,6 +45,9 @@ def get_configuration(ini_file: str, op_sys, config_parser=configparser.ConfigPa
                                                                      intermediate["cash_portfolio_file"])
         configuration.intermediate_equity_portfolio_file = op_sys.path.join(intermediate_path,
                                                                             intermediate["equity_portfolio_file"])
+        configuration.input_cache_enabled = intermediate.getboolean("input_cache", fallback=False)
+        configuration.input_cache_path = op_sys.path.join(intermediate_path,
+                                                          intermediate.get("input_cache_folder", "input_cache"))
 
     else:
         configuration.intermediate_enabled = False
@@ -58,19 +68,56 @@ def get_configuration(ini_file: str, op_sys, config_parser=configparser.ConfigPa
     return configuration
 
 
-def import_SWEiopa(selected_param_file, selected_curves_file, country):
-    param_raw = pd.read_csv(selected_param_file, sep=",", index_col=0)
+def _read_frame(filename: str, cache=None) -> pd.DataFrame:
+    # EIOPA files are read with the country columns and the first column as index, from the input cache if given
+    if cache is None:
+        return pd.read_csv(filename, sep=",", index_col=0)
+    return cache.frame(filename)
+
+
+def import_SWEiopa(selected_param_file, selected_curves_file, country, cache=None):
+    param_raw = _read_frame(selected_param_file, cache)
     maturities_country_raw = param_raw.loc[:, country + "_Maturities"].iloc[6:]
     param_country_raw = param_raw.loc[:, country + "_Values"].iloc[6:]
     extra_param = param_raw.loc[:, country + "_Values"].iloc[:6]
     relevant_positions = pd.notna(maturities_country_raw.values)
     maturities_country = maturities_country_raw.iloc[relevant_positions]
     Qb = param_country_raw.iloc[relevant_positions]
-    curve_raw = pd.read_csv(selected_curves_file, sep=",", index_col=0)
+    curve_raw = _read_frame(selected_curves_file, cache)
     curve_country = curve_raw.loc[:, country]
     return [maturities_country, curve_country, extra_param, Qb]
 
 
+def import_SWEiopa_all(selected_param_file, selected_curves_file, cache=None):
+    """
+    Imports the parameters and curves of every country in the EIOPA files, reading each file only once.
+
+    :type selected_param_file: str
+    :type selected_curves_file: str
+    :type cache: InputCacheClass.InputCache
+        Optional cache the files are read from.
+    :rtype list with four elements:
+        maturities: dict country -> pandas Series of liquid maturities, as maturities_country of import_SWEiopa.
+        curves: pandas DataFrame with the curve of each country in its column, as curve_country of import_SWEiopa.
+        extra_param: pandas DataFrame with the extra parameters (UFR, alpha, ...) of each country in its column.
+        Qb: dict country -> pandas Series, as Qb of import_SWEiopa.
+    """
+    param_raw = _read_frame(selected_param_file, cache)
+    curves = _read_frame(selected_curves_file, cache)
+    countries = [column[:-len("_Maturities")] for column in param_raw.columns if column.endswith("_Maturities")]
+    extra_param = param_raw.loc[:, [country + "_Values" for country in countries]].iloc[:6]
+    extra_param.columns = countries
+
+    maturities = {}
+    Qb = {}
+    for country in countries:
+        maturities_country_raw = param_raw.loc[:, country + "_Maturities"].iloc[6:]
+        relevant_positions = pd.notna(maturities_country_raw.values)
+        maturities[country] = maturities_country_raw.iloc[relevant_positions]
+        Qb[country] = param_raw.loc[:, country + "_Values"].iloc[6:].iloc[relevant_positions]
+    return [maturities, curves, extra_param, Qb]
+
+
 def get_corporate_bonds(filename: str) -> CorpBond:
     with open(filename, mode="r", encoding="utf-8-sig") as csv_file:
         reader = csv.DictReader(csv_file)
@@ -89,6 +136,16 @@ def get_corporate_bonds(filename: str) -> CorpBond:
             yield corp_bond
 
 
+def get_sector_spread(filename: str) -> dict:
+    """
+    :type filename: str
+    """
+    with open(filename, mode="r", encoding="utf-8-sig") as csv_file:
+        reader = csv.DictReader(csv_file)
+        spread_by_nace = {row["NACE"]: float(row["sSpread"]) for row in reader}
+    return spread_by_nace
+
+
 def get_EquityShare(filename: str):
     """
     :type filename: str
@@ -133,11 +190,136 @@ def get_Liability(filename: str) -> Liability:
         for row in reader:
             cash_flow_date.append(datetime.strptime(row["Liability_Date"], '%d/%m/%Y').date())
             cash_flow_series.append(float(row["Liability_Size"]))
-        liabilities = Liability(liability_id=liability_id, cash_flow_dates=cash_flow_date,
-                                cash_flow_series=cash_flow_series)
+        liabilities = Liability(liability_id=liability_id,
+                                cash_flow_dates=np.array(cash_flow_date, dtype="datetime64[D]"),
+                                cash_flow_series=np.array(cash_flow_series, dtype=float))
         return liabilities
 
 
+def read_columns(filename: str, dates=(), integers=(), floats=(), strings=()) -> dict:
+    """
+    Reads the named columns of a csv input file in one pass and converts each of them to a typed numpy array. Dates
+    in the DATE_FORMAT are parsed once per distinct value. Nothing is converted row by row; instead every value that
+    is missing or cannot be converted is collected and a single ValueError lists, per column, the line numbers of the
+    file where the bad values are.
+
+    Parameters
+    ----------
+    :type filename: str
+    :type dates: iterable of str
+        Columns returned as numpy.datetime64[D].
+    :type integers: iterable of str
+        Columns returned as int64, the values must be whole numbers.
+    :type floats: iterable of str
+        Columns returned as float.
+    :type strings: iterable of str
+        Columns returned as str, the values cannot be empty.
+
+    Returns
+    -------
+    :rtype dict column name -> numpy.ndarray
+    """
+    names = list(dates) + list(integers) + list(floats) + list(strings)
+    raw = pd.read_csv(filename, encoding="utf-8-sig", skipinitialspace=True,
+                      dtype={name: str for name in list(dates) + list(strings)})
+    missing_columns = [name for name in names if name not in raw.columns]
+    if missing_columns:
+        raise ValueError(filename + ": missing columns " + str(missing_columns))
+
+    columns = {}
+    invalid = {}
+    for name in names:
+        column = raw[name]
+        if name in dates:
+            # Dates repeat a lot, so only the distinct values are parsed
+            [codes, distinct] = pd.factorize(column.str.strip())
+            parsed = pd.to_datetime(distinct, format=DATE_FORMAT, errors="coerce").to_numpy(dtype="datetime64[D]")
+            values = np.append(parsed, np.datetime64("NaT"))[codes]  # Code -1 (missing value) is NaT
+            bad = np.isnat(values)
+        elif name in strings:
+            values = column.fillna("").str.strip().to_numpy(dtype=str)
+            bad = values == ""
+        else:
+            # The csv parser already typed the column unless it holds values that are not numbers
+            if not pd.api.types.is_numeric_dtype(column):
+                column = pd.to_numeric(column, errors="coerce")
+            values = column.to_numpy(dtype=float)
+            bad = np.isnan(values)
+            if name in integers:
+                bad |= values % 1 != 0
+                values = np.where(bad, 0, values).astype(np.int64)
+        columns[name] = values
+        if bad.any():
+            invalid[name] = np.flatnonzero(bad) + 2  # Line numbers in the file, the header is line 1
+
+    if invalid:
+        raise ValueError("\n".join(filename + ": invalid " + name + " on lines " + str(lines.tolist())
+                                   for name, lines in invalid.items()))
+    return columns
+
+
+def _read_typed_columns(filename: str, cache=None, **spec) -> dict:
+    # read_columns, from the input cache if given
+    if cache is None:
+        return read_columns(filename, **spec)
+    return cache.columns(filename, **spec)
+
+
+def read_corporate_bonds(filename: str, cache=None) -> CorpBondArrayPortfolio:
+    """
+    Bulk loader of a bond portfolio file (the format of get_corporate_bonds) straight into a CorpBondArrayPortfolio.
+    All bonds are validated at once and a single ValueError lists every broken rule.
+
+    :type filename: str
+    :type cache: InputCacheClass.InputCache
+        Optional cache the file is read from.
+    :rtype CorpBondArrayPortfolio
+    """
+    columns = _read_typed_columns(filename, cache, dates=["Issue_Date", "Maturity_Date"],
+                                  integers=["Asset_ID", "Frequency"],
+                                  floats=["Coupon_Rate", "Notional_Amount", "Recovery_Rate", "Default_Probability",
+                                          "Market_Price"], strings=["NACE"])
+    return CorpBondArrayPortfolio(asset_id=columns["Asset_ID"], nace=columns["NACE"],
+                                  issue_date=columns["Issue_Date"], maturity_date=columns["Maturity_Date"],
+                                  coupon_rate=columns["Coupon_Rate"], notional_amount=columns["Notional_Amount"],
+                                  frequency=columns["Frequency"], recovery_rate=columns["Recovery_Rate"],
+                                  default_probability=columns["Default_Probability"],
+                                  market_price=columns["Market_Price"])
+
+
+def read_equity_shares(filename: str, cache=None) -> EquityShareArrayPortfolio:
+    """
+    Bulk loader of an equity portfolio file (the format of get_EquityShare) straight into an
+    EquityShareArrayPortfolio, which validates all shares at once.
+
+    :type filename: str
+    :type cache: InputCacheClass.InputCache
+        Optional cache the file is read from.
+    :rtype EquityShareArrayPortfolio
+    """
+    columns = _read_typed_columns(filename, cache, dates=["Issue_Date"], integers=["Asset_ID", "Frequency"],
+                                  floats=["Dividend_Yield", "Market_Price", "Growth_Rate"], strings=["NACE"])
+    return EquityShareArrayPortfolio(asset_id=columns["Asset_ID"], nace=columns["NACE"],
+                                     issue_date=columns["Issue_Date"], dividend_yield=columns["Dividend_Yield"],
+                                     frequency=columns["Frequency"], market_price=columns["Market_Price"],
+                                     growth_rate=columns["Growth_Rate"])
+
+
+def read_liability(filename: str, cache=None) -> Liability:
+    """
+    Bulk loader of a liability cash flow file (the format of get_Liability). The dates and sizes of the cash flows
+    are kept as numpy arrays (datetime64[D] and float).
+
+    :type filename: str
+    :type cache: InputCacheClass.InputCache
+        Optional cache the file is read from.
+    :rtype Liability
+    """
+    columns = _read_typed_columns(filename, cache, dates=["Liability_Date"], floats=["Liability_Size"])
+    return Liability(liability_id=1, cash_flow_dates=columns["Liability_Date"],
+                     cash_flow_series=columns["Liability_Size"])
+
+
 def get_settings(filename: str) -> Settings:
     """
     :type filename: str
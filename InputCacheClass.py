@@ -0,0 +1,154 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+from ImportData import read_columns
+
+# Bumped whenever the layout of the cache changes, older caches are then rebuilt
+CACHE_VERSION = 1
+
+
+def file_hash(filename: str) -> str:
+    """
+    SHA-256 of the content of a file, read in blocks of 1 MB.
+
+    :type filename: str
+    :rtype str
+    """
+    digest = hashlib.sha256()
+    with open(filename, mode="rb") as source:
+        for block in iter(lambda: source.read(2 ** 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class InputCache:
+    def __init__(self, directory: str, enabled: bool = True):
+        """
+        Cache of the input files in a binary columnar format. On the first read of a file its columns are converted
+        to typed numpy arrays and each array is saved as a .npy file in a folder of its own under directory; later
+        reads memory-map those files instead of parsing the csv file again. A cached copy is used as long as the size
+        and modification time of the source file are unchanged. If they changed but the content (SHA-256) did not,
+        for example after a checkout, the cached copy is kept; otherwise it is rebuilt. A disabled cache reads the
+        source files directly.
+
+        Parameters
+        ----------
+        :type directory: str
+            For example the input_cache folder under Intermediate.
+        :type enabled: bool
+        """
+        self.directory = directory
+        self.enabled = enabled
+        self.builds = 0  # Number of cached copies written, for tests and diagnostics
+
+    def _folder(self, filename: str, kind: str) -> str:
+        # One folder per source file and kind of read, named after the file so that the cache stays readable
+        key = hashlib.sha1((os.path.abspath(filename) + "|" + kind).encode("utf-8")).hexdigest()[:12]
+        name = os.path.splitext(os.path.basename(filename))[0].replace(" ", "_")
+        return os.path.join(self.directory, name + "-" + key)
+
+    @staticmethod
+    def _read_meta(folder: str):
+        try:
+            with open(os.path.join(folder, "meta.json"), mode="r", encoding="utf-8") as meta_file:
+                return json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_meta(folder: str, meta: dict) -> None:
+        # The meta file is written last and replaced atomically, a cache without it is incomplete
+        temporary = os.path.join(folder, "meta.json.tmp")
+        with open(temporary, mode="w", encoding="utf-8") as meta_file:
+            json.dump(meta, meta_file, indent=2)
+        os.replace(temporary, os.path.join(folder, "meta.json"))
+
+    def _is_fresh(self, filename: str, folder: str, kind: str, meta) -> bool:
+        if meta is None or meta.get("version") != CACHE_VERSION or meta.get("kind") != kind:
+            return False
+        status = os.stat(filename)
+        if meta["size"] == status.st_size and meta["mtime_ns"] == status.st_mtime_ns:
+            return True
+        if meta["size"] != status.st_size or meta["sha256"] != file_hash(filename):
+            return False
+        [meta["size"], meta["mtime_ns"]] = [status.st_size, status.st_mtime_ns]
+        self._write_meta(folder, meta)
+        return True
+
+    def _save(self, filename: str, folder: str, kind: str, arrays: dict, extra: dict) -> None:
+        status = os.stat(filename)
+        digest = file_hash(filename)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder)
+        names = list(arrays)
+        for position, name in enumerate(names):
+            np.save(os.path.join(folder, "column_" + str(position) + ".npy"), arrays[name], allow_pickle=False)
+        self._write_meta(folder, dict(extra, version=CACHE_VERSION, kind=kind, source=os.path.abspath(filename),
+                                      size=status.st_size, mtime_ns=status.st_mtime_ns, sha256=digest,
+                                      columns=names))
+        self.builds += 1
+
+    @staticmethod
+    def _load(folder: str, meta: dict) -> dict:
+        return {name: np.load(os.path.join(folder, "column_" + str(position) + ".npy"), mmap_mode="r")
+                for position, name in enumerate(meta["columns"])}
+
+    def columns(self, filename: str, dates=(), integers=(), floats=(), strings=()) -> dict:
+        """
+        Cached ImportData.read_columns: the typed columns of a csv input file. Arrays read from the cache are
+        read-only memory maps.
+
+        :type filename: str
+        :rtype dict column name -> numpy.ndarray
+        """
+        if not self.enabled:
+            return read_columns(filename, dates, integers, floats, strings)
+        kind = "columns:" + json.dumps([list(dates), list(integers), list(floats), list(strings)])
+        folder = self._folder(filename, kind)
+        meta = self._read_meta(folder)
+        if self._is_fresh(filename, folder, kind, meta):
+            return self._load(folder, meta)
+        arrays = read_columns(filename, dates, integers, floats, strings)  # Invalid files raise and are not cached
+        self._save(filename, folder, kind, arrays, {})
+        return arrays
+
+    def frame(self, filename: str) -> pd.DataFrame:
+        """
+        Cached pandas.read_csv(filename, sep=",", index_col=0), the way the EIOPA parameter and curve files are read.
+        The columns of the same dtype are saved together as one matrix, since these files have many short columns.
+        Only frames whose columns are all numeric are cached; other files are read from the csv file every time.
+
+        :type filename: str
+        :rtype pandas.DataFrame
+        """
+        kind = "frame"
+        folder = self._folder(filename, kind)
+        meta = self._read_meta(folder) if self.enabled else None
+        if self._is_fresh(filename, folder, kind, meta):
+            arrays = self._load(folder, meta)
+            index = pd.Index(arrays["index"], dtype=meta["index_dtype"], name=meta["index_name"])
+            blocks = [pd.DataFrame(arrays["block_" + str(position)], index=index, columns=names)
+                      for position, names in enumerate(meta["blocks"])]
+            if len(blocks) == 1:
+                return blocks[0]
+            return pd.concat(blocks, axis=1)[meta["column_order"]]
+
+        frame = pd.read_csv(filename, sep=",", index_col=0)
+        numeric = all(pd.api.types.is_numeric_dtype(dtype) for dtype in frame.dtypes)
+        if self.enabled and numeric and len(frame.columns) > 0:
+            index = frame.index.to_numpy()
+            if index.dtype == object:
+                index = index.astype(str)
+            arrays = {"index": index}
+            blocks = []
+            for dtype in pd.unique(frame.dtypes):
+                names = [name for name in frame.columns if frame[name].dtype == dtype]
+                arrays["block_" + str(len(blocks))] = frame[names].to_numpy()
+                blocks.append(names)
+            self._save(filename, folder, kind, arrays, {"index_name": frame.index.name,
+                                                         "index_dtype": str(frame.index.dtype), "blocks": blocks,
+                                                         "column_order": list(frame.columns)})
+        return frame
@@ -1,23 +1,20 @@
 from dataclasses import dataclass
 from typing import List, Dict, Any
+import numpy as np
 
 
 @dataclass
 class Liability:
     liability_id: int
-    cash_flow_dates: list
-    cash_flow_series: list
+    cash_flow_dates: np.ndarray  # datetime64[D]
+    cash_flow_series: np.ndarray
 
-    def unique_dates_profile(self):
+    def unique_dates_profile(self) -> list:
+        """
+        Dates of the cash flows in order of first occurrence, two cash flows on the same date give one date.
 
-        # define list of unique dates
-        unique_dates = []
-        for one_dividend_date in self.cash_flow_dates:  # for each dividend date of the selected equity
-            if one_dividend_date in unique_dates:  # If two cash flows on same date
-                pass
-                # Do nothing since dividend amounts are calibrated afterwards for equity
-                # dividends[dividend_date] = dividend_amount + dividends[dividend_date] # ? Why is here a plus? (you agregate coupon amounts if same date?)
-            else:  # New cash flow date
-                unique_dates.append(one_dividend_date)
-
-        return unique_dates
+        :rtype list of datetime.date
+        """
+        dates = np.asarray(self.cash_flow_dates, dtype="datetime64[D]")
+        [_, first] = np.unique(dates, return_index=True)
+        return dates[np.sort(first)].tolist()
@@ -0,0 +1,157 @@
+import os
+import sys
+import csv
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from time import perf_counter
+
+
+@dataclass
+class StageStats:
+    name: str
+    seconds: float = 0.0
+    peak_memory: int = 0  # Highest traced memory in bytes while the stage ran, 0 without memory tracing
+    end_memory: int = 0  # Traced memory in bytes at the end of the stage
+    samples: int = 0
+
+
+class Profiler:
+    def __init__(self, enabled: bool = False, interval: float = 0.005, trace_memory: bool = True):
+        """
+        Profiles the stages of a run. Each stage (Profiler.stage) is timed, its peak memory is measured with
+        tracemalloc and a background thread samples the stack of the profiled thread every interval seconds. The
+        samples are kept as collapsed stacks "stage;file:function;...;file:function count", the input format of
+        flamegraph.pl and speedscope. A disabled profiler does nothing.
+
+        Parameters
+        ----------
+        :type enabled: bool
+        :type interval: float
+            Time between two stack samples in seconds.
+        :type trace_memory: bool
+            Measure the peak memory of the stages with tracemalloc, which slows the run down.
+        """
+        if interval <= 0:
+            raise ValueError("Sampling interval must be greater than 0")
+        self.enabled = enabled
+        self.interval = interval
+        self.trace_memory = trace_memory
+        self.stages = {}  # Stage name -> StageStats, in order of first start
+        self.stacks = Counter()
+        self._active = []  # [StageStats, highest peak of the stages inside it] of the stages in progress
+        self._thread_id = None
+        self._sampler = None
+        self._stop = threading.Event()
+        self._started_tracemalloc = False
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Context manager around a stage of the run. Stages can be nested; nested stages are named
+        "outer;inner".
+
+        :type name: str
+        """
+        if not self.enabled:
+            yield
+            return
+        if not self._active:
+            self._start()
+        full_name = ";".join([active[0].name for active in self._active[-1:]] + [name])
+        stats = self.stages.setdefault(full_name, StageStats(full_name))
+        if self.trace_memory:
+            if self._active:  # Keep the peak of the outer stage before resetting it
+                self._active[-1][1] = max(self._active[-1][1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self._active.append([stats, 0])
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            stats.seconds += perf_counter() - start
+            [_, inner_peak] = self._active.pop()
+            if self.trace_memory:
+                [current, peak] = tracemalloc.get_traced_memory()
+                peak = max(peak, inner_peak)
+                stats.peak_memory = max(stats.peak_memory, peak)
+                stats.end_memory = current
+                if self._active:
+                    self._active[-1][1] = max(self._active[-1][1], peak)
+            if not self._active:
+                self._finish()
+
+    def _start(self) -> None:
+        self._thread_id = threading.get_ident()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        self._sampler.start()
+
+    def _finish(self) -> None:
+        self._stop.set()
+        self._sampler.join()
+        self._sampler = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            active = self._active[-1:]  # Read once, the profiled thread changes the list
+            frame = sys._current_frames().get(self._thread_id)
+            if not active or frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(os.path.basename(code.co_filename) + ":" + getattr(code, "co_qualname", code.co_name))
+                frame = frame.f_back
+            stats = active[0][0]
+            stack.append(stats.name)
+            self.stacks[";".join(reversed(stack))] += 1
+            stats.samples += 1
+
+    def collapsed_stacks(self) -> list:
+        """
+        Collapsed stacks "frame;frame;...;frame count", most sampled first.
+
+        :rtype list of str
+        """
+        return [stack + " " + str(count) for stack, count in self.stacks.most_common()]
+
+    def summary(self) -> str:
+        """
+        Table of the time, peak memory and number of samples of each stage.
+
+        :rtype str
+        """
+        lines = ["{:<40} {:>10} {:>14} {:>10}".format("stage", "seconds", "peak MB", "samples")]
+        for stats in self.stages.values():
+            lines.append("{:<40} {:>10.4f} {:>14.3f} {:>10}".format(stats.name, stats.seconds,
+                                                                    stats.peak_memory / 2 ** 20, stats.samples))
+        return "\n".join(lines)
+
+    def write(self, directory: str, prefix: str = "profile") -> list:
+        """
+        Writes the collapsed stacks to <prefix>.collapsed and the stage table to <prefix>_stages.csv.
+
+        :type directory: str
+        :type prefix: str
+        :rtype list with the paths of the two files
+        """
+        os.makedirs(directory, exist_ok=True)
+        stacks_file = os.path.join(directory, prefix + ".collapsed")
+        stages_file = os.path.join(directory, prefix + "_stages.csv")
+        with open(stacks_file, mode="w", encoding="utf-8") as collapsed:
+            collapsed.writelines(line + "\n" for line in self.collapsed_stacks())
+        with open(stages_file, mode="w", encoding="utf-8", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["stage", "seconds", "peak_memory_bytes", "end_memory_bytes", "samples"])
+            for stats in self.stages.values():
+                writer.writerow([stats.name, stats.seconds, stats.peak_memory, stats.end_memory, stats.samples])
+        return [stacks_file, stages_file]
@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+from datetime import date
+from dataclasses import dataclass
+from CashFlowClasses import CashFlowEventQueue, EventType
+
+
+@dataclass
+class ProjectionResult:
+    dates: np.ndarray
+    asset_ids: list
+    bank_account: np.ndarray
+    market_value: np.ndarray
+
+    def to_dataframes(self) -> list:
+        """
+        Convert the projected state arrays into the DataFrames used by the rest of the model.
+
+        Returns
+        -------
+        :rtype list with two elements:
+            bank_account: DataFrame with a single row and one column per projection date.
+            market_price: DataFrame with one row per asset (indexed by asset id) and one column per projection date.
+        """
+        columns = [pd.Timestamp(one_date).date() for one_date in self.dates]
+        bank_account = pd.DataFrame(data=[self.bank_account], columns=columns)
+        market_price = pd.DataFrame(data=self.market_value.transpose(), index=self.asset_ids, columns=columns)
+        return [bank_account, market_price]
+
+
+@dataclass
+class ScenarioProjectionResult:
+    dates: np.ndarray
+    asset_ids: list
+    bank_account: np.ndarray  # Scenario x time
+    market_value: np.ndarray  # Scenario x time x asset
+
+    def __len__(self) -> int:
+        return self.bank_account.shape[0]
+
+    def scenario(self, scenario: int) -> ProjectionResult:
+        """
+        The projection of one scenario.
+
+        :type scenario: int
+        :rtype ProjectionResult
+        """
+        return ProjectionResult(dates=self.dates, asset_ids=self.asset_ids, bank_account=self.bank_account[scenario],
+                                market_value=self.market_value[scenario])
+
+
+class ProjectionEngine:
+    def __init__(self, modelling_date: date, dates_of_interest, asset_ids: list, market_price, growth_rate,
+                 bank_account: float, dividend_dates, dividend_cash_flows, terminal_dates, terminal_cash_flows,
+                 liability_dates, liability_cash_flows):
+        """
+        Initialize the projection engine with the starting state of the portfolio. All the state of the projection
+        is allocated up front as arrays; a time x asset array for the market value of holdings and a time vector for
+        the bank account.
+
+        Parameters
+        ----------
+        :type modelling_date: datetime.date
+            The date at which the projection starts.
+        :type dates_of_interest: list of datetime.date
+            The dates at the end of each projection period.
+        :type asset_ids: list
+            The identifiers of the equity assets, in the row order of the cash-flow matrices.
+        :type market_price: numpy.ndarray
+            Market value of each asset at the modelling date.
+        :type growth_rate: numpy.ndarray
+            Annual growth rate of the market value of each asset.
+        :type bank_account: float
+            Cash available at the modelling date.
+        :type dividend_dates: list of datetime.date
+            Dates of the columns of the dividend cash-flow matrix.
+        :type dividend_cash_flows: numpy.ndarray
+            Asset x date matrix of dividend cash flows.
+        :type terminal_dates: list of datetime.date
+            Dates of the columns of the terminal cash-flow matrix.
+        :type terminal_cash_flows: numpy.ndarray
+            Asset x date matrix of terminal cash flows.
+        :type liability_dates: list of datetime.date
+            Dates at which the liabilities are paid out.
+        :type liability_cash_flows: numpy.ndarray
+            Size of the liability payments at each liability date.
+        """
+        self.modelling_date = modelling_date
+        self.dates_of_interest = np.asarray(dates_of_interest, dtype="datetime64[D]")
+        self.asset_ids = list(asset_ids)
+        self.market_price = np.asarray(market_price, dtype=float)
+        self.growth_rate = np.asarray(growth_rate, dtype=float)
+        self.bank_account = float(bank_account)
+        self.dividend_dates = np.asarray(dividend_dates, dtype="datetime64[D]")
+        self.dividend_cash_flows = np.asarray(dividend_cash_flows, dtype=float)
+        self.terminal_dates = np.asarray(terminal_dates, dtype="datetime64[D]")
+        self.terminal_cash_flows = np.asarray(terminal_cash_flows, dtype=float)
+        self.liability_dates = np.asarray(liability_dates, dtype="datetime64[D]")
+        self.liability_cash_flows = np.asarray(liability_cash_flows, dtype=float)
+
+    def run(self) -> ProjectionResult:
+        """
+        Project the portfolio through all the dates of interest with the deterministic growth rates, see
+        run_scenarios.
+
+        Returns
+        -------
+        :rtype ProjectionResult
+            The bank account and market value of each asset at the modelling date and at each date of interest.
+        """
+        return self.run_scenarios().scenario(0)
+
+    def run_scenarios(self, growth_factor=None, n_scenarios: int = 1) -> ScenarioProjectionResult:
+        """
+        Project the portfolio through all the dates of interest in every scenario at once. In each period the
+        expired dividend, terminal and liability cash flows are settled in the bank account, the equities grow and
+        the portfolio is rebalanced by selling (negative bank account) or buying (positive bank account) a
+        proportion of all holdings. Each period is one set of array operations over all scenarios.
+
+        Parameters
+        ----------
+        :type growth_factor: numpy.ndarray
+            Scenario x period x asset factor by which the market value of each asset grows in each period, for
+            example ShockClasses.ShockChunk.period_growth. A size 1 asset axis applies the same factor to all assets.
+            By default every scenario grows at the deterministic growth rates.
+        :type n_scenarios: int
+            Number of scenarios when no growth factor is given.
+
+        Returns
+        -------
+        :rtype ScenarioProjectionResult
+            The bank account and market value of each asset in each scenario at the modelling date and at each date
+            of interest.
+        """
+        n_periods = self.dates_of_interest.size
+        n_assets = self.market_price.size
+        dates = np.empty(n_periods + 1, dtype="datetime64[D]")
+        dates[0] = np.datetime64(self.modelling_date, "D")
+        dates[1:] = self.dates_of_interest
+
+        if growth_factor is None:
+            time_frac = np.diff(dates).astype(int) / 365.5
+            growth_factor = np.broadcast_to((1 + self.growth_rate) ** time_frac[:, np.newaxis],
+                                            (n_scenarios, n_periods, n_assets))
+        growth_factor = np.asarray(growth_factor, dtype=float)
+        if growth_factor.ndim != 3 or growth_factor.shape[1] != n_periods:
+            raise ValueError("Growth factor must be a scenario x period x asset array with one period per date of "
+                             "interest")
+        n_scenarios = growth_factor.shape[0]
+
+        bank_account = np.empty((n_scenarios, n_periods + 1))
+        market_value = np.empty((n_scenarios, n_periods + 1, n_assets))
+        bank_account[:, 0] = self.bank_account
+        market_value[:, 0] = self.market_price
+
+        # Cumulative proportion of the initial holding of each asset still held after trading, per scenario. The
+        # cash-flow matrices are never rescaled, the factor is applied when a cash flow is settled.
+        holding_factor = np.ones((n_scenarios, n_assets))
+        events = CashFlowEventQueue({EventType.DIVIDEND: self.dividend_dates,
+                                     EventType.TERMINAL: self.terminal_dates,
+                                     EventType.LIABILITY: self.liability_dates})
+
+        for t in range(1, n_periods + 1):
+            # Expired dividend and terminal flows of each asset and liability flows, the same in every scenario
+            [types, columns] = events.pop_until(dates[t])
+            asset_flows = self.dividend_cash_flows[:, columns[types == EventType.DIVIDEND]].sum(axis=1) + \
+                self.terminal_cash_flows[:, columns[types == EventType.TERMINAL]].sum(axis=1)
+            liability_flows = self.liability_cash_flows[columns[types == EventType.LIABILITY]].sum()
+            cash = bank_account[:, t - 1] + holding_factor @ asset_flows - liability_flows
+
+            # Market value of portfolio after stock growth
+            market_value[:, t] = market_value[:, t - 1] * growth_factor[:, t - 1]
+            total_market_value = market_value[:, t].sum(axis=1)
+
+            # Trading of assets: sell a proportion of all holdings where there is a deficit, buy where there is
+            # excess cash
+            with np.errstate(divide="ignore", invalid="ignore"):
+                percent = np.minimum(1, np.abs(cash) / total_market_value)
+            trade_factor = np.where(total_market_value <= 0, 1.0,
+                                    np.where(cash < 0, 1 - percent, np.where(cash > 0, 1 + percent, 1.0)))
+            market_value[:, t] *= trade_factor[:, np.newaxis]
+            cash += total_market_value - market_value[:, t].sum(axis=1)  # Cash from shares sold or for shares bought
+            holding_factor *= trade_factor[:, np.newaxis]  # Adjust future flows for new asset allocation
+            bank_account[:, t] = cash
+
+        return ScenarioProjectionResult(dates=dates, asset_ids=self.asset_ids, bank_account=bank_account,
+                                        market_value=market_value)
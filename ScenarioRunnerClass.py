@@ -0,0 +1,209 @@
+import numpy as np
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from ProjectionClasses import ProjectionEngine
+
+# Arrays of the projection engine that are placed in shared memory
+_ENGINE_ARRAYS = ["dates_of_interest", "market_price", "growth_rate", "dividend_dates", "dividend_cash_flows",
+                  "terminal_dates", "terminal_cash_flows", "liability_dates", "liability_cash_flows"]
+
+# State of a worker process, set once by _init_worker
+_worker = {}
+
+
+class SharedArrays:
+    def __init__(self, arrays: dict):
+        """
+        Copies arrays into shared memory blocks, so that other processes can attach to them without copying or
+        pickling. Only the small spec (block name, shape and dtype of each array) is sent to the other processes,
+        which attach with SharedArrays.attach. The blocks are removed when the object is closed; use it as a context
+        manager.
+
+        Parameters
+        ----------
+        :type arrays: dict[str, numpy.ndarray]
+        """
+        self._blocks = []
+        self.spec = {}
+        try:
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                self._blocks.append(block)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+                self.spec[name] = (block.name, array.shape, array.dtype.str)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    @staticmethod
+    def attach(spec: dict) -> list:
+        """
+        Read-only arrays backed by the shared memory blocks of a spec.
+
+        Returns
+        -------
+        :rtype list with two elements:
+            arrays: dict name -> numpy.ndarray.
+            blocks: the SharedMemory objects, which must be kept as long as the arrays are used.
+        """
+        arrays = {}
+        blocks = []
+        for name, (block_name, shape, dtype) in spec.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+            array.setflags(write=False)
+            arrays[name] = array
+        return [arrays, blocks]
+
+
+@dataclass
+class ShardedProjectionResult:
+    dates: np.ndarray
+    asset_ids: list
+    mean_bank_account: np.ndarray  # Time
+    mean_market_value: np.ndarray  # Time x asset
+    total_value: np.ndarray  # Scenario x time, bank account plus market value of all assets
+    discounted_value: np.ndarray  # Scenario x time, total value times the discount factor of the date, or None
+
+    def __len__(self) -> int:
+        return self.total_value.shape[0]
+
+
+def _init_worker(spec: dict, engine_arguments: dict, scenario_source, start_day) -> None:
+    # Attaches a worker process to the shared inputs once, the engine is built on the shared arrays without copies
+    [arrays, blocks] = SharedArrays.attach(spec)
+    engine = ProjectionEngine(**engine_arguments, **{name: arrays[name] for name in _ENGINE_ARRAYS})
+    _worker.update(blocks=blocks, engine=engine, scenario_source=scenario_source,
+                   discount_factor=arrays.get("discount_factor"), start_day=start_day)
+
+
+def _run_shard(start: int, stop: int) -> list:
+    # Projects scenarios start to stop - 1 and returns [start, bank account sum, market value sum, total value,
+    # discounted value], the sums over the scenarios of the shard
+    engine = _worker["engine"]
+    if _worker["scenario_source"] is None:
+        result = engine.run_scenarios(n_scenarios=stop - start)
+    else:
+        result = engine.run_scenarios(_worker["scenario_source"](start, stop))
+    total_value = result.bank_account + result.market_value.sum(axis=2)
+    discounted_value = None
+    if _worker["discount_factor"] is not None:
+        position = (result.dates - _worker["start_day"]).astype(np.int64)
+        discounted_value = total_value * _worker["discount_factor"][position]
+    return [start, result.bank_account.sum(axis=0), result.market_value.sum(axis=0), total_value, discounted_value]
+
+
+class ScenarioRunner:
+    def __init__(self, engine: ProjectionEngine, scenario_source=None, discount_curve=None, shard_size: int = 256):
+        """
+        Runs the scenarios of a projection in shards of shard_size scenarios, on a pool of processes or in this
+        process. The immutable inputs (the cash-flow matrices, dates and liability vector of the engine and the daily
+        grid of the discount curve) are placed in shared memory once and every worker attaches to them without
+        copying. The shards are fixed by the shard size, the scenarios of a shard come from the scenario source and
+        the shard sums are added in shard order, so the result does not depend on the number of workers.
+
+        Parameters
+        ----------
+        :type engine: ProjectionEngine
+        :type scenario_source: callable
+            Picklable function of (start, stop) returning the scenario x period x asset growth factor of scenarios
+            start to stop - 1 (see ProjectionEngine.run_scenarios), for example ShockGrowth. By default every
+            scenario grows at the deterministic growth rates.
+        :type discount_curve: Curves.DiscountCurve
+            Optional curve, the total value of each scenario is also discounted with it.
+        :type shard_size: int
+            Number of scenarios projected together by one task.
+        """
+        if shard_size <= 0:
+            raise ValueError("Shard size must be greater than 0")
+        self.engine = engine
+        self.scenario_source = scenario_source
+        self.discount_curve = discount_curve
+        self.shard_size = shard_size
+
+    def _shared_inputs(self) -> dict:
+        arrays = {name: getattr(self.engine, name) for name in _ENGINE_ARRAYS}
+        if self.discount_curve is not None:
+            arrays["discount_factor"] = self.discount_curve.discount_factor
+        return arrays
+
+    def run(self, n_scenarios: int, max_workers: int = None) -> ShardedProjectionResult:
+        """
+        Projects scenarios 0 to n_scenarios - 1.
+
+        Parameters
+        ----------
+        :type n_scenarios: int
+        :type max_workers: int
+            Number of processes; by default all shards are projected in this process.
+
+        Returns
+        -------
+        :rtype ShardedProjectionResult
+        """
+        if n_scenarios <= 0:
+            raise ValueError("Number of scenarios must be greater than 0")
+        starts = list(range(0, n_scenarios, self.shard_size))
+        stops = [min(start + self.shard_size, n_scenarios) for start in starts]
+        engine_arguments = {"modelling_date": self.engine.modelling_date, "asset_ids": self.engine.asset_ids,
+                            "bank_account": self.engine.bank_account}
+        start_day = None if self.discount_curve is None else self.discount_curve.start_day
+
+        with SharedArrays(self._shared_inputs()) as shared:
+            initargs = (shared.spec, engine_arguments, self.scenario_source, start_day)
+            if max_workers is None or max_workers == 1:
+                _init_worker(*initargs)
+                try:
+                    shards = [_run_shard(start, stop) for start, stop in zip(starts, stops)]
+                finally:
+                    _worker.clear()  # Releases the shared memory before it is removed
+            else:
+                with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                         initargs=initargs) as executor:
+                    shards = list(executor.map(_run_shard, starts, stops))
+
+        # Deterministic reduction, in shard order
+        bank_account = shards[0][1].copy()
+        market_value = shards[0][2].copy()
+        for shard in shards[1:]:
+            bank_account += shard[1]
+            market_value += shard[2]
+        total_value = np.concatenate([shard[3] for shard in shards])
+        discounted_value = None if self.discount_curve is None else np.concatenate([shard[4] for shard in shards])
+        dates = np.concatenate([[np.datetime64(self.engine.modelling_date, "D")], self.engine.dates_of_interest])
+        return ShardedProjectionResult(dates=dates, asset_ids=self.engine.asset_ids,
+                                       mean_bank_account=bank_account / n_scenarios,
+                                       mean_market_value=market_value / n_scenarios, total_value=total_value,
+                                       discounted_value=discounted_value)
+
+
+class ShockGrowth:
+    def __init__(self, model, sector_code):
+        """
+        Scenario source for ScenarioRunner: the equity growth of the scenarios of a ShockClasses.CorrelatedShockModel
+        whose steps are the projection periods.
+
+        :type model: ShockClasses.CorrelatedShockModel
+        :type sector_code: numpy.ndarray
+            Sector of each equity of the engine, see ShockClasses.sector_codes.
+        """
+        self.model = model
+        self.sector_code = np.asarray(sector_code)
+
+    def __call__(self, start: int, stop: int) -> np.ndarray:
+        return self.model.simulate(start, stop).period_growth(self.sector_code)
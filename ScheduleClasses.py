@@ -0,0 +1,117 @@
+import numpy as np
+from datetime import date
+from functools import lru_cache
+from FrequencyClass import Frequency
+
+
+def _payment_days(anchor_day: np.ndarray, end_day: np.ndarray, step: np.ndarray, start_day: int) -> list:
+    # Day numbers of all payments anchor + k * step months that are on or after start_day and on or before end_day.
+    # The first payment after start_day is found arithmetically, past payments are never generated. The day of the
+    # month of the anchor is kept, capped at the length of the month.
+    anchor_month = anchor_day.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    anchor_day_of_month = anchor_day - anchor_month.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    end_month = end_day.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    start_month = np.int64(start_day).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+    # Day number of the first day of each month and length of each month, for all months a payment can fall in
+    first_month = min(anchor_month.min(initial=start_month), start_month)
+    last_month = end_month.max(initial=start_month)
+    month_start = np.arange(first_month, last_month + 2).astype("datetime64[M]").astype("datetime64[D]")
+    month_start = month_start.astype(np.int64)
+    month_length = np.diff(month_start)
+
+    def payment_day(position, k):
+        month = anchor_month[position] + k * step[position] - first_month
+        return month_start[month] + np.minimum(anchor_day_of_month[position], month_length[month] - 1)
+
+    position = np.arange(anchor_day.size)
+
+    # First payment on or after the start date
+    first = np.maximum((start_month - anchor_month) // step, 0)
+    first += payment_day(position, first) < start_day
+
+    # Last payment on or before the end date
+    last = (end_month - anchor_month) // step
+    last -= payment_day(position, last) > end_day
+
+    n_payments = np.maximum(last - first + 1, 0)
+    position = np.repeat(position, n_payments)
+    offset = np.cumsum(n_payments) - n_payments  # Position of the first payment of each schedule in the output
+    k = first[position] + np.arange(position.size) - offset[position]
+    return [position, payment_day(position, k)]
+
+
+@lru_cache(maxsize=65536)
+def generate_schedule(anchor_date: date, end_date: date, frequency: Frequency, start_date: date) -> np.ndarray:
+    """
+    Generate the payment dates anchor_date + k * 12/frequency months (k = 0, 1, ...) that are on or after start_date
+    and not after end_date. Schedules are memoized, so instruments sharing the same anchor, end date and frequency
+    share the same schedule.
+
+    Parameters
+    ----------
+    :type anchor_date: datetime.date
+        The date from which the payments are counted, for example the issue date of a bond.
+    :type end_date: datetime.date
+        The last date on which a payment can be made, for example the maturity date of a bond.
+    :type frequency: Frequency
+        Number of payments per year.
+    :type start_date: datetime.date
+        Payments before this date are not generated, usually the modelling date.
+
+    Returns
+    -------
+    :rtype numpy.ndarray
+        Read-only datetime64[D] array with the payment dates in increasing order.
+    """
+    [position, days] = _payment_days(np.array([np.datetime64(anchor_date, "D").astype(np.int64)]),
+                                     np.array([np.datetime64(end_date, "D").astype(np.int64)]),
+                                     np.array([12 // int(frequency)]),
+                                     np.datetime64(start_date, "D").astype(np.int64))
+    schedule = days.view("datetime64[D]")
+    schedule.setflags(write=False)  # The same array is returned to every caller
+    return schedule
+
+
+def generate_schedules(anchor_dates, end_dates, frequencies, start_date: date) -> list:
+    """
+    Generate the payment schedules of many instruments at once. Each distinct combination of anchor date, end date
+    and frequency is only generated once and then shared by all the instruments that have it.
+
+    Parameters
+    ----------
+    :type anchor_dates: array-like of datetime.date or numpy.datetime64
+    :type end_dates: array-like of datetime.date or numpy.datetime64
+    :type frequencies: array-like of Frequency
+    :type start_date: datetime.date
+        Payments before this date are not generated, usually the modelling date.
+
+    Returns
+    -------
+    :rtype list with two elements:
+        owner: numpy array with the position of the instrument making each payment.
+        payment_dates: numpy datetime64[D] array with the date of each payment, sorted by instrument and then date.
+    """
+    anchor_day = np.asarray(anchor_dates, dtype="datetime64[D]").astype(np.int64)
+    end_day = np.asarray(end_dates, dtype="datetime64[D]").astype(np.int64)
+    step = 12 // np.asarray(frequencies, dtype=np.int64)
+    start_day = np.datetime64(start_date, "D").astype(np.int64)
+    if anchor_day.size == 0:
+        return [np.array([], dtype=np.int64), np.array([], dtype="datetime64[D]")]
+
+    # Single integer key for each (anchor, end, frequency) combination
+    anchor_offset = anchor_day - anchor_day.min()
+    end_offset = end_day - end_day.min()
+    key = (anchor_offset * (end_offset.max() + 1) + end_offset) * 13 + step
+    [unique_key, first_owner, schedule_of_owner] = np.unique(key, return_index=True, return_inverse=True)
+
+    [schedule, days] = _payment_days(anchor_day[first_owner], end_day[first_owner], step[first_owner], start_day)
+    n_payments = np.bincount(schedule, minlength=unique_key.size)
+    schedule_offset = np.cumsum(n_payments) - n_payments
+
+    # Copy the shared schedule of each combination to all instruments that have it
+    n_owner_payments = n_payments[schedule_of_owner]
+    owner = np.repeat(np.arange(anchor_day.size), n_owner_payments)
+    owner_offset = np.cumsum(n_owner_payments) - n_owner_payments
+    position = schedule_offset[schedule_of_owner[owner]] + np.arange(owner.size) - owner_offset[owner]
+    return [owner, days[position].view("datetime64[D]")]
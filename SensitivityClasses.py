@@ -0,0 +1,96 @@
+import numpy as np
+from dataclasses import dataclass
+from Curves import Curves
+from CashFlowClasses import CashFlowMatrix
+
+
+@dataclass
+class KeyRateResult:
+    """
+    Key-rate sensitivities of a set of assets or liabilities, made by KeyRateSensitivity.revalue.
+    """
+    key_rates: np.ndarray  # Maturity of each key rate
+    bump: float
+    base_value: np.ndarray  # Value of each asset on the unbumped curve
+    bumped_value: np.ndarray  # Key rates x assets, value with only that key rate bumped
+
+    @property
+    def dv01(self) -> np.ndarray:
+        # Change in value of each asset (columns) for a bump of each key rate (rows), scaled to one basis point
+        return (self.bumped_value - self.base_value) * (0.0001 / self.bump)
+
+    @property
+    def key_rate_duration(self) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return -(self.bumped_value - self.base_value) / (self.bump * self.base_value)
+
+    @property
+    def total_dv01(self) -> np.ndarray:
+        return self.dv01.sum(axis=0)
+
+
+class KeyRateSensitivity:
+    def __init__(self, curves: Curves, bump: float = 0.0001):
+        """
+        Key-rate (bucketed) interest rate sensitivities to each liquid maturity of a calibrated Smith-Wilson curve.
+        The curve is recalibrated with each observed rate bumped in turn, keeping alpha fixed. All the bumped curves
+        share the matrix Q'HQ, so they are calibrated together with one factorization and one right-hand side per
+        bump (Curves.SWCalibrate with stacked rates). The base and bumped curves are then evaluated together and a
+        cash-flow matrix is revalued against all of them at once.
+
+        Parameters
+        ----------
+        :type curves: Curves
+            Calibrated curve with M_Obs, r_Obs and alpha filled in, for example from calibrate_curves.
+        :type bump: float
+            Size of the bump of each key rate.
+        """
+        self.curves = curves
+        self.bump = bump
+        self.m_obs = np.asarray(curves.M_Obs, dtype=float)
+        self.r_obs = np.asarray(curves.r_Obs, dtype=float)
+        self.alpha = float(curves.alpha)
+
+        # Row 0 is the base curve, row k the curve with key rate k bumped
+        n_obs = self.m_obs.size
+        bumped_rates = self.r_obs + bump * np.vstack([np.zeros(n_obs), np.identity(n_obs)])
+        self.b = curves.SWCalibrate(bumped_rates, self.m_obs, curves.ufr, self.alpha)
+
+    @property
+    def key_rates(self) -> np.ndarray:
+        return self.m_obs
+
+    def zero_rates(self, year_fractions) -> np.ndarray:
+        """
+        Zero rates of the base curve (row 0) and of each bumped curve (row k for key rate k).
+
+        :type year_fractions: numpy.ndarray
+        :rtype numpy.ndarray
+        """
+        return self.curves.SWExtrapolate(np.asarray(year_fractions, dtype=float), self.m_obs, self.b,
+                                         self.curves.ufr, self.alpha)
+
+    def revalue(self, cash_flow_matrix: CashFlowMatrix, compounding: int = 1, spread: np.ndarray = None) \
+            -> KeyRateResult:
+        """
+        Value the cash flows on the base curve and on every bumped curve, for example the cash-flow matrix of a bond
+        portfolio (CorpBondArrayPortfolio.create_cash_flow_matrix) or of equity or liability cash-flow profiles
+        (CashFlowMatrix.from_profiles).
+
+        Parameters
+        ----------
+        :type cash_flow_matrix: CashFlowMatrix
+        :type compounding: int
+            Compounding convention, see CashFlowClasses.discount_factors. Defaults to annual compounding, the
+            convention of the Smith-Wilson zero rates.
+        :type spread: numpy.ndarray
+            Optional spread of each asset added to the zero rates.
+
+        Returns
+        -------
+        :rtype KeyRateResult
+        """
+        rates = cash_flow_matrix.zero_rates_on_grid(self.zero_rates)
+        values = cash_flow_matrix.present_value(rates, compounding, spread)
+        return KeyRateResult(key_rates=self.key_rates, bump=self.bump, base_value=values[0],
+                             bumped_value=values[1:])
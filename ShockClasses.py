@@ -0,0 +1,253 @@
+import numpy as np
+from dataclasses import dataclass
+from statistics import NormalDist
+from ESGClasses import block_stream, chunk_ranges
+
+
+def nace_sector(nace) -> np.ndarray:
+    """
+    NACE section (the letter A to U) of each NACE code, for example "C" for "C10" or "C10.1.2".
+
+    :type nace: array-like of str
+    :rtype numpy.ndarray of str
+    """
+    return np.char.upper(np.char.strip(np.asarray(nace, dtype=str))).astype("<U1")
+
+
+def sector_codes(nace, sectors) -> np.ndarray:
+    """
+    Position in sectors of the NACE section of each NACE code.
+
+    :type nace: array-like of str
+    :type sectors: array-like of str
+        NACE sections of the model, see CorrelatedShockModel.sectors.
+    :rtype numpy.ndarray of int
+    """
+    sectors = np.asarray(sectors, dtype=str)
+    order = np.argsort(sectors)
+    sector = nace_sector(nace)
+    position = np.minimum(np.searchsorted(sectors[order], sector), sectors.size - 1)
+    unknown = sectors[order][position] != sector
+    if unknown.any():
+        raise ValueError("No shock model for the NACE sectors " + ", ".join(np.unique(sector[unknown]).tolist()))
+    return order[position]
+
+
+@dataclass
+class ShockChunk:
+    """
+    Equity and credit scenarios start, start + 1, ..., start + n - 1 made by CorrelatedShockModel.simulate. Step k of
+    the arrays belongs to the time k * time_step, step 0 to the modelling date.
+    """
+    start: int  # Number of the first scenario of the chunk
+    index_level: np.ndarray  # Scenarios x steps + 1 x sectors, equity index of each sector, 1 at step 0
+    default_step: np.ndarray  # Scenarios x bonds, step in which the bond defaults, n_steps if it does not default
+
+    def __len__(self) -> int:
+        return self.index_level.shape[0]
+
+    @property
+    def scenarios(self) -> np.ndarray:
+        return np.arange(self.start, self.start + len(self))
+
+    def equity_values(self, step: int, sector_code: np.ndarray, market_value: np.ndarray) -> np.ndarray:
+        """
+        Market value of each equity (columns) in each scenario (rows) at a step, the value at the modelling date
+        grown with the index of its sector.
+
+        :type step: int
+        :type sector_code: numpy.ndarray
+            Sector of each equity, see sector_codes.
+        :type market_value: numpy.ndarray
+        :rtype numpy.ndarray
+        """
+        return self.index_level[:, step, sector_code] * np.asarray(market_value, dtype=float)
+
+    def period_growth(self, sector_code: np.ndarray) -> np.ndarray:
+        """
+        Scenarios x steps x equities factor by which each equity grows in each step, the growth factor of
+        ProjectionClasses.ProjectionEngine.run_scenarios when the projection periods are the steps.
+
+        :type sector_code: numpy.ndarray
+            Sector of each equity, see sector_codes.
+        :rtype numpy.ndarray
+        """
+        return self.index_level[:, 1:, sector_code] / self.index_level[:, :-1, sector_code]
+
+    def survived(self, step: int) -> np.ndarray:
+        """
+        Scenarios x bonds, True if the bond has not defaulted before the time of the step.
+
+        :type step: int
+        :rtype numpy.ndarray of bool
+        """
+        return self.default_step >= step
+
+    def recovery_amount(self, step: int, recovery_rate: np.ndarray, notional_amount: np.ndarray) -> np.ndarray:
+        """
+        Scenarios x bonds recovery paid at the time of a step: recovery rate x notional for the bonds that defaulted
+        in the step before, 0 for all other bonds.
+
+        :type step: int
+        :type recovery_rate: numpy.ndarray
+        :type notional_amount: numpy.ndarray
+        :rtype numpy.ndarray
+        """
+        recovery = np.asarray(recovery_rate, dtype=float) * np.asarray(notional_amount, dtype=float)
+        return np.where(self.default_step == step - 1, recovery, 0.0)
+
+
+class CorrelatedShockModel:
+    def __init__(self, sectors, drift, volatility, correlation, bond_sector_code, default_probability,
+                 n_steps: int, asset_correlation: float = 0.2, time_step: float = 1.0, seed=None,
+                 block_size: int = 32):
+        """
+        Correlated equity index returns per NACE sector and default events per bond. The equity index of sector s
+        is a geometric Brownian motion with log return (mu_s - sigma_s^2 / 2) dt + sigma_s sqrt(dt) F_s, where the
+        standard normal sector factors F are correlated with the Cholesky factor of the sector correlation matrix,
+        calculated once. Bond i of sector s defaults in a step if
+            sqrt(rho) F_s + sqrt(1 - rho) e_i < N^-1(1 - (1 - pd_i) ^ dt)
+        (a one factor Gaussian copula), so defaults are correlated with each other and with the equity returns of
+        their sector. The thresholds are calculated once for each distinct default probability.
+
+        The random numbers of scenario blocks come from independent streams spawned from one numpy SeedSequence, as
+        in ESGClasses.EconomicScenarioGenerator.
+
+        Parameters
+        ----------
+        :type sectors: array-like of str
+            NACE sections, see nace_sector.
+        :type drift: array-like of float
+            Expected annual return mu of each sector index.
+        :type volatility: array-like of float
+            Annual volatility sigma of each sector index.
+        :type correlation: float or numpy.ndarray
+            Sectors x sectors correlation matrix of the sector factors, or one correlation between all sectors.
+        :type bond_sector_code: numpy.ndarray
+            Sector of each bond, see sector_codes.
+        :type default_probability: array-like of float
+            Annual default probability of each bond, for example CorpBondArrayPortfolio.default_probability.
+        :type n_steps: int
+        :type asset_correlation: float
+            Correlation rho between a bond and its sector factor.
+        :type time_step: float
+            Length of a step in years.
+        :type seed: int or numpy.random.SeedSequence
+        :type block_size: int
+            Number of scenarios sharing one random stream; the idiosyncratic numbers of a block are drawn one step
+            at a time as a block size x bonds array.
+        """
+        self.sectors = np.asarray(sectors, dtype=str)
+        n_sectors = self.sectors.size
+        self.drift = np.broadcast_to(np.asarray(drift, dtype=float), n_sectors)
+        self.volatility = np.broadcast_to(np.asarray(volatility, dtype=float), n_sectors)
+        if np.ndim(correlation) == 0:
+            correlation = np.full((n_sectors, n_sectors), float(correlation))
+            np.fill_diagonal(correlation, 1.0)
+        self.correlation = np.asarray(correlation, dtype=float)
+        if self.correlation.shape != (n_sectors, n_sectors):
+            raise ValueError("Correlation matrix must have one row and column per sector")
+        try:
+            self.cholesky = np.linalg.cholesky(self.correlation)
+        except np.linalg.LinAlgError:
+            raise ValueError("Correlation matrix must be positive definite")
+        if not 0 <= asset_correlation < 1:
+            raise ValueError("Asset correlation must be between 0 and 1")
+        if n_steps <= 0:
+            raise ValueError("Number of steps must be greater than 0")
+        if block_size <= 0:
+            raise ValueError("Block size must be greater than 0")
+
+        self.bond_sector_code = np.asarray(bond_sector_code, dtype=np.int64)
+        self.default_probability = np.asarray(default_probability, dtype=float)
+        self.n_steps = n_steps
+        self.asset_correlation = float(asset_correlation)
+        self.time_step = float(time_step)
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.block_size = block_size
+
+        # Default threshold of each bond for one step, N^-1 of the default probability per step
+        [step_probability, bond_probability] = np.unique(1 - (1 - self.default_probability) ** self.time_step,
+                                                         return_inverse=True)
+        normal = NormalDist()
+        thresholds = np.array([-np.inf if p <= 0 else np.inf if p >= 1 else normal.inv_cdf(p)
+                               for p in step_probability.tolist()])
+        self.threshold = thresholds[bond_probability].reshape(self.default_probability.shape)
+
+        self.log_drift = (self.drift - self.volatility ** 2 / 2) * self.time_step
+        self.log_volatility = self.volatility * np.sqrt(self.time_step)
+
+    @classmethod
+    def for_portfolio(cls, bonds, equity_nace, drift: dict, volatility: dict, correlation, n_steps: int, **kwargs):
+        """
+        Shock model for the sectors of a bond portfolio and a list of equity NACE codes.
+
+        :type bonds: BondClasses.CorpBondArrayPortfolio
+        :type equity_nace: array-like of str
+        :type drift: dict[str, float]
+            Expected annual return of the index of each NACE section.
+        :type volatility: dict[str, float]
+        :type correlation: float or numpy.ndarray
+            Correlation matrix in the order of sorted(drift).
+        :rtype CorrelatedShockModel
+        """
+        sectors = np.array(sorted(drift), dtype=str)
+        category_sector = sector_codes(bonds.nace_categories, sectors)  # Once per distinct NACE code
+        model = cls(sectors, [drift[sector] for sector in sectors.tolist()],
+                    [volatility[sector] for sector in sectors.tolist()], correlation,
+                    category_sector[bonds.nace_code], bonds.default_probability, n_steps, **kwargs)
+        sector_codes(equity_nace, sectors)  # Every equity sector must be modelled
+        return model
+
+    def bytes_per_scenario(self) -> int:
+        # Index levels and default steps of one scenario
+        return 8 * (self.n_steps + 1) * self.sectors.size + 4 * self.bond_sector_code.size
+
+    def _simulate_block(self, block: int) -> list:
+        rng = block_stream(self.seed_sequence, block)
+        factor = rng.standard_normal((self.block_size, self.n_steps, self.sectors.size)) @ self.cholesky.transpose()
+
+        log_return = self.log_drift + self.log_volatility * factor
+        index_level = np.ones((self.block_size, self.n_steps + 1, self.sectors.size))
+        index_level[:, 1:] = np.exp(np.cumsum(log_return, axis=1))
+
+        n_bonds = self.bond_sector_code.size
+        default_step = np.full((self.block_size, n_bonds), self.n_steps, dtype=np.int32)
+        systematic = np.sqrt(self.asset_correlation)
+        idiosyncratic = np.sqrt(1 - self.asset_correlation)
+        for step in range(self.n_steps):
+            latent = systematic * factor[:, step, self.bond_sector_code] + \
+                     idiosyncratic * rng.standard_normal((self.block_size, n_bonds))
+            default_step[(latent < self.threshold) & (default_step == self.n_steps)] = step
+        return [index_level, default_step]
+
+    def simulate(self, start: int, stop: int) -> ShockChunk:
+        """
+        Scenarios start, start + 1, ..., stop - 1.
+
+        :type start: int
+        :type stop: int
+        :rtype ShockChunk
+        """
+        if not 0 <= start < stop:
+            raise ValueError("Scenario range must not be empty and must start at 0 or later")
+        index_level = np.empty((stop - start, self.n_steps + 1, self.sectors.size))
+        default_step = np.empty((stop - start, self.bond_sector_code.size), dtype=np.int32)
+        for block in range(start // self.block_size, (stop - 1) // self.block_size + 1):
+            block_start = block * self.block_size
+            first = max(start, block_start)
+            last = min(stop, block_start + self.block_size)
+            [block_level, block_default] = self._simulate_block(block)
+            index_level[first - start:last - start] = block_level[first - block_start:last - block_start]
+            default_step[first - start:last - start] = block_default[first - block_start:last - block_start]
+        return ShockChunk(start=start, index_level=index_level, default_step=default_step)
+
+    def generate(self, n_scenarios: int, chunk_size: int = None, memory_budget: int = None):
+        """
+        Generates n_scenarios scenarios in chunks, see EconomicScenarioGenerator.generate.
+
+        :rtype generator of ShockChunk
+        """
+        for [start, stop] in chunk_ranges(n_scenarios, chunk_size, memory_budget, self.bytes_per_scenario(),
+                                          self.block_size):
+            yield self.simulate(start, stop)
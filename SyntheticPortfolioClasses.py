@@ -0,0 +1,142 @@
+import os
+import numpy as np
+import pandas as pd
+from datetime import date
+
+BOND_COLUMNS = ["Asset_ID", "Asset_Type", "NACE", "Issue_Date", "Maturity_Date", "Notional_Amount", "Coupon_Rate",
+                "Frequency", "Recovery_Rate", "Default_Probability", "Market_Price"]
+EQUITY_COLUMNS = ["Asset_ID", "Asset_Type", "NACE", "Issue_Date", "Dividend_Yield", "Frequency", "Market_Price",
+                  " Terminal", "Default_Probability", "Growth_Rate"]
+LIABILITY_COLUMNS = ["Liability_Date", "Liability_Size"]
+
+
+def read_seed_file(filename: str) -> list:
+    """
+    Values of the single column of a seed file such as Input/NACE_Generated.csv or Input/Maturity_Generated.csv.
+
+    :type filename: str
+    :rtype list
+    """
+    return pd.read_csv(filename, encoding="utf-8-sig").iloc[:, 0].tolist()
+
+
+def _format_dates(days: np.ndarray) -> np.ndarray:
+    # Day numbers as d/m/yyyy strings, the date format of the input files
+    return pd.to_datetime(days.astype("datetime64[D]")).strftime("%d/%m/%Y").to_numpy()
+
+
+def generate_bonds(n_bonds: int, nace_codes: list, maturities: list, modelling_date: date,
+                   seed_sequence: np.random.SeedSequence) -> pd.DataFrame:
+    """
+    Random corporate bonds in the format of Input/Bond_Portfolio.csv. Each bond has a NACE code and a term (in
+    years) drawn from the seed lists and is issued a random number of days before the modelling date, so that it
+    has not matured yet.
+
+    :type n_bonds: int
+    :type nace_codes: list of str
+    :type maturities: list of int
+    :type modelling_date: datetime.date
+    :type seed_sequence: numpy.random.SeedSequence
+    :rtype pandas.DataFrame
+    """
+    rng = np.random.default_rng(seed_sequence)
+    term = rng.choice(np.asarray(maturities, dtype=np.int64), n_bonds)
+    start = np.datetime64(modelling_date, "D").astype(np.int64)
+    issue = start - (rng.random(n_bonds) * (term * 365 - 1)).astype(np.int64)
+    maturity = issue + np.rint(term * 365.25).astype(np.int64)
+    return pd.DataFrame({"Asset_ID": np.arange(1, n_bonds + 1),
+                         "Asset_Type": "Corporate_Bond",
+                         "NACE": rng.choice(np.asarray(nace_codes, dtype=str), n_bonds),
+                         "Issue_Date": _format_dates(issue),
+                         "Maturity_Date": _format_dates(maturity),
+                         "Notional_Amount": rng.choice([100, 1000], n_bonds),
+                         "Coupon_Rate": np.round(rng.uniform(0.005, 0.06, n_bonds), 4),
+                         "Frequency": rng.choice([1, 2, 4], n_bonds),
+                         "Recovery_Rate": 0.4,
+                         "Default_Probability": np.round(rng.uniform(0.001, 0.05, n_bonds), 4),
+                         "Market_Price": np.round(rng.normal(100, 5, n_bonds), 2)}, columns=BOND_COLUMNS)
+
+
+def generate_equities(n_equities: int, nace_codes: list, modelling_date: date,
+                      seed_sequence: np.random.SeedSequence) -> pd.DataFrame:
+    """
+    Random equity shares in the format of Input/Equity_Portfolio_test.csv. The shares are issued on the first day of
+    a month in the ten years before the modelling date, which keeps the number of distinct dividend dates small.
+
+    :type n_equities: int
+    :type nace_codes: list of str
+    :type modelling_date: datetime.date
+    :type seed_sequence: numpy.random.SeedSequence
+    :rtype pandas.DataFrame
+    """
+    rng = np.random.default_rng(seed_sequence)
+    month = np.datetime64(modelling_date, "M").astype(np.int64) - rng.integers(1, 121, n_equities)
+    issue = month.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    return pd.DataFrame({"Asset_ID": np.arange(1, n_equities + 1),
+                         "Asset_Type": "Equity_Share",
+                         "NACE": rng.choice(np.asarray(nace_codes, dtype=str), n_equities),
+                         "Issue_Date": _format_dates(issue),
+                         "Dividend_Yield": np.round(rng.uniform(0.01, 0.06, n_equities), 4),
+                         "Frequency": rng.choice([1, 2, 4], n_equities),
+                         "Market_Price": np.round(rng.uniform(20, 200, n_equities), 2),
+                         " Terminal": 1,
+                         "Default_Probability": np.round(rng.uniform(0.001, 0.05, n_equities), 4),
+                         "Growth_Rate": np.round(rng.uniform(0.0, 0.03, n_equities), 4)}, columns=EQUITY_COLUMNS)
+
+
+def generate_liabilities(n_cash_flows: int, modelling_date: date, n_years: int,
+                         seed_sequence: np.random.SeedSequence) -> pd.DataFrame:
+    """
+    Random liability cash flows in the format of Input/Liability_Cashflow.csv, on dates spread over the n_years
+    after the modelling date.
+
+    :type n_cash_flows: int
+    :type modelling_date: datetime.date
+    :type n_years: int
+    :type seed_sequence: numpy.random.SeedSequence
+    :rtype pandas.DataFrame
+    """
+    rng = np.random.default_rng(seed_sequence)
+    start = np.datetime64(modelling_date, "D").astype(np.int64)
+    days = np.sort(start + rng.integers(1, int(n_years * 365.25), n_cash_flows))
+    return pd.DataFrame({"Liability_Date": _format_dates(days),
+                         "Liability_Size": np.round(rng.uniform(1, 100, n_cash_flows), 2)}, columns=LIABILITY_COLUMNS)
+
+
+def write_portfolio(directory: str, n_positions: int, nace_codes: list, maturities: list, modelling_date: date,
+                    n_years: int, seed=None) -> dict:
+    """
+    Generates a reproducible book of n_positions bonds, n_positions // 100 equity shares (at least 10) and
+    n_positions // 100 liability cash flows (at least 12) and writes them as input files. The same seed and size
+    always give the same files; each book has its own stream spawned from the seed.
+
+    Parameters
+    ----------
+    :type directory: str
+    :type n_positions: int
+    :type nace_codes: list of str
+        For example read_seed_file("Input/NACE_Generated.csv").
+    :type maturities: list of int
+        Terms of the bonds in years, for example read_seed_file("Input/Maturity_Generated.csv").
+    :type modelling_date: datetime.date
+    :type n_years: int
+        Length of the projection, the liabilities are paid within it.
+    :type seed: int
+
+    Returns
+    -------
+    :rtype dict
+        Book name ("bonds", "equities" or "liabilities") -> path of the file.
+    """
+    [bond_seed, equity_seed, liability_seed] = np.random.SeedSequence([n_positions] if seed is None
+                                                                      else [seed, n_positions]).spawn(3)
+    os.makedirs(directory, exist_ok=True)
+    books = {"bonds": generate_bonds(n_positions, nace_codes, maturities, modelling_date, bond_seed),
+             "equities": generate_equities(max(n_positions // 100, 10), nace_codes, modelling_date, equity_seed),
+             "liabilities": generate_liabilities(max(n_positions // 100, 12), modelling_date, n_years,
+                                                 liability_seed)}
+    paths = {}
+    for name, book in books.items():
+        paths[name] = os.path.join(directory, name + "_" + str(n_positions) + ".csv")
+        book.to_csv(paths[name], index=False)
+    return paths
@@ -0,0 +1,168 @@
+# Scaling benchmark of the model on synthetic portfolios
+#
+#   python benchmark.py
+#   python benchmark.py --baseline "" --output Intermediate/benchmark_baseline.json  (new baseline)
+#
+# Generates reproducible bond, equity and liability books from Input/NACE_Generated.csv and
+# Input/Maturity_Generated.csv, times every stage of the model on them and writes the timings to a JSON file. The
+# timings are compared to the baseline (by default the committed Intermediate/benchmark_baseline.json) and the exit
+# code is 1 if a stage got slower than the tolerance allows. Timings depend on the machine, so regenerate the baseline
+# on the machine that runs the comparison.
+import os
+import sys
+import json
+import argparse
+import platform
+import tempfile
+import numpy as np
+import pandas as pd
+from time import perf_counter
+from datetime import datetime
+from ImportData import get_settings, read_corporate_bonds, read_equity_shares, read_liability, get_sector_spread, \
+    import_SWEiopa_all
+from CashFlowClasses import build_cash_flow_matrix
+from Curves import calibrate_curves
+from ProjectionClasses import ProjectionEngine
+from SyntheticPortfolioClasses import read_seed_file, write_portfolio
+
+BASELINE = os.path.join("Intermediate", "benchmark_baseline.json")
+STAGES = ["generate", "import", "bond_schedules", "calibration", "equity_cash_flows", "pricing", "projection",
+          "projection_per_step"]
+
+
+def run_size(n_positions: int, settings, input_folder: str, directory: str, seed: int) -> dict:
+    """
+    Times each stage of the model on a synthetic book of n_positions bonds.
+
+    :rtype dict stage -> seconds
+    """
+    timings = {}
+    clock = [perf_counter()]
+
+    def lap(stage):
+        now = perf_counter()
+        timings[stage] = now - clock[0]
+        clock[0] = now
+
+    modelling_date = settings.modelling_date
+    paths = write_portfolio(directory, n_positions, read_seed_file(os.path.join(input_folder, "NACE_Generated.csv")),
+                            read_seed_file(os.path.join(input_folder, "Maturity_Generated.csv")), modelling_date,
+                            settings.n_proj_years, seed)
+    lap("generate")
+
+    bonds = read_corporate_bonds(paths["bonds"])
+    equity_portfolio = read_equity_shares(paths["equities"])
+    liabilities = read_liability(paths["liabilities"])
+    spread_by_nace = get_sector_spread(os.path.join(input_folder, "Sector_Spread.csv"))
+    lap("import")
+
+    cash_flow_matrix = bonds.create_cash_flow_matrix(modelling_date)
+    lap("bond_schedules")
+
+    [maturities, curves, extra_param, Qb] = import_SWEiopa_all(settings.EIOPA_param_file, settings.EIOPA_curves_file)
+    # Liquid maturities of each country (whole years) and the zero rates of the curve at them
+    m_obs = {country: maturities[country].to_numpy(dtype=float) for country in maturities}
+    m_obs = {country: m_obs[country][m_obs[country] % 1 == 0] for country in m_obs}
+    r_obs = {country: curves.loc[m_obs[country].astype(int), country].to_numpy(dtype=float) for country in m_obs}
+    ufr = {country: float(extra_param.loc["UFR", country]) / 100 for country in m_obs}
+    calibrated = calibrate_curves(m_obs, r_obs, ufr, settings.precision, settings.tau, modelling_date)
+    curve = calibrated[settings.country]
+    lap("calibration")
+
+    dividend_dates = equity_portfolio.create_dividend_dates(modelling_date, settings.end_date)
+    terminal_dates = equity_portfolio.create_terminal_dates(modelling_date=modelling_date,
+                                                            terminal_date=settings.end_date, terminal_rate=curve.ufr)
+    unique_dividend_dates = equity_portfolio.unique_dates_profile(dividend_dates)
+    unique_terminal_dates = equity_portfolio.unique_dates_profile(terminal_dates)
+    dividend_cash_flows = build_cash_flow_matrix(dividend_dates, unique_dividend_dates)
+    terminal_cash_flows = build_cash_flow_matrix(terminal_dates, unique_terminal_dates)
+    lap("equity_cash_flows")
+
+    prices = bonds.price(modelling_date, lambda t: curve.SWExtrapolate(t, curve.M_Obs, curve.b, curve.ufr,
+                                                                        curve.alpha),
+                         settings.compounding, bonds.sector_spread(spread_by_nace))
+    if prices.size != len(bonds) or cash_flow_matrix.shape[0] != len(bonds):
+        raise RuntimeError("Pricing did not return one price per bond")
+    lap("pricing")
+
+    [market_price, growth_rate] = equity_portfolio.init_equity_portfolio_to_dataframe(modelling_date)
+    n_periods = settings.n_proj_years
+    dates_of_interest = [np.datetime64(modelling_date, "D") + int(round(365.25 * year))
+                         for year in range(1, n_periods + 1)]
+    projection = ProjectionEngine(modelling_date=modelling_date, dates_of_interest=dates_of_interest,
+                                  asset_ids=market_price.index, market_price=market_price[modelling_date].values,
+                                  growth_rate=growth_rate[modelling_date].values, bank_account=0.0,
+                                  dividend_dates=unique_dividend_dates, dividend_cash_flows=dividend_cash_flows,
+                                  terminal_dates=unique_terminal_dates, terminal_cash_flows=terminal_cash_flows,
+                                  liability_dates=liabilities.cash_flow_dates,
+                                  liability_cash_flows=liabilities.cash_flow_series)
+    projection.run()
+    lap("projection")
+    timings["projection_per_step"] = timings["projection"] / n_periods
+    return timings
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_seconds: float) -> list:
+    """
+    Compares the timings with a baseline. A stage regressed if it took more than (1 + tolerance) times the baseline
+    and at least min_seconds longer; small stages are too noisy to judge.
+
+    :rtype list of [size, stage, seconds, baseline seconds, ratio, regressed]
+    """
+    rows = []
+    for size, timings in results["sizes"].items():
+        for stage, seconds in timings.items():
+            base = baseline.get("sizes", {}).get(size, {}).get(stage)
+            if base is None:
+                continue
+            ratio = seconds / base if base > 0 else float("inf")
+            regressed = seconds > base * (1 + tolerance) and seconds - base >= min_seconds
+            rows.append([size, stage, seconds, base, ratio, regressed])
+    return rows
+
+
+def main(arguments=None) -> int:
+    parser = argparse.ArgumentParser(description="Scaling benchmark on synthetic portfolios")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000],
+                        help="number of bond positions of each book")
+    parser.add_argument("--seed", type=int, default=2023)
+    parser.add_argument("--parameters", default=os.path.join("Input", "Parameters.csv"))
+    parser.add_argument("--input", default="Input", help="folder with the seed and sector spread files")
+    parser.add_argument("--output", default=os.path.join("Intermediate", "benchmark.json"))
+    parser.add_argument("--baseline", default=BASELINE,
+                        help="JSON file of an earlier run to compare with, an empty string skips the comparison")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown of a stage")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="smallest slowdown that counts")
+    args = parser.parse_args(arguments)
+
+    settings = get_settings(args.parameters)
+    baseline = None
+    if args.baseline:  # Read before the run, the output may replace the baseline file
+        with open(args.baseline, mode="r", encoding="utf-8") as json_file:
+            baseline = json.load(json_file)
+    results = {"created": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+               "numpy": np.__version__, "pandas": pd.__version__, "machine": platform.machine(),
+               "seed": args.seed, "n_proj_years": settings.n_proj_years, "sizes": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            timings = run_size(size, settings, args.input, directory, args.seed)
+            results["sizes"][str(size)] = timings
+            print("{:>9} positions: ".format(size) +
+                  ", ".join("{} {:.3f}s".format(stage, timings[stage]) for stage in STAGES))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, mode="w", encoding="utf-8") as json_file:
+        json.dump(results, json_file, indent=2)
+
+    if baseline is None:
+        return 0
+    rows = compare(results, baseline, args.tolerance, args.min_seconds)
+    print("{:>9} {:<20} {:>10} {:>10} {:>7}".format("size", "stage", "seconds", "baseline", "ratio"))
+    for [size, stage, seconds, base, ratio, regressed] in rows:
+        print("{:>9} {:<20} {:>10.4f} {:>10.4f} {:>7.2f}{}".format(size, stage, seconds, base, ratio,
+                                                                   "  REGRESSION" if regressed else ""))
+    return 1 if any(row[5] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
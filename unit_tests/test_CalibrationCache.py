@@ -0,0 +1,94 @@
+from CalibrationCacheClass import CalibrationCache
+from Curves import Curves
+import numpy as np
+import pytest
+import datetime
+
+
+@pytest.fixture
+def curves() -> Curves:
+    curves = Curves(ufr=0.042, precision=1e-10, tau=0.0001, initial_date=datetime.date(2023, 4, 29),
+                    country="Slovenia")
+    return curves
+
+
+@pytest.fixture
+def m_obs() -> np.ndarray:
+    return np.array([1.0, 2.0, 4.0, 5.0, 6.0, 7.0])
+
+
+@pytest.fixture
+def r_obs() -> np.ndarray:
+    return np.array([0.01, 0.02, 0.03, 0.032, 0.035, 0.04])
+
+
+def test_key_depends_on_inputs(m_obs, r_obs):
+    key = CalibrationCache.key("Slovenia", m_obs, r_obs, 0.042, 0.0001, 1e-10)
+    assert CalibrationCache.key("Slovenia", list(m_obs), list(r_obs), 0.042, 0.0001, 1e-10) == key
+    assert CalibrationCache.key("Austria", m_obs, r_obs, 0.042, 0.0001, 1e-10) != key
+    assert CalibrationCache.key("Slovenia", m_obs, r_obs + 1e-12, 0.042, 0.0001, 1e-10) != key
+    assert CalibrationCache.key("Slovenia", m_obs, r_obs, 0.042, 0.0002, 1e-10) != key
+
+
+def test_calibrate_hit(curves, m_obs, r_obs):
+    cache = CalibrationCache()
+    cache.calibrate(curves, m_obs, r_obs)
+    assert (cache.stats.hits, cache.stats.misses) == (0, 1)
+
+    other = Curves(0.042, 1e-10, 0.0001, datetime.date(2023, 4, 29), "Slovenia")
+    cache.calibrate(other, m_obs, r_obs)
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+    assert other.alpha == curves.alpha
+    assert np.array_equal(other.b, curves.b)
+    assert other.alpha == pytest.approx(curves.BrentAlpha(0.05, 0.5, m_obs, r_obs, curves.ufr, curves.Tau,
+                                                          curves.Precision, 1000).alpha)
+
+
+def test_lru_eviction(curves, m_obs, r_obs):
+    cache = CalibrationCache(max_size=2)
+    for shift in [0.0, 0.001, 0.002]:
+        cache.calibrate(curves, m_obs, r_obs + shift)
+    assert len(cache) == 2
+    assert cache.stats.evictions == 1
+    cache.calibrate(curves, m_obs, r_obs + 0.002)  # Most recent, still cached
+    cache.calibrate(curves, m_obs, r_obs)  # Evicted first
+    assert (cache.stats.hits, cache.stats.misses) == (1, 4)
+
+
+def test_disk_store(curves, m_obs, r_obs, tmp_path):
+    CalibrationCache(directory=str(tmp_path)).calibrate(curves, m_obs, r_obs)
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+
+    cache = CalibrationCache(directory=str(tmp_path))
+    other = cache.calibrate(Curves(0.042, 1e-10, 0.0001, datetime.date(2023, 4, 29), "Slovenia"), m_obs, r_obs)
+    assert (cache.stats.hits, cache.stats.disk_hits, cache.stats.misses) == (1, 1, 0)
+    assert other.alpha == curves.alpha
+    assert np.array_equal(other.b, curves.b)
+    assert other.alpha_result == curves.alpha_result
+
+
+def test_calibrate_all_only_calibrates_missing(curves, m_obs, r_obs):
+    cache = CalibrationCache()
+    first = cache.calibrate_all({"Slovenia": m_obs}, {"Slovenia": r_obs}, {"Slovenia": 0.042}, 1e-10, 0.0001,
+                                curves.InitialDate)
+    calibrated = cache.calibrate_all({"Slovenia": m_obs, "Austria": m_obs}, {"Slovenia": r_obs, "Austria": r_obs},
+                                     {"Slovenia": 0.042, "Austria": 0.042}, 1e-10, 0.0001, curves.InitialDate)
+    assert list(calibrated) == ["Slovenia", "Austria"]
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+    assert calibrated["Slovenia"].alpha == first["Slovenia"].alpha
+    assert np.array_equal(calibrated["Slovenia"].b, first["Slovenia"].b)
+    assert calibrated["Austria"].alpha == first["Slovenia"].alpha
+    assert len(cache) == 2
+
+
+def test_solvers_do_not_share_entries(curves, m_obs, r_obs):
+    assert CalibrationCache.key("Slovenia", m_obs, r_obs, 0.042, 0.0001, 1e-10, solver="brent") != \
+        CalibrationCache.key("Slovenia", m_obs, r_obs, 0.042, 0.0001, 1e-10, solver="illinois")
+    cache = CalibrationCache()
+    cache.calibrate(curves, m_obs, r_obs)
+    calibrated = cache.calibrate_all({"Slovenia": m_obs}, {"Slovenia": r_obs}, {"Slovenia": 0.042}, 1e-10, 0.0001,
+                                     curves.InitialDate)
+    assert (cache.stats.hits, cache.stats.misses) == (0, 2)
+    assert len(cache) == 2
+    # Both root finders converge to the same alpha within the precision
+    assert calibrated["Slovenia"].alpha == pytest.approx(curves.alpha, abs=1e-9)
@@ -0,0 +1,161 @@
+import CashFlowClasses
+from CashFlowClasses import CashFlowEventQueue, EventType, build_cash_flow_matrix, CashFlowMatrix, discount_factors, \
+    stack_profiles
+import numpy as np
+import pytest
+import datetime
+
+
+@pytest.fixture
+def event_queue() -> CashFlowEventQueue:
+    dividend_dates = [datetime.date(2023, 6, 1), datetime.date(2024, 6, 1)]
+    liability_dates = [datetime.date(2024, 1, 1), datetime.date(2023, 3, 1)]
+    coupon_dates = [datetime.date(2023, 6, 1)]
+
+    event_queue = CashFlowEventQueue({EventType.DIVIDEND: dividend_dates,
+                                      EventType.LIABILITY: liability_dates,
+                                      EventType.COUPON: coupon_dates})
+    return event_queue
+
+
+def test_len(event_queue):
+    assert len(event_queue) == 5
+
+
+def test_pop_until_sorted_by_date(event_queue):
+    [types, columns] = event_queue.pop_until(datetime.date(2023, 12, 31))
+    assert types.tolist() == [EventType.LIABILITY, EventType.DIVIDEND, EventType.COUPON]
+    assert columns.tolist() == [1, 0, 0]
+    assert len(event_queue) == 2
+
+
+def test_pop_until_includes_deadline(event_queue):
+    [types, columns] = event_queue.pop_until(datetime.date(2023, 6, 1))
+    assert len(types) == 3
+
+
+def test_settled_events_are_not_returned_again(event_queue):
+    event_queue.pop_until(datetime.date(2023, 12, 31))
+    [types, columns] = event_queue.pop_until(datetime.date(2030, 1, 1))
+    assert types.tolist() == [EventType.LIABILITY, EventType.DIVIDEND]
+    assert columns.tolist() == [0, 1]
+    assert len(event_queue) == 0
+
+
+def test_nothing_due(event_queue):
+    [types, columns] = event_queue.pop_until(datetime.date(2020, 1, 1))
+    assert len(types) == 0
+    assert len(event_queue) == 5
+
+
+@pytest.fixture
+def cash_flow_profile() -> list:
+    cash_flow_profile = [{datetime.date(2023, 6, 1): 1.0, datetime.date(2024, 6, 1): 2.0},
+                         {datetime.date(2024, 6, 1): 3.0},
+                         {}]
+    return cash_flow_profile
+
+
+def test_build_cash_flow_matrix(cash_flow_profile):
+    unique_dates = [datetime.date(2023, 6, 1), datetime.date(2024, 6, 1), datetime.date(2025, 6, 1)]
+    cash_flow_matrix = build_cash_flow_matrix(cash_flow_profile, unique_dates)
+    assert cash_flow_matrix.tolist() == [[1.0, 2.0, 0.0], [0.0, 3.0, 0.0], [0.0, 0.0, 0.0]]
+
+
+def test_stack_profiles(cash_flow_profile):
+    [rows, cash_flow_dates, amounts] = stack_profiles(cash_flow_profile)
+    assert rows.tolist() == [0, 0, 1]
+    assert cash_flow_dates.tolist() == [datetime.date(2023, 6, 1), datetime.date(2024, 6, 1),
+                                        datetime.date(2024, 6, 1)]
+    assert amounts.tolist() == [1.0, 2.0, 3.0]
+
+
+def test_build_cash_flow_matrix_unsorted_dates(cash_flow_profile):
+    unique_dates = [datetime.date(2025, 6, 1), datetime.date(2024, 6, 1), datetime.date(2023, 6, 1)]
+    cash_flow_matrix = build_cash_flow_matrix(cash_flow_profile, unique_dates)
+    assert cash_flow_matrix.tolist() == [[0.0, 2.0, 1.0], [0.0, 3.0, 0.0], [0.0, 0.0, 0.0]]
+
+
+def test_build_cash_flow_matrix_sparse(cash_flow_profile):
+    pytest.importorskip("scipy")
+    unique_dates = [datetime.date(2023, 6, 1), datetime.date(2024, 6, 1)]
+    cash_flow_matrix = build_cash_flow_matrix(cash_flow_profile, unique_dates, sparse=True)
+    assert cash_flow_matrix.format == "csr"
+    assert cash_flow_matrix.nnz == 3
+    assert cash_flow_matrix.toarray().tolist() == [[1.0, 2.0], [0.0, 3.0], [0.0, 0.0]]
+
+
+def test_build_cash_flow_matrix_unknown_date(cash_flow_profile):
+    with pytest.raises(KeyError):
+        build_cash_flow_matrix(cash_flow_profile, [datetime.date(2023, 6, 1)])
+
+
+@pytest.fixture
+def cash_flow_matrix() -> CashFlowMatrix:
+    rows = [1, 0, 0, 1, 2]
+    cash_flow_dates = [datetime.date(2024, 1, 1), datetime.date(2024, 1, 1), datetime.date(2025, 1, 1),
+                       datetime.date(2024, 1, 1), datetime.date(2023, 1, 1)]
+    amounts = [5.0, 1.0, 101.0, 5.0, 7.0]
+    cash_flow_matrix = CashFlowMatrix.from_cash_flows(rows, cash_flow_dates, amounts, datetime.date(2023, 1, 1), 4)
+    return cash_flow_matrix
+
+
+def test_cash_flow_matrix_dates(cash_flow_matrix):
+    assert cash_flow_matrix.shape == (4, 3)
+    assert cash_flow_matrix.dates.tolist() == [datetime.date(2023, 1, 1), datetime.date(2024, 1, 1),
+                                               datetime.date(2025, 1, 1)]
+    assert cash_flow_matrix.to_dense().tolist() == [[0.0, 1.0, 101.0], [0.0, 10.0, 0.0], [7.0, 0.0, 0.0],
+                                                    [0.0, 0.0, 0.0]]
+
+
+def test_cash_flow_matrix_present_value(cash_flow_matrix):
+    rates = cash_flow_matrix.zero_rates_on_grid(lambda t: np.full(t.shape, 0.03))
+    assert rates.tolist() == [0.0, 0.03, 0.03]
+    present_value = cash_flow_matrix.present_value(rates)
+    expected = cash_flow_matrix.to_dense() @ discount_factors(rates, cash_flow_matrix.year_fractions, 1)
+    assert present_value == pytest.approx(expected)
+    assert present_value[2] == 7.0  # Paid on the modelling date
+    assert present_value[3] == 0.0
+
+
+def test_cash_flow_matrix_present_value_with_spread(cash_flow_matrix):
+    rates = np.array([0.0, 0.03, 0.04])
+    spread = np.full(4, 0.01)  # Shared by all assets, discounted on the date grid
+    for compounding in [-1, 0, 2]:
+        expected = [(cash_flow_matrix.to_dense()[asset] *
+                     discount_factors(rates + spread[asset], cash_flow_matrix.year_fractions, compounding)).sum()
+                    for asset in range(4)]
+        assert cash_flow_matrix.present_value(rates, compounding, spread) == pytest.approx(expected)
+        # One spread per asset, discounted cash flow by cash flow
+        distinct_spread = np.array([0.01, 0.02, 0.03, 0.04])
+        expected = [(cash_flow_matrix.to_dense()[asset] *
+                     discount_factors(rates + distinct_spread[asset], cash_flow_matrix.year_fractions,
+                                      compounding)).sum()
+                    for asset in range(4)]
+        assert cash_flow_matrix.present_value(rates, compounding, distinct_spread) == pytest.approx(expected)
+
+
+def test_cash_flow_matrix_several_curves(cash_flow_matrix):
+    rates = np.array([[0.0, 0.03, 0.04], [0.0, 0.01, 0.02]])
+    present_value = cash_flow_matrix.present_value(rates)
+    assert present_value.shape == (2, 4)
+    assert present_value[1] == pytest.approx(cash_flow_matrix.present_value(rates[1]))
+    # Shared and distinct spreads broadcast against all the curves
+    for spread in [np.full(4, 0.01), np.array([0.01, 0.02, 0.03, 0.04])]:
+        present_value = cash_flow_matrix.present_value(rates, 2, spread)
+        assert present_value.shape == (2, 4)
+        assert present_value[0] == pytest.approx(cash_flow_matrix.present_value(rates[0], 2, spread))
+        assert present_value[1] == pytest.approx(cash_flow_matrix.present_value(rates[1], 2, spread))
+
+
+def test_cash_flow_matrix_from_profiles(cash_flow_profile):
+    cash_flow_matrix = CashFlowMatrix.from_profiles(cash_flow_profile, datetime.date(2024, 1, 1))
+    assert cash_flow_matrix.shape == (3, 1)  # The cash flow of 2023 is in the past
+    assert cash_flow_matrix.to_dense().tolist() == [[2.0], [3.0], [0.0]]
+
+
+def test_cash_flow_matrix_several_curves_without_scipy(cash_flow_matrix, monkeypatch):
+    rates = np.array([[0.0, 0.03, 0.04], [0.0, 0.01, 0.02]])
+    present_value = cash_flow_matrix.present_value(rates)
+    monkeypatch.setattr(CashFlowClasses, "sp", None)
+    assert cash_flow_matrix.present_value(rates) == pytest.approx(present_value)
@@ -0,0 +1,138 @@
+from BondClasses import CorpBond, CorpBondPortfolio, CorpBondArrayPortfolio
+from FrequencyClass import Frequency
+import numpy as np
+import pytest
+import datetime
+
+
+@pytest.fixture
+def corp_bonds() -> list:
+    corp_bond_1 = CorpBond(1, "AB.2", "Test Issuer", datetime.date(2015, 12, 1), datetime.date(2030, 12, 1), 0.06,
+                           100, Frequency.QUARTERLY, 0.02, 0.94, 50)
+    corp_bond_2 = CorpBond(2, "AB.3", "Test Issuer", datetime.date(2016, 7, 1), datetime.date(2028, 7, 1), 0.01,
+                           100, Frequency.MONTHLY, 0.03, 0.93, 80)
+    corp_bond_3 = CorpBond(3, "AB.2", "Test Issuer", datetime.date(2012, 2, 14), datetime.date(2029, 2, 14), 0.02,
+                           200, Frequency.BIANNUAL, 0.02, 0.91, 90)
+    corp_bond_4 = CorpBond(4, "AB.4", "Test Issuer", datetime.date(2010, 5, 3), datetime.date(2020, 5, 3), 0.02,
+                           100, Frequency.ANNUAL, 0.02, 0.91, 90)
+    return [corp_bond_1, corp_bond_2, corp_bond_3, corp_bond_4]
+
+
+@pytest.fixture
+def modelling_date() -> datetime.date:
+    return datetime.date(2023, 6, 1)
+
+
+def test_from_bonds(corp_bonds):
+    portfolio = CorpBondArrayPortfolio.from_bonds(corp_bonds)
+    assert len(portfolio) == 4
+    assert portfolio.IsEmpty() is False
+    assert portfolio.asset_id.tolist() == [1, 2, 3, 4]
+    assert portfolio.nace.tolist() == ["AB.2", "AB.3", "AB.2", "AB.4"]
+    assert portfolio.nace_categories.tolist() == ["AB.2", "AB.3", "AB.4"]
+    assert portfolio.maturity_date[0] == np.datetime64("2030-12-01")
+    assert portfolio.dividend_amount.tolist() == [6.0, 1.0, 4.0, 2.0]
+
+
+def test_empty_portfolio(modelling_date):
+    portfolio = CorpBondArrayPortfolio.from_bonds([])
+    assert portfolio.IsEmpty() is True
+    assert portfolio.create_aggregate_coupon_dates(modelling_date) == {}
+    assert portfolio.create_maturity_cashflow(modelling_date) == {}
+
+
+def test_aggregate_coupon_dates_match_dict_portfolio(corp_bonds, modelling_date):
+    portfolio = CorpBondArrayPortfolio.from_bonds(corp_bonds)
+    dict_portfolio = CorpBondPortfolio({corp_bond.asset_id: corp_bond for corp_bond in corp_bonds})
+    assert portfolio.create_aggregate_coupon_dates(modelling_date) == \
+        dict_portfolio.create_aggregate_coupon_dates(modelling_date)
+
+
+def test_aggregate_coupon_dates_in_chunks(corp_bonds, modelling_date):
+    portfolio = CorpBondArrayPortfolio.from_bonds(corp_bonds)
+    assert portfolio.create_aggregate_coupon_dates(modelling_date, chunk_size=1) == \
+        portfolio.create_aggregate_coupon_dates(modelling_date)
+
+
+def test_maturity_cashflow_match_dict_portfolio(corp_bonds, modelling_date):
+    portfolio = CorpBondArrayPortfolio.from_bonds(corp_bonds)
+    dict_portfolio = CorpBondPortfolio({corp_bond.asset_id: corp_bond for corp_bond in corp_bonds})
+    maturity_cashflow = portfolio.create_maturity_cashflow(modelling_date)
+    assert maturity_cashflow == dict_portfolio.create_maturity_cashflow(modelling_date)
+    assert len(maturity_cashflow) == 3  # Bond 4 matured before the modelling date
+
+
+def test_generate_coupon_dates_end_of_month():
+    portfolio = CorpBondArrayPortfolio(asset_id=[1], nace=["A"], issue_date=[datetime.date(2023, 1, 31)],
+                                       maturity_date=[datetime.date(2023, 4, 30)], coupon_rate=[0.05],
+                                       notional_amount=[100], frequency=[Frequency.MONTHLY], recovery_rate=[0.4],
+                                       default_probability=[0.01], market_price=[100])
+    [bond_index, coupon_dates] = portfolio.generate_coupon_dates(datetime.date(2023, 2, 1))
+    assert bond_index.tolist() == [0, 0, 0]
+    assert coupon_dates.tolist() == [datetime.date(2023, 2, 28), datetime.date(2023, 3, 31),
+                                     datetime.date(2023, 4, 30)]
+
+
+def test_validate_reports_all_bonds():
+    with pytest.raises(ValueError) as error:
+        CorpBondArrayPortfolio(asset_id=[1, 2, 3], nace=["A", "B", "C"],
+                               issue_date=[datetime.date(2020, 1, 1)] * 3,
+                               maturity_date=[datetime.date(2030, 1, 1), datetime.date(2019, 1, 1),
+                                              datetime.date(2030, 1, 1)],
+                               coupon_rate=[-0.01, 0.02, -0.03], notional_amount=[100, 100, 100],
+                               frequency=[1, 1, 5], recovery_rate=[0.4, 0.4, 0.4],
+                               default_probability=[0.01, 0.01, 0.01], market_price=[90, 90, 90])
+    message = str(error.value)
+    assert "Coupon rate cannot be negative (asset ids: [1, 3])" in message
+    assert "Maturity date cannot be before issue date (asset ids: [2])" in message
+    assert "Frequency must be" in message
+
+
+def test_validate_unique_asset_ids(corp_bonds):
+    with pytest.raises(ValueError, match="Asset ID must be unique \\(asset ids: \\[2, 2\\]\\)"):
+        CorpBondArrayPortfolio.from_bonds(corp_bonds + [corp_bonds[1]])
+
+
+def test_cash_flow_matrix(corp_bonds, modelling_date):
+    portfolio = CorpBondArrayPortfolio.from_bonds(corp_bonds)
+    cash_flow_matrix = portfolio.create_cash_flow_matrix(modelling_date)
+    assert portfolio.create_cash_flow_matrix(modelling_date) is cash_flow_matrix
+    dense = cash_flow_matrix.to_dense()
+    assert dense.sum(axis=1).tolist() == pytest.approx([100 + 6.0 * 31, 100 + 1.0 * 62, 200 + 4.0 * 12, 0.0])
+    assert dense[0, -1] == 106.0  # Last coupon and notional
+    assert cash_flow_matrix.dates[-1] == np.datetime64("2030-12-01")
+
+
+def test_price(corp_bonds, modelling_date):
+    portfolio = CorpBondArrayPortfolio.from_bonds(corp_bonds)
+    cash_flow_matrix = portfolio.create_cash_flow_matrix(modelling_date)
+    assert portfolio.price(modelling_date, lambda t: np.zeros(t.shape)) == pytest.approx(cash_flow_matrix.to_dense()
+                                                                                          .sum(axis=1))
+    spread = portfolio.sector_spread({"AB.2": 0.01, "AB.3": 0.02, "AB.4": 0.03})
+    assert spread.tolist() == [0.01, 0.02, 0.01, 0.03]
+    prices = portfolio.price(modelling_date, lambda t: np.full(t.shape, 0.02), spread=spread)
+    # Annual compounding by default, like the Smith-Wilson zero rates
+    expected = (cash_flow_matrix.to_dense() * (1.02 + spread)[:, None] ** -cash_flow_matrix.year_fractions).sum(1)
+    assert prices == pytest.approx(expected)
+    continuous = portfolio.price(modelling_date, lambda t: np.full(t.shape, 0.02), -1, spread)
+    expected = (cash_flow_matrix.to_dense() * np.exp(-np.outer(0.02 + spread, cash_flow_matrix.year_fractions))).sum(1)
+    assert continuous == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("compounding, x_start", [(-1, -0.2), (0, -0.05), (2, -0.2)])
+def test_solve_z_spread(corp_bonds, modelling_date, compounding, x_start):
+    portfolio = CorpBondArrayPortfolio.from_bonds(corp_bonds)
+    zero_rates = lambda t: 0.02 + 0.001 * t
+    spread = np.array([0.01, 0.0, 0.02, 0.0])
+    z_spread = np.array([0.015, -0.005, 0.1, 0.0])
+    market_price = portfolio.price(modelling_date, zero_rates, compounding, spread + z_spread)
+    market_price[2] = 1000.0  # Above the price at the lowest allowed z-spread
+
+    result = portfolio.solve_z_spread(modelling_date, zero_rates, compounding, spread, market_price, x_start=x_start)
+    assert result.converged.tolist() == [True, True, False, False]
+    assert result.z_spread[:2] == pytest.approx(z_spread[:2], abs=1e-9)
+    assert np.abs(result.price_error[:2]).max() < 1e-10
+    assert result.z_spread[2] == x_start
+    assert np.isnan(result.z_spread[3])  # Bond 4 has matured
+    assert result.non_converged.tolist() == [3, 4]
+    assert result.iterations[:2].max() < 20
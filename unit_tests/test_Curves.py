@@ -0,0 +1,232 @@
+import Curves as curves_module
+from Curves import Curves, DiscountCurve, calibrate_curves, instrument_cash_flows
+import numpy as np
+import pytest
+import datetime
+
+
+@pytest.fixture
+def curves() -> Curves:
+    curves = Curves(ufr=0.042, precision=1e-10, tau=0.0001, initial_date=datetime.date(2023, 4, 29),
+                    country="Slovenia")
+    return curves
+
+
+@pytest.fixture
+def m_obs() -> np.ndarray:
+    return np.array([1.0, 2.0, 4.0, 5.0, 6.0, 7.0])
+
+
+@pytest.fixture
+def r_obs() -> np.ndarray:
+    return np.array([0.01, 0.02, 0.03, 0.032, 0.035, 0.04])
+
+
+def test_calibrated_curve_fits_observed_rates(curves, m_obs, r_obs):
+    b = curves.SWCalibrate(r_obs, m_obs, curves.ufr, 0.15)
+    assert curves.SWExtrapolate(m_obs, m_obs, b, curves.ufr, 0.15) == pytest.approx(r_obs, abs=1e-12)
+
+
+def test_calibrate_matches_explicit_inverse(curves, m_obs, r_obs):
+    d = np.exp(-np.log(1 + curves.ufr) * m_obs)
+    Q = np.diag(d)
+    H = curves.SWHeart(m_obs, m_obs, 0.15)
+    expected = np.linalg.inv(Q.transpose() @ H @ Q) @ ((1 + r_obs) ** (-m_obs) - d)
+    assert curves.SWCalibrate(r_obs, m_obs, curves.ufr, 0.15) == pytest.approx(expected, rel=1e-10)
+
+
+def test_calibrate_without_scipy(curves, m_obs, r_obs, monkeypatch):
+    b = curves.SWCalibrate(r_obs, m_obs, curves.ufr, 0.15)
+    monkeypatch.setattr(curves_module, "cho_factor", None)
+    assert curves.SWCalibrate(r_obs, m_obs, curves.ufr, 0.15) == pytest.approx(b, rel=1e-10)
+
+
+def test_heart_is_symmetric(curves, m_obs):
+    H = curves.SWHeart(m_obs, m_obs, 0.15)
+    assert H.shape == (6, 6)
+    assert np.array_equal(H, H.transpose())
+    assert curves.SWHeart(m_obs, np.array([1.0, 3.0]), 0.15).shape == (6, 2)
+
+
+def test_bisection_alpha(curves, m_obs, r_obs):
+    alpha = curves.BisectionAlpha(0.05, 0.5, m_obs, r_obs, curves.ufr, curves.Tau, curves.Precision, 1000)
+    assert alpha == pytest.approx(0.11403727445867842, abs=1e-9)
+
+
+def test_galfa_function_matches_galfa(curves, m_obs, r_obs):
+    galfa = curves.GalfaFunction(m_obs, r_obs, curves.ufr, curves.Tau)
+    for alpha in [0.05, 0.15, 0.4]:
+        assert galfa(alpha) == pytest.approx(curves.Galfa(m_obs, r_obs, curves.ufr, alpha, curves.Tau), abs=1e-15)
+
+
+def test_brent_alpha_matches_bisection(curves, m_obs, r_obs):
+    result = curves.BrentAlpha(0.05, 0.5, m_obs, r_obs, curves.ufr, curves.Tau, curves.Precision, 1000)
+    alpha = curves.BisectionAlpha(0.05, 0.5, m_obs, r_obs, curves.ufr, curves.Tau, curves.Precision, 1000)
+    assert result.converged is True
+    assert result.alpha == pytest.approx(alpha, abs=1e-9)
+    assert abs(result.residual) < 1e-10
+    assert 0 < result.iterations < 30
+
+
+def test_brent_alpha_without_root(curves, m_obs, r_obs):
+    # Galfa is negative on the whole interval, bisection moves all the way to the end point
+    result = curves.BrentAlpha(0.3, 0.5, m_obs, r_obs, curves.ufr, curves.Tau, curves.Precision, 1000)
+    assert result.converged is False
+    assert result.alpha == 0.5
+    assert result.alpha == pytest.approx(curves.BisectionAlpha(0.3, 0.5, m_obs, r_obs, curves.ufr, curves.Tau,
+                                                               curves.Precision, 1000), abs=1e-9)
+
+
+def test_calibrate_curves_matches_single_curves(curves, m_obs, r_obs):
+    m_obs_all = {"A": m_obs, "B": m_obs[:4], "C": m_obs, "D": m_obs}
+    r_obs_all = {"A": r_obs, "B": r_obs[:4], "C": r_obs + 0.005, "D": r_obs}
+    ufr_all = {"A": 0.042, "B": 0.042, "C": 0.035, "D": 0.042}
+    calibrated = calibrate_curves(m_obs_all, r_obs_all, ufr_all, curves.Precision, curves.Tau, curves.InitialDate)
+    assert list(calibrated) == ["A", "B", "C", "D"]
+    for country in ["A", "B", "C"]:
+        single = Curves(ufr_all[country], curves.Precision, curves.Tau, curves.InitialDate, country)
+        result = single.BrentAlpha(0.05, 0.5, m_obs_all[country], r_obs_all[country], ufr_all[country], single.Tau,
+                                   single.Precision, 1000)
+        curve = calibrated[country]
+        assert curve.Country == country
+        assert curve.alpha_result.converged is True
+        assert curve.alpha == pytest.approx(result.alpha, abs=1e-9)
+        assert curve.b == pytest.approx(single.SWCalibrate(r_obs_all[country], m_obs_all[country], curve.ufr,
+                                                           curve.alpha), rel=1e-8)
+
+
+def test_calibrate_curves_without_root(curves, m_obs, r_obs):
+    calibrated = calibrate_curves({"A": m_obs}, {"A": r_obs}, {"A": curves.ufr}, curves.Precision, curves.Tau,
+                                  curves.InitialDate, x_start=0.3, x_end=0.5)
+    assert calibrated["A"].alpha == 0.5
+    assert calibrated["A"].alpha_result.converged is False
+
+
+@pytest.fixture
+def annual_curve() -> list:
+    m_obs = np.arange(1.0, 11.0)
+    r_obs = np.array([0.01, 0.02, 0.025, 0.03, 0.032, 0.035, 0.037, 0.038, 0.039, 0.04])
+    return [m_obs, r_obs]
+
+
+def test_forward_curves_are_implied_by_initial_curve(curves, annual_curve):
+    [m_obs, r_obs] = annual_curve
+    family = curves.ProjectForwardCurves(m_obs, r_obs, 4)
+    assert len(family) == 4
+    assert family.offsets.tolist() == [0, 10, 19, 27, 34]
+    [maturities, rates, b, alpha] = family.curve(0)
+    assert rates == pytest.approx(r_obs, abs=1e-15)
+    [maturities, rates, b, alpha] = family.curve(3)
+    assert maturities.tolist() == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0]
+    assert (1 + rates[1]) ** 2 == pytest.approx((1 + r_obs[4]) ** 5 / (1 + r_obs[2]) ** 3)
+
+
+def test_forward_curves_match_single_calibration(curves, annual_curve):
+    [m_obs, r_obs] = annual_curve
+    family = curves.ProjectForwardCurves(m_obs, r_obs, 4)
+    assert family.converged.all()
+    for year in range(4):
+        [maturities, rates, b, alpha] = family.curve(year)
+        result = curves.BrentAlpha(0.05, 0.5, maturities, rates, curves.ufr, curves.Tau, curves.Precision, 1000)
+        assert alpha == pytest.approx(result.alpha, abs=1e-9)
+        assert b == pytest.approx(curves.SWCalibrate(rates, maturities, curves.ufr, alpha), rel=1e-8)
+        assert family.zero_rates(year)(maturities) == pytest.approx(rates, abs=1e-10)
+
+
+def test_forward_curves_on_processes(curves, annual_curve):
+    [m_obs, r_obs] = annual_curve
+    family = curves.ProjectForwardCurves(m_obs, r_obs, 4)
+    parallel_family = curves.ProjectForwardCurves(m_obs, r_obs, 4, max_workers=2)
+    assert np.array_equal(parallel_family.alpha, family.alpha)
+    assert np.array_equal(parallel_family.b, family.b)
+
+
+def test_forward_curves_need_annual_maturities(curves, m_obs, r_obs):
+    with pytest.raises(ValueError):
+        curves.ProjectForwardCurves(m_obs, r_obs, 2)
+
+
+@pytest.fixture
+def discount_curve(curves, m_obs, r_obs) -> DiscountCurve:
+    calibrated = calibrate_curves({"Slovenia": m_obs}, {"Slovenia": r_obs}, {"Slovenia": curves.ufr},
+                                  curves.Precision, curves.Tau, curves.InitialDate)
+    return DiscountCurve(calibrated["Slovenia"], horizon_years=60)
+
+
+def test_discount_curve_on_grid_dates(discount_curve):
+    curve = discount_curve.curves
+    dates = [datetime.date(2024, 4, 29), datetime.date(2030, 1, 15), datetime.date(2080, 12, 31)]
+    year_fractions = (np.array(dates, dtype="datetime64[D]") - np.datetime64("2023-04-29")).astype(int) / 365.25
+    expected = curve.SWExtrapolate(year_fractions, curve.M_Obs, curve.b, curve.ufr, curve.alpha)
+    assert discount_curve.zero_rates_on(dates) == pytest.approx(expected, abs=1e-15)
+    assert discount_curve.discount_factors_on(dates) == pytest.approx((1 + expected) ** (-year_fractions), abs=1e-15)
+    assert discount_curve.discount_factors_on([datetime.date(2023, 4, 29)]).tolist() == [1.0]
+
+
+def test_discount_curve_interpolates_year_fractions(discount_curve, m_obs, r_obs):
+    assert discount_curve.zero_rates(m_obs) == pytest.approx(r_obs, abs=1e-8)
+    curve = discount_curve.curves
+    beyond = np.array([70.0, 100.0])
+    assert discount_curve.zero_rates(beyond) == pytest.approx(curve.SWExtrapolate(beyond, curve.M_Obs, curve.b,
+                                                                                  curve.ufr, curve.alpha))
+
+
+def test_discount_curve_forward_rates(discount_curve):
+    [first, second] = discount_curve.discount_factors_on([datetime.date(2030, 1, 15), datetime.date(2030, 1, 16)])
+    assert discount_curve.forward_rates_on([datetime.date(2030, 1, 15)])[0] == \
+        pytest.approx((first / second) ** 365.25 - 1)
+
+
+def test_discount_curve_dates_outside_grid(discount_curve):
+    with pytest.raises(ValueError):
+        discount_curve.zero_rates_on([datetime.date(2023, 1, 1)])
+    with pytest.raises(ValueError):
+        DiscountCurve(Curves(0.042, 1e-10, 0.0001, datetime.date(2023, 4, 29), "Slovenia"))
+
+
+def test_calibrate_several_rate_sets(curves, m_obs, r_obs):
+    rate_sets = np.vstack([r_obs, r_obs + 0.001, r_obs * 2])
+    b = curves.SWCalibrate(rate_sets, m_obs, curves.ufr, 0.15)
+    assert b.shape == (3, 6)
+    for row in range(3):
+        assert b[row] == pytest.approx(curves.SWCalibrate(rate_sets[row], m_obs, curves.ufr, 0.15), rel=1e-12)
+    rates = curves.SWExtrapolate(np.array([0.5, 3.0, 60.0]), m_obs, b, curves.ufr, 0.15)
+    assert rates.shape == (3, 3)
+    assert rates[1] == pytest.approx(curves.SWExtrapolate(np.array([0.5, 3.0, 60.0]), m_obs, b[1], curves.ufr, 0.15))
+
+
+def test_zero_coupon_instruments_match_zero_coupon_calibration(curves, m_obs, r_obs):
+    C = np.identity(m_obs.size)
+    p = (1 + r_obs) ** (-m_obs)
+    b = curves.SWCalibrateInstruments(p, C, m_obs, curves.ufr, 0.15)
+    assert b == pytest.approx(curves.SWCalibrate(r_obs, m_obs, curves.ufr, 0.15), rel=1e-10)
+    expected = curves.BrentAlpha(0.05, 0.5, m_obs, r_obs, curves.ufr, curves.Tau, curves.Precision, 1000)
+    result = curves.BrentAlphaInstruments(0.05, 0.5, p, C, m_obs, curves.ufr, curves.Tau, curves.Precision, 1000)
+    assert result.alpha == pytest.approx(expected.alpha, abs=1e-9)
+
+
+def test_instrument_cash_flows():
+    [C, payment_times, prices] = instrument_cash_flows([0.02, 0.04], [0.5, 1.5], 2)
+    assert payment_times.tolist() == [0.5, 1.0, 1.5]
+    assert np.asarray(C.todense() if hasattr(C, "todense") else C).tolist() == [[1.01, 0.0, 0.0],
+                                                                                 [0.02, 0.02, 1.02]]
+    assert prices.tolist() == [1.0, 1.0]
+
+
+@pytest.mark.parametrize("scipy_installed", [True, False])
+def test_calibrate_to_par_swaps(curves, monkeypatch, scipy_installed):
+    if not scipy_installed:
+        monkeypatch.setattr(curves_module, "sp", None)
+    maturities = np.array([1.0, 2.0, 3.0, 5.0, 7.0, 10.0, 15.0, 20.0])
+    [C, payment_times, prices] = instrument_cash_flows(0.01 + 0.002 * maturities ** 0.5, maturities, 2)
+    result = curves.CalibrateInstruments(prices, C, payment_times)
+    assert result.converged
+    assert curves.M_Obs.tolist() == payment_times.tolist()
+
+    # The curve reprices every swap at par
+    rates = curves.SWExtrapolate(payment_times, curves.M_Obs, curves.b, curves.ufr, curves.alpha)
+    assert np.asarray(C @ (1 + rates) ** (-payment_times)) == pytest.approx(prices, abs=1e-12)
+
+    b = curves.SWCalibrateInstruments(prices, C, payment_times, curves.ufr, curves.alpha)
+    assert curves.SWExtrapolateInstruments(np.array([3.0, 80.0]), payment_times, b, C, curves.ufr, curves.alpha) == \
+        pytest.approx(curves.SWExtrapolate(np.array([3.0, 80.0]), curves.M_Obs, curves.b, curves.ufr, curves.alpha))
@@ -0,0 +1,67 @@
+from ESGClasses import HullWhite, EconomicScenarioGenerator
+from Curves import Curves, calibrate_curves
+import numpy as np
+import pytest
+import datetime
+
+
+@pytest.fixture
+def curves() -> Curves:
+    m_obs = np.array([1.0, 2.0, 4.0, 5.0, 6.0, 7.0])
+    r_obs = np.array([0.01, 0.02, 0.03, 0.032, 0.035, 0.04])
+    return calibrate_curves({"Slovenia": m_obs}, {"Slovenia": r_obs}, {"Slovenia": 0.042}, 1e-10, 0.0001,
+                            datetime.date(2023, 4, 29))["Slovenia"]
+
+
+@pytest.fixture
+def generator(curves) -> EconomicScenarioGenerator:
+    return EconomicScenarioGenerator(HullWhite(curves, 0.05, 0.01), n_steps=20, seed=42, block_size=64)
+
+
+def test_uncalibrated_curve():
+    with pytest.raises(ValueError):
+        HullWhite(Curves(0.042, 1e-10, 0.0001, datetime.date(2023, 4, 29), "Slovenia"), 0.05, 0.01)
+
+
+def test_no_volatility_follows_forward_curve(curves):
+    model = HullWhite(curves, 0.05, 0.0)
+    chunk = EconomicScenarioGenerator(model, n_steps=10, seed=1).simulate(0, 3)
+    expected = np.exp(model.log_discount(chunk.times))
+    assert chunk.deflator == pytest.approx(np.tile(expected, (3, 1)), rel=1e-12)
+    assert chunk.short_rate[0] == pytest.approx(model.forward_rates(chunk.times))
+
+
+def test_deflators_reprice_the_curve(generator):
+    chunk = generator.simulate(0, 4000)
+    expected = np.exp(generator.model.log_discount(generator.times))
+    standard_error = chunk.deflator.std(axis=0) / np.sqrt(len(chunk))
+    assert (np.abs(chunk.deflator.mean(axis=0) - expected) < 4 * standard_error + 1e-15).all()
+
+
+def test_scenarios_do_not_depend_on_chunks(generator):
+    everything = generator.simulate(0, 300)
+    chunks = list(generator.generate(300, chunk_size=70))
+    assert [chunk.start for chunk in chunks] == [0, 70, 140, 210, 280]
+    assert np.array_equal(np.vstack([chunk.short_rate for chunk in chunks]), everything.short_rate)
+    assert np.array_equal(generator.simulate(100, 130).deflator, everything.deflator[100:130])
+    assert chunks[1].scenarios.tolist() == list(range(70, 140))
+    # Chunks smaller than a block skip the scenarios before them in several draws
+    small_chunks = list(generator.generate(130, chunk_size=3))
+    assert np.array_equal(np.vstack([chunk.deflator for chunk in small_chunks]), everything.deflator[:130])
+
+
+def test_seeds_give_independent_scenarios(curves, generator):
+    same = EconomicScenarioGenerator(HullWhite(curves, 0.05, 0.01), n_steps=20, seed=42, block_size=64)
+    other = EconomicScenarioGenerator(HullWhite(curves, 0.05, 0.01), n_steps=20, seed=43, block_size=64)
+    assert np.array_equal(same.simulate(0, 10).short_rate, generator.simulate(0, 10).short_rate)
+    assert not np.array_equal(other.simulate(0, 10).short_rate, generator.simulate(0, 10).short_rate)
+    # Blocks use different streams
+    assert not np.array_equal(generator.simulate(0, 10).short_rate, generator.simulate(64, 74).short_rate)
+
+
+def test_memory_budget(generator):
+    budget = 100 * generator.bytes_per_scenario()
+    chunks = list(generator.generate(500, memory_budget=budget))
+    assert [len(chunk) for chunk in chunks] == [64] * 7 + [52]
+    with pytest.raises(ValueError):
+        next(generator.generate(500, memory_budget=10))
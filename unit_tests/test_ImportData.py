@@ -0,0 +1,126 @@
+from ImportData import get_corporate_bonds, get_EquityShare, get_Liability, read_columns, read_corporate_bonds, \
+    read_equity_shares, read_liability
+from BondClasses import CorpBondArrayPortfolio
+from EquityClasses import EquitySharePortfolio, EquityShareArrayPortfolio
+from SyntheticPortfolioClasses import read_seed_file, write_portfolio
+from datetime import date
+import numpy as np
+import pandas as pd
+import pytest
+
+BOND_HEADER = "Asset_ID,Asset_Type,NACE,Issue_Date,Maturity_Date,Notional_Amount,Coupon_Rate,Frequency," \
+              "Recovery_Rate,Default_Probability,Market_Price\n"
+
+
+@pytest.fixture
+def bond_file(tmp_path):
+    def write(*rows):
+        path = tmp_path / "bonds.csv"
+        path.write_text(BOND_HEADER + "".join(row + "\n" for row in rows), encoding="utf-8")
+        return str(path)
+    return write
+
+
+def test_bonds_match_row_loader():
+    expected = CorpBondArrayPortfolio.from_bonds(get_corporate_bonds("Input/Bond_Portfolio.csv"))
+    bonds = read_corporate_bonds("Input/Bond_Portfolio.csv")
+    for name in ["asset_id", "nace", "issue_date", "maturity_date", "coupon_rate", "notional_amount", "frequency",
+                 "recovery_rate", "default_probability", "market_price"]:
+        np.testing.assert_array_equal(getattr(bonds, name), getattr(expected, name))
+
+
+@pytest.mark.parametrize("filename", ["Input/Equity_Portfolio_test.csv", "synthetic"])
+def test_equities_match_row_loader(tmp_path, filename):
+    if filename == "synthetic":
+        filename = write_portfolio(str(tmp_path), 2000, read_seed_file("Input/NACE_Generated.csv"),
+                                   read_seed_file("Input/Maturity_Generated.csv"), date(2023, 4, 29), 50,
+                                   seed=3)["equities"]
+    expected = EquitySharePortfolio({equity_share.asset_id: equity_share
+                                     for equity_share in get_EquityShare(filename)})
+    equities = read_equity_shares(filename)
+    columns = EquityShareArrayPortfolio.from_shares(expected.equity_share.values())
+    for name in ["asset_id", "nace", "issue_date", "dividend_yield", "frequency", "market_price", "growth_rate"]:
+        np.testing.assert_array_equal(getattr(equities, name), getattr(columns, name))
+
+    [modelling_date, end_date] = [date(2023, 4, 29), date(2073, 4, 29)]
+    dividends = equities.create_dividend_dates(modelling_date, end_date)
+    expected_dividends = expected.create_dividend_dates(modelling_date, end_date)
+    assert [list(profile) for profile in dividends] == [list(profile) for profile in expected_dividends]
+    for profile, expected_profile in zip(dividends, expected_dividends):
+        assert list(profile.values()) == pytest.approx(list(expected_profile.values()), rel=1e-14)
+    assert equities.unique_dates_profile(dividends) == expected.unique_dates_profile(expected_dividends)
+    terminals = equities.create_terminal_dates(modelling_date, end_date, 0.0345)
+    expected_terminals = expected.create_terminal_dates(modelling_date, end_date, 0.0345)
+    assert [list(profile) for profile in terminals] == [list(profile) for profile in expected_terminals]
+    for profile, expected_profile in zip(terminals, expected_terminals):
+        assert list(profile.values()) == pytest.approx(list(expected_profile.values()), rel=1e-14)
+    for frame, expected_frame in zip(equities.init_equity_portfolio_to_dataframe(modelling_date),
+                                     expected.init_equity_portfolio_to_dataframe(modelling_date)):
+        pd.testing.assert_frame_equal(frame, expected_frame)
+
+
+def test_equity_rules_are_checked_for_all_shares(tmp_path):
+    path = tmp_path / "equities.csv"
+    path.write_text("Asset_ID,Asset_Type,NACE,Issue_Date,Dividend_Yield,Frequency,Market_Price, Terminal,"
+                    "Default_Probability,Growth_Rate\n"
+                    "1,Equity_Share,A1.4.5,3/12/2021,0.03,1,-94,1,0.03,0.01\n"
+                    "1,Equity_Share,A1.4.5,3/12/2021,0.03,5,94,1,0.03,0.01\n", encoding="utf-8")
+    with pytest.raises(ValueError) as error:
+        read_equity_shares(str(path))
+    message = str(error.value)
+    assert "Asset ID must be unique (asset ids: [1, 1])" in message
+    assert "Market price cannot be negative (asset ids: [1])" in message
+    assert "Frequency must be either" in message
+
+
+def test_liability_is_array_backed():
+    expected = get_Liability("Input/Liability_Cashflow.csv")
+    liability = read_liability("Input/Liability_Cashflow.csv")
+    assert liability.cash_flow_dates.dtype == np.dtype("datetime64[D]")
+    np.testing.assert_array_equal(liability.cash_flow_dates, expected.cash_flow_dates)
+    np.testing.assert_array_equal(liability.cash_flow_series, expected.cash_flow_series)
+
+
+def test_read_columns_types(bond_file):
+    filename = bond_file("1,Corporate_Bond, A1.4.5 ,3/12/2021,12/12/2026,100,0.03,1,0.4,0.03,94")
+    columns = read_columns(filename, dates=["Issue_Date"], integers=["Frequency"], floats=["Market_Price"],
+                           strings=["NACE"])
+    assert columns["Issue_Date"].tolist() == [date(2021, 12, 3)]
+    assert columns["Frequency"].dtype == np.int64
+    assert columns["Market_Price"].tolist() == [94.0]
+    assert columns["NACE"].tolist() == ["A1.4.5"]
+
+
+def test_every_bad_value_is_reported(bond_file):
+    filename = bond_file("1,Corporate_Bond,A1.4.5,3/12/2021,12/12/2026,100,0.03,1,0.4,0.03,94",
+                         "2,Corporate_Bond,A1.4.5,31/2/2021,12/12/2026,100,0.03,1,0.4,0.03,94",
+                         "3,Corporate_Bond,A1.4.5,3/12/2021,,100,abc,1.5,0.4,0.03,94",
+                         "4,Corporate_Bond,,3/12/2021,12/12/2026,100,0.03,1,0.4,0.03,")
+    with pytest.raises(ValueError) as error:
+        read_corporate_bonds(filename)
+    message = str(error.value)
+    assert "invalid Issue_Date on lines [3]" in message
+    assert "invalid Maturity_Date on lines [4]" in message
+    assert "invalid Frequency on lines [4]" in message
+    assert "invalid Coupon_Rate on lines [4]" in message
+    assert "invalid Market_Price on lines [5]" in message
+    assert "invalid NACE on lines [5]" in message
+
+
+def test_rules_are_checked_for_all_bonds(bond_file):
+    filename = bond_file("1,Corporate_Bond,A1.4.5,3/12/2021,12/12/2026,100,-0.03,1,0.4,0.03,94",
+                         "2,Corporate_Bond,A1.4.5,3/12/2021,12/12/2026,100,0.03,1,0.4,0.03,94",
+                         "2,Corporate_Bond,A1.4.5,3/12/2021,12/12/2026,100,0.03,7,0.4,0.03,94")
+    with pytest.raises(ValueError) as error:
+        read_corporate_bonds(filename)
+    message = str(error.value)
+    assert "Asset ID must be unique (asset ids: [2, 2])" in message
+    assert "Coupon rate cannot be negative (asset ids: [1])" in message
+    assert "Frequency must be either" in message
+
+
+def test_missing_column(tmp_path):
+    path = tmp_path / "liability.csv"
+    path.write_text("Liability_Date\n1/9/2023\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="missing columns \\['Liability_Size'\\]"):
+        read_liability(str(path))
@@ -0,0 +1,100 @@
+from InputCacheClass import InputCache
+from ImportData import get_configuration, read_liability, import_SWEiopa_all
+import configparser
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+LIABILITIES = "Liability_Date,Liability_Size\n1/9/2023,6\n2/10/2023,92\n"
+
+
+@pytest.fixture
+def liability_file(tmp_path):
+    path = tmp_path / "liability.csv"
+    path.write_text(LIABILITIES, encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return InputCache(str(tmp_path / "input_cache"))
+
+
+def test_second_read_is_memory_mapped(cache, liability_file):
+    first = read_liability(liability_file, cache)
+    second = read_liability(liability_file, cache)
+    assert cache.builds == 1
+    assert isinstance(second.cash_flow_series, np.memmap)
+    assert not second.cash_flow_series.flags.writeable
+    np.testing.assert_array_equal(second.cash_flow_dates, first.cash_flow_dates)
+    np.testing.assert_array_equal(second.cash_flow_series, [6.0, 92.0])
+
+
+def test_touched_file_with_same_content_is_not_rebuilt(cache, liability_file):
+    read_liability(liability_file, cache)
+    status = os.stat(liability_file)
+    os.utime(liability_file, ns=(status.st_atime_ns, status.st_mtime_ns + 10 ** 9))
+    read_liability(liability_file, cache)
+    read_liability(liability_file, cache)
+    assert cache.builds == 1
+
+
+def test_changed_file_is_rebuilt(cache, liability_file):
+    read_liability(liability_file, cache)
+    with open(liability_file, mode="a", encoding="utf-8") as csv_file:
+        csv_file.write("3/11/2023,7\n")
+    liability = read_liability(liability_file, cache)
+    assert cache.builds == 2
+    np.testing.assert_array_equal(liability.cash_flow_series, [6.0, 92.0, 7.0])
+
+
+def test_invalid_file_is_not_cached(cache, liability_file):
+    with open(liability_file, mode="a", encoding="utf-8") as csv_file:
+        csv_file.write("3/11/2023,x\n")
+    for _ in range(2):
+        with pytest.raises(ValueError, match="invalid Liability_Size on lines \\[4\\]"):
+            read_liability(liability_file, cache)
+    assert cache.builds == 0
+
+
+def test_disabled_cache_writes_nothing(tmp_path, liability_file):
+    cache = InputCache(str(tmp_path / "input_cache"), enabled=False)
+    read_liability(liability_file, cache)
+    assert cache.builds == 0
+    assert not os.path.exists(cache.directory)
+
+
+@pytest.mark.parametrize("filename", ["Input/Param_no_VA.csv", "Input/Curves_no_VA.csv"])
+def test_cached_frame_equals_csv(cache, filename):
+    cache.frame(filename)
+    pd.testing.assert_frame_equal(cache.frame(filename), pd.read_csv(filename, sep=",", index_col=0))
+    assert cache.builds == 1
+
+
+def test_eiopa_import_from_cache(cache):
+    expected = import_SWEiopa_all("Input/Param_no_VA.csv", "Input/Curves_no_VA.csv")
+    import_SWEiopa_all("Input/Param_no_VA.csv", "Input/Curves_no_VA.csv", cache)
+    [maturities, curves, extra_param, Qb] = import_SWEiopa_all("Input/Param_no_VA.csv", "Input/Curves_no_VA.csv",
+                                                               cache)
+    pd.testing.assert_frame_equal(curves, expected[1])
+    pd.testing.assert_frame_equal(extra_param, expected[2])
+    pd.testing.assert_series_equal(maturities["Slovenia"], expected[0]["Slovenia"])
+    pd.testing.assert_series_equal(Qb["Slovenia"], expected[3]["Slovenia"])
+
+
+def test_text_columns_are_not_cached(cache, tmp_path):
+    path = tmp_path / "spread.csv"
+    path.write_text("NACE,Sector,sSpread\nA1.4.5,Agriculture,0.01\n", encoding="utf-8")
+    assert cache.frame(str(path)).loc["A1.4.5", "sSpread"] == 0.01
+    assert cache.builds == 0
+
+
+def test_cache_configuration(tmp_path):
+    ini_file = tmp_path / "ALM.ini"
+    ini_file.write_text("[BASE]\nbase_folder = " + str(tmp_path) + "\n[INTERMEDIATE]\nenabled = True\n"
+                        "file_path = Intermediate\ncash_portfolio_file = cash.csv\nequity_portfolio_file = equity.csv\n"
+                        "input_cache = True\n")
+    configuration = get_configuration(str(ini_file), os, configparser.ConfigParser())
+    assert configuration.input_cache_enabled is True
+    assert configuration.input_cache_path == os.path.join(str(tmp_path), "Intermediate", "input_cache")
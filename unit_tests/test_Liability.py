@@ -1,5 +1,6 @@
 from LiabilityClasses import Liability
 import datetime
+import numpy as np
 import pytest
 
 
@@ -25,3 +26,10 @@ def test_construct():
     assert liability_position.liability_id == liability_id
     assert liability_position.cash_flow_dates == cash_flow_dates
     assert liability_position.cash_flow_series == cash_flow_series
+
+
+def test_unique_dates_profile():
+    cash_flow_dates = np.array(["2016-12-01", "2015-12-01", "2016-12-01"], dtype="datetime64[D]")
+    liability_position = Liability(liability_id=1, cash_flow_dates=cash_flow_dates,
+                                   cash_flow_series=np.array([100.0, 120.0, 150.0]))
+    assert liability_position.unique_dates_profile() == [datetime.date(2016, 12, 1), datetime.date(2015, 12, 1)]
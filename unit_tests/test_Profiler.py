@@ -0,0 +1,70 @@
+from ProfilerClass import Profiler
+from ImportData import get_configuration
+import configparser
+import os
+import time
+import pytest
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_disabled_profiler_does_nothing():
+    profiler = Profiler()
+    with profiler.stage("import"):
+        busy(0.01)
+    assert profiler.stages == {}
+    assert profiler.collapsed_stacks() == []
+
+
+def test_stages_are_timed_and_sampled():
+    profiler = Profiler(enabled=True, interval=0.001)
+    with profiler.stage("import"):
+        busy(0.05)
+    with profiler.stage("projection"):
+        with profiler.stage("run"):
+            data = [bytearray(1000) for _ in range(2000)]
+            busy(0.05)
+            del data
+    assert list(profiler.stages) == ["import", "projection", "projection;run"]
+    assert profiler.stages["import"].seconds >= 0.05
+    assert profiler.stages["projection"].seconds >= profiler.stages["projection;run"].seconds
+    # The peak of the inner stage is also the peak of the outer stage
+    assert profiler.stages["projection;run"].peak_memory > 2000 * 1000
+    assert profiler.stages["projection"].peak_memory >= profiler.stages["projection;run"].peak_memory
+    assert profiler.stages["import"].samples > 0
+    stacks = profiler.collapsed_stacks()
+    assert any(stack.startswith("import;") and "test_Profiler.py:busy " in stack for stack in stacks)
+    assert sum(int(stack.rsplit(" ", 1)[1]) for stack in stacks) == \
+        sum(stats.samples for stats in profiler.stages.values())
+
+
+def test_write(tmp_path):
+    profiler = Profiler(enabled=True, interval=0.001, trace_memory=False)
+    with profiler.stage("curves"):
+        busy(0.02)
+    [stacks_file, stages_file] = profiler.write(str(tmp_path))
+    assert os.path.basename(stacks_file) == "profile.collapsed"
+    with open(stages_file) as stages:
+        lines = stages.read().splitlines()
+    assert lines[0] == "stage,seconds,peak_memory_bytes,end_memory_bytes,samples"
+    assert lines[1].startswith("curves,")
+    assert "curves" in profiler.summary()
+
+
+def test_interval_must_be_positive():
+    with pytest.raises(ValueError):
+        Profiler(interval=0)
+
+
+def test_trace_configuration(tmp_path):
+    ini_file = tmp_path / "ALM.ini"
+    ini_file.write_text("[TRACE]\nenabled = False\nprofile = True\nprofile_interval = 0.01\n")
+    configuration = get_configuration(str(ini_file), os, configparser.ConfigParser())
+    assert configuration.trace_enabled is False
+    assert configuration.profile_enabled is True
+    assert configuration.profile_interval == 0.01
+    assert configuration.profile_memory is True
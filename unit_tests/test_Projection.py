@@ -0,0 +1,109 @@
+from ProjectionClasses import ProjectionEngine
+import numpy as np
+import pytest
+import datetime
+
+
+@pytest.fixture
+def projection_engine() -> ProjectionEngine:
+    modelling_date = datetime.date(2023, 1, 1)
+    dates_of_interest = [datetime.date(2024, 1, 1), datetime.date(2025, 1, 1)]
+    dividend_cash_flows = np.array([[1.0, 1.0], [2.0, 2.0]])
+    terminal_cash_flows = np.array([[10.0], [20.0]])
+
+    projection_engine = ProjectionEngine(modelling_date=modelling_date,
+                                         dates_of_interest=dates_of_interest,
+                                         asset_ids=[1, 2],
+                                         market_price=np.array([100.0, 200.0]),
+                                         growth_rate=np.array([0.0, 0.0]),
+                                         bank_account=0.0,
+                                         dividend_dates=[datetime.date(2023, 6, 1), datetime.date(2024, 6, 1)],
+                                         dividend_cash_flows=dividend_cash_flows,
+                                         terminal_dates=[datetime.date(2025, 1, 1)],
+                                         terminal_cash_flows=terminal_cash_flows,
+                                         liability_dates=[datetime.date(2023, 12, 1)],
+                                         liability_cash_flows=[33.0])
+    return projection_engine
+
+
+def test_first_period_sells_for_liability(projection_engine):
+    result = projection_engine.run()
+    # Dividends of 3 and a liability of 33 leave a deficit of 30, covered by selling 10% of the portfolio
+    assert result.bank_account[1] == pytest.approx(0.0)
+    assert result.market_value[1] == pytest.approx([90.0, 180.0])
+
+
+def test_second_period_buys_with_excess_cash(projection_engine):
+    result = projection_engine.run()
+    # Dividends and terminal flows were scaled down by the sale in the first period
+    excess_cash = 0.9 * (3.0 + 30.0)
+    assert result.market_value[2].sum() == pytest.approx(270.0 + excess_cash)
+    assert result.bank_account[2] == pytest.approx(0.0)
+
+
+def test_inputs_are_not_modified(projection_engine):
+    projection_engine.run()
+    assert projection_engine.dividend_cash_flows.tolist() == [[1.0, 1.0], [2.0, 2.0]]
+    assert projection_engine.terminal_cash_flows.tolist() == [[10.0], [20.0]]
+
+
+def test_growth_without_cash(projection_engine):
+    projection_engine.growth_rate = np.array([0.1, 0.1])
+    projection_engine.liability_cash_flows = np.array([3.0])
+    result = projection_engine.run()
+    time_frac = 365 / 365.5
+    assert result.market_value[1] == pytest.approx([100.0 * 1.1 ** time_frac, 200.0 * 1.1 ** time_frac])
+    assert result.bank_account[1] == 0.0
+
+
+def test_to_dataframes(projection_engine):
+    [bank_account, market_price] = projection_engine.run().to_dataframes()
+    assert bank_account.shape == (1, 3)
+    assert market_price.shape == (2, 3)
+    assert list(market_price.index) == [1, 2]
+    assert market_price.columns[0] == datetime.date(2023, 1, 1)
+
+
+def test_read_only_cash_flows(projection_engine):
+    projection_engine.dividend_cash_flows.setflags(write=False)
+    projection_engine.terminal_cash_flows.setflags(write=False)
+    result = projection_engine.run()
+    assert result.market_value[2].sum() == pytest.approx(270.0 + 0.9 * 33.0)
+
+
+def test_scenarios_match_single_runs(projection_engine):
+    growth_factor = np.array([[[1.0, 1.0], [1.0, 1.0]],
+                              [[1.2, 0.9], [1.1, 1.0]],
+                              [[0.5, 0.5], [2.0, 1.0]]])
+    result = projection_engine.run_scenarios(growth_factor)
+    assert len(result) == 3
+    assert result.market_value.shape == (3, 3, 2)
+    assert result.scenario(0).market_value == pytest.approx(projection_engine.run().market_value)
+
+    for scenario in range(3):
+        # Growth rates that give the same growth factors in the deterministic projection
+        time_frac = np.array([365, 366]) / 365.5
+        single = projection_engine.run_scenarios(growth_factor[scenario:scenario + 1]).scenario(0)
+        projection_engine.growth_rate = growth_factor[scenario, 0] ** (1 / time_frac[0]) - 1
+        assert single.market_value[1] == pytest.approx(projection_engine.run().market_value[1])
+        assert result.scenario(scenario).bank_account == pytest.approx(single.bank_account)
+        assert result.scenario(scenario).market_value == pytest.approx(single.market_value)
+
+
+def test_scenario_with_falling_market_sells_more(projection_engine):
+    growth_factor = np.array([[[1.0]] * 2, [[0.5]] * 2])  # Same factor for all assets
+    result = projection_engine.run_scenarios(growth_factor)
+    # A deficit of 30 sells 10% of a portfolio of 300 but 20% of a portfolio of 150
+    assert result.market_value[:, 1] == pytest.approx(np.array([[90.0, 180.0], [40.0, 80.0]]))
+    assert result.bank_account[:, 1] == pytest.approx([0.0, 0.0])
+
+
+def test_deterministic_scenarios(projection_engine):
+    result = projection_engine.run_scenarios(n_scenarios=4)
+    assert result.bank_account.shape == (4, 3)
+    assert (result.market_value == result.market_value[0]).all()
+
+
+def test_growth_factor_shape(projection_engine):
+    with pytest.raises(ValueError):
+        projection_engine.run_scenarios(np.ones((2, 3, 2)))
@@ -0,0 +1,79 @@
+from ScenarioRunnerClass import ScenarioRunner, SharedArrays, ShockGrowth
+from ShockClasses import CorrelatedShockModel
+from ProjectionClasses import ProjectionEngine
+from Curves import DiscountCurve, calibrate_curves
+import numpy as np
+import pytest
+import datetime
+
+
+@pytest.fixture
+def projection_engine() -> ProjectionEngine:
+    modelling_date = datetime.date(2023, 1, 1)
+    dates_of_interest = [datetime.date(2024, 1, 1), datetime.date(2025, 1, 1), datetime.date(2026, 1, 1)]
+    return ProjectionEngine(modelling_date=modelling_date, dates_of_interest=dates_of_interest, asset_ids=[1, 2],
+                            market_price=np.array([100.0, 200.0]), growth_rate=np.array([0.01, 0.02]),
+                            bank_account=0.0,
+                            dividend_dates=[datetime.date(2023, 6, 1), datetime.date(2024, 6, 1)],
+                            dividend_cash_flows=np.array([[1.0, 1.0], [2.0, 2.0]]),
+                            terminal_dates=[datetime.date(2025, 1, 1)],
+                            terminal_cash_flows=np.array([[10.0], [20.0]]),
+                            liability_dates=[datetime.date(2023, 12, 1), datetime.date(2025, 12, 1)],
+                            liability_cash_flows=[33.0, 40.0])
+
+
+@pytest.fixture
+def shock_growth() -> ShockGrowth:
+    model = CorrelatedShockModel(["A", "B"], [0.05, 0.03], [0.2, 0.1], 0.4, np.zeros(0, dtype=int), [], n_steps=3,
+                                 seed=11, block_size=8)
+    return ShockGrowth(model, np.array([0, 1]))
+
+
+def test_shared_arrays():
+    arrays = {"matrix": np.arange(6.0).reshape(2, 3), "dates": np.array(["2023-01-01"], dtype="datetime64[D]")}
+    with SharedArrays(arrays) as shared:
+        [attached, blocks] = SharedArrays.attach(shared.spec)
+        assert np.array_equal(attached["matrix"], arrays["matrix"])
+        assert attached["dates"].dtype == np.dtype("datetime64[D]")
+        with pytest.raises(ValueError):
+            attached["matrix"][0, 0] = 1.0
+        del attached
+        for block in blocks:
+            block.close()
+
+
+def test_matches_projection(projection_engine, shock_growth):
+    result = ScenarioRunner(projection_engine, shock_growth, shard_size=7).run(20)
+    expected = projection_engine.run_scenarios(shock_growth(0, 20))
+    assert result.total_value == pytest.approx(expected.bank_account + expected.market_value.sum(axis=2))
+    assert result.mean_bank_account == pytest.approx(expected.bank_account.mean(axis=0))
+    assert result.mean_market_value == pytest.approx(expected.market_value.mean(axis=0))
+    assert result.discounted_value is None
+
+
+def test_deterministic_scenarios(projection_engine):
+    result = ScenarioRunner(projection_engine, shard_size=2).run(3)
+    assert len(result) == 3
+    assert result.total_value[2] == pytest.approx(result.total_value[0])
+    single = projection_engine.run()
+    assert result.mean_market_value == pytest.approx(single.market_value)
+
+
+def test_discounted_value(projection_engine):
+    m_obs = np.array([1.0, 2.0, 4.0, 5.0, 6.0, 7.0])
+    r_obs = np.array([0.01, 0.02, 0.03, 0.032, 0.035, 0.04])
+    curves = calibrate_curves({"Slovenia": m_obs}, {"Slovenia": r_obs}, {"Slovenia": 0.042}, 1e-10, 0.0001,
+                              datetime.date(2023, 1, 1))["Slovenia"]
+    discount_curve = DiscountCurve(curves, horizon_years=5)
+    result = ScenarioRunner(projection_engine, discount_curve=discount_curve).run(2)
+    discount_factor = discount_curve.discount_factors_on(result.dates)
+    assert result.discounted_value == pytest.approx(result.total_value * discount_factor)
+
+
+def test_result_does_not_depend_on_workers(projection_engine, shock_growth):
+    runner = ScenarioRunner(projection_engine, shock_growth, shard_size=5)
+    in_process = runner.run(17)
+    pooled = runner.run(17, max_workers=2)
+    assert np.array_equal(pooled.total_value, in_process.total_value)
+    assert np.array_equal(pooled.mean_market_value, in_process.mean_market_value)
+    assert np.array_equal(pooled.mean_bank_account, in_process.mean_bank_account)
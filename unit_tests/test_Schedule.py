@@ -0,0 +1,66 @@
+from ScheduleClasses import generate_schedule, generate_schedules
+from FrequencyClass import Frequency
+import numpy as np
+import pytest
+import datetime
+
+
+def test_generate_schedule():
+    schedule = generate_schedule(datetime.date(2015, 12, 1), datetime.date(2024, 6, 1), Frequency.QUARTERLY,
+                                 datetime.date(2023, 6, 1))
+    assert schedule.tolist() == [datetime.date(2023, 6, 1), datetime.date(2023, 9, 1), datetime.date(2023, 12, 1),
+                                 datetime.date(2024, 3, 1), datetime.date(2024, 6, 1)]
+
+
+def test_generate_schedule_old_issue():
+    schedule = generate_schedule(datetime.date(1900, 3, 15), datetime.date(2025, 3, 15), Frequency.ANNUAL,
+                                 datetime.date(2023, 3, 16))
+    assert schedule.tolist() == [datetime.date(2024, 3, 15), datetime.date(2025, 3, 15)]
+
+
+def test_generate_schedule_starts_at_anchor():
+    schedule = generate_schedule(datetime.date(2024, 1, 10), datetime.date(2025, 1, 1), Frequency.BIANNUAL,
+                                 datetime.date(2023, 1, 1))
+    assert schedule.tolist() == [datetime.date(2024, 1, 10), datetime.date(2024, 7, 10)]
+
+
+def test_generate_schedule_end_of_month():
+    schedule = generate_schedule(datetime.date(2023, 8, 31), datetime.date(2024, 8, 31), Frequency.QUARTERLY,
+                                 datetime.date(2023, 1, 1))
+    assert schedule.tolist() == [datetime.date(2023, 8, 31), datetime.date(2023, 11, 30), datetime.date(2024, 2, 29),
+                                 datetime.date(2024, 5, 31), datetime.date(2024, 8, 31)]
+
+
+def test_generate_schedule_is_shared():
+    arguments = (datetime.date(2015, 12, 1), datetime.date(2030, 12, 1), Frequency.MONTHLY, datetime.date(2023, 6, 1))
+    schedule = generate_schedule(*arguments)
+    assert generate_schedule(*arguments) is schedule
+    with pytest.raises(ValueError):
+        schedule[0] = np.datetime64("2000-01-01")
+
+
+def test_generate_schedule_empty():
+    schedule = generate_schedule(datetime.date(2010, 1, 1), datetime.date(2020, 1, 1), Frequency.ANNUAL,
+                                 datetime.date(2023, 1, 1))
+    assert schedule.size == 0
+
+
+def test_generate_schedules_match_single_schedules():
+    anchor_dates = [datetime.date(2015, 12, 1), datetime.date(2016, 7, 31), datetime.date(2015, 12, 1),
+                    datetime.date(2010, 1, 1)]
+    end_dates = [datetime.date(2030, 12, 1), datetime.date(2028, 7, 31), datetime.date(2030, 12, 1),
+                 datetime.date(2020, 1, 1)]
+    frequencies = [Frequency.QUARTERLY, Frequency.MONTHLY, Frequency.QUARTERLY, Frequency.ANNUAL]
+    modelling_date = datetime.date(2023, 6, 1)
+
+    [owner, payment_dates] = generate_schedules(anchor_dates, end_dates, frequencies, modelling_date)
+    for position in range(len(anchor_dates)):
+        expected = generate_schedule(anchor_dates[position], end_dates[position], frequencies[position],
+                                     modelling_date)
+        assert payment_dates[owner == position].tolist() == expected.tolist()
+
+
+def test_generate_schedules_empty():
+    [owner, payment_dates] = generate_schedules([], [], [], datetime.date(2023, 6, 1))
+    assert owner.size == 0
+    assert payment_dates.size == 0
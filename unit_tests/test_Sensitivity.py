@@ -0,0 +1,56 @@
+from SensitivityClasses import KeyRateSensitivity
+from CashFlowClasses import CashFlowMatrix
+from Curves import calibrate_curves
+import numpy as np
+import pytest
+import datetime
+
+
+@pytest.fixture
+def modelling_date() -> datetime.date:
+    return datetime.date(2023, 4, 29)
+
+
+@pytest.fixture
+def curves(modelling_date):
+    m_obs = np.array([1.0, 2.0, 4.0, 5.0, 6.0, 7.0])
+    r_obs = np.array([0.01, 0.02, 0.03, 0.032, 0.035, 0.04])
+    return calibrate_curves({"A": m_obs}, {"A": r_obs}, {"A": 0.042}, 1e-10, 0.0001, modelling_date)["A"]
+
+
+@pytest.fixture
+def cash_flow_matrix(modelling_date) -> CashFlowMatrix:
+    cash_flow_profile = [{datetime.date(2024, 4, 29): 5.0, datetime.date(2028, 4, 29): 105.0},
+                         {datetime.date(2030, 1, 1): 100.0},
+                         {datetime.date(2045, 6, 30): 1000.0}]
+    return CashFlowMatrix.from_profiles(cash_flow_profile, modelling_date)
+
+
+def test_base_value_matches_curve(curves, cash_flow_matrix):
+    result = KeyRateSensitivity(curves).revalue(cash_flow_matrix)
+    zero_rates = lambda t: curves.SWExtrapolate(t, curves.M_Obs, curves.b, curves.ufr, curves.alpha)
+    expected = cash_flow_matrix.present_value(cash_flow_matrix.zero_rates_on_grid(zero_rates))
+    assert result.base_value == pytest.approx(expected, rel=1e-12)
+
+
+def test_matches_bump_and_recalibrate(curves, cash_flow_matrix):
+    sensitivity = KeyRateSensitivity(curves, bump=0.0001)
+    result = sensitivity.revalue(cash_flow_matrix, spread=np.array([0.01, 0.02, 0.0]))
+    assert result.dv01.shape == (6, 3)
+    for key_rate in range(6):
+        bumped_rates = curves.r_Obs.copy()
+        bumped_rates[key_rate] += 0.0001
+        b = curves.SWCalibrate(bumped_rates, curves.M_Obs, curves.ufr, curves.alpha)
+        zero_rates = lambda t: curves.SWExtrapolate(t, curves.M_Obs, b, curves.ufr, curves.alpha)
+        value = cash_flow_matrix.present_value(cash_flow_matrix.zero_rates_on_grid(zero_rates), 1,
+                                               np.array([0.01, 0.02, 0.0]))
+        assert result.bumped_value[key_rate] == pytest.approx(value, rel=1e-12)
+
+
+def test_sensitivities(curves, cash_flow_matrix):
+    result = KeyRateSensitivity(curves, bump=0.001).revalue(cash_flow_matrix)
+    assert (result.total_dv01 < 0).all()
+    # The one year cash flow of the first asset only depends on the one year key rate
+    assert result.dv01[0, 0] < 0
+    assert result.key_rate_duration[:, 1] == pytest.approx(-result.dv01[:, 1] / (0.0001 * result.base_value[1]))
+    assert result.key_rates.tolist() == [1.0, 2.0, 4.0, 5.0, 6.0, 7.0]
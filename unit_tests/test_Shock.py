@@ -0,0 +1,82 @@
+from ShockClasses import CorrelatedShockModel, nace_sector, sector_codes
+from BondClasses import CorpBondArrayPortfolio
+from FrequencyClass import Frequency
+import numpy as np
+import pytest
+import datetime
+
+
+@pytest.fixture
+def bonds() -> CorpBondArrayPortfolio:
+    n_bonds = 400
+    return CorpBondArrayPortfolio(asset_id=np.arange(1, n_bonds + 1), nace=np.tile(["A1.4.5", "B5.2.0", "C10"], 134)[:n_bonds],
+                                  issue_date=[datetime.date(2021, 12, 3)] * n_bonds,
+                                  maturity_date=[datetime.date(2028, 12, 12)] * n_bonds,
+                                  coupon_rate=np.full(n_bonds, 0.03), notional_amount=np.full(n_bonds, 100.0),
+                                  frequency=[Frequency.ANNUAL] * n_bonds, recovery_rate=np.full(n_bonds, 0.4),
+                                  default_probability=np.repeat([0.0, 0.05, 1.0, 0.1], 100),
+                                  market_price=np.full(n_bonds, 94.0))
+
+
+@pytest.fixture
+def model(bonds) -> CorrelatedShockModel:
+    return CorrelatedShockModel.for_portfolio(bonds, ["B5", "C10.1"], drift={"A": 0.05, "B": 0.06, "C": 0.04},
+                                              volatility={"A": 0.2, "B": 0.25, "C": 0.15}, correlation=0.5,
+                                              n_steps=5, seed=7, block_size=16)
+
+
+def test_nace_sector():
+    assert nace_sector(["A1.4.5", " c10", "U"]).tolist() == ["A", "C", "U"]
+    assert sector_codes(["C10", "A1", "C"], ["C", "A"]).tolist() == [0, 1, 0]
+    with pytest.raises(ValueError):
+        sector_codes(["B5"], ["A", "C"])
+
+
+def test_correlation_must_be_positive_definite(bonds):
+    with pytest.raises(ValueError):
+        CorrelatedShockModel(["A", "B"], 0.05, 0.2, np.array([[1.0, 2.0], [2.0, 1.0]]), np.zeros(1, dtype=int),
+                             [0.01], n_steps=1)
+
+
+def test_equity_sectors_must_be_modelled(bonds):
+    with pytest.raises(ValueError):
+        CorrelatedShockModel.for_portfolio(bonds, ["D35"], drift={"A": 0.05, "B": 0.06, "C": 0.04},
+                                           volatility={"A": 0.2, "B": 0.25, "C": 0.15}, correlation=0.5, n_steps=5)
+
+
+def test_defaults(model, bonds):
+    chunk = model.simulate(0, 200)
+    assert chunk.default_step.shape == (200, 400)
+    assert (chunk.default_step[:, :100] == 5).all()  # Default probability 0 never defaults
+    assert (chunk.default_step[:, 200:300] == 0).all()  # Default probability 1 defaults in the first step
+    first_step_rate = (chunk.default_step[:, 300:] == 0).mean()
+    assert first_step_rate == pytest.approx(0.1, abs=0.03)
+    assert chunk.survived(1)[:, 200:300].sum() == 0
+    recovery = chunk.recovery_amount(1, bonds.recovery_rate, bonds.notional_amount)
+    assert (recovery[:, 200:300] == 40.0).all()
+    assert (recovery[:, :100] == 0.0).all()
+
+
+def test_equity_index(model):
+    chunk = model.simulate(0, 2000)
+    assert (chunk.index_level[:, 0] == 1).all()
+    log_return = np.log(chunk.index_level[:, 1])
+    assert np.corrcoef(log_return.transpose())[0, 1] == pytest.approx(0.5, abs=0.06)
+    assert log_return.std(axis=0) == pytest.approx([0.2, 0.25, 0.15], rel=0.06)
+    values = chunk.equity_values(2, np.array([1, 2, 1]), np.array([94.0, 92.0, 10.0]))
+    assert values.shape == (2000, 3)
+    assert values[:, 0] == pytest.approx(94.0 * chunk.index_level[:, 2, 1])
+
+
+def test_scenarios_do_not_depend_on_chunks(model):
+    everything = model.simulate(0, 50)
+    chunks = list(model.generate(50, chunk_size=20))
+    assert np.array_equal(np.concatenate([chunk.default_step for chunk in chunks]), everything.default_step)
+    assert np.array_equal(model.simulate(17, 35).index_level, everything.index_level[17:35])
+
+
+def test_period_growth(model):
+    chunk = model.simulate(0, 10)
+    growth = chunk.period_growth(np.array([2, 0]))
+    assert growth.shape == (10, 5, 2)
+    assert np.cumprod(growth, axis=1)[:, -1, 0] == pytest.approx(chunk.index_level[:, -1, 2])
@@ -0,0 +1,70 @@
+from SyntheticPortfolioClasses import BOND_COLUMNS, EQUITY_COLUMNS, read_seed_file, generate_bonds, write_portfolio
+from ImportData import get_corporate_bonds, get_EquityShare, get_Liability
+from benchmark import BASELINE, STAGES, compare, main
+from datetime import date
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+MODELLING_DATE = date(2021, 12, 31)
+
+
+@pytest.fixture
+def nace_codes():
+    return read_seed_file("Input/NACE_Generated.csv")
+
+
+@pytest.fixture
+def maturities():
+    return read_seed_file("Input/Maturity_Generated.csv")
+
+
+def test_generation_is_reproducible(tmp_path, nace_codes, maturities):
+    first = write_portfolio(str(tmp_path / "first"), 500, nace_codes, maturities, MODELLING_DATE, 10, seed=7)
+    second = write_portfolio(str(tmp_path / "second"), 500, nace_codes, maturities, MODELLING_DATE, 10, seed=7)
+    other = write_portfolio(str(tmp_path / "other"), 500, nace_codes, maturities, MODELLING_DATE, 10, seed=8)
+    for book in ["bonds", "equities", "liabilities"]:
+        pd.testing.assert_frame_equal(pd.read_csv(first[book]), pd.read_csv(second[book]))
+    assert not pd.read_csv(first["bonds"]).equals(pd.read_csv(other["bonds"]))
+
+
+def test_bonds_have_not_matured(nace_codes, maturities):
+    bonds = generate_bonds(1000, nace_codes, maturities, MODELLING_DATE, np.random.SeedSequence(1))
+    assert list(bonds.columns) == BOND_COLUMNS
+    issue = pd.to_datetime(bonds["Issue_Date"], format="%d/%m/%Y")
+    maturity = pd.to_datetime(bonds["Maturity_Date"], format="%d/%m/%Y")
+    assert (issue <= pd.Timestamp(MODELLING_DATE)).all()
+    assert (maturity > pd.Timestamp(MODELLING_DATE)).all()
+    assert set(bonds["NACE"]) <= set(str(code) for code in nace_codes)
+
+
+def test_generated_files_can_be_imported(tmp_path, nace_codes, maturities):
+    paths = write_portfolio(str(tmp_path), 1000, nace_codes, maturities, MODELLING_DATE, 10, seed=1)
+    assert len(list(get_corporate_bonds(paths["bonds"]))) == 1000
+    equities = list(get_EquityShare(paths["equities"]))
+    assert len(equities) == 10
+    assert list(pd.read_csv(paths["equities"]).columns) == EQUITY_COLUMNS
+    liabilities = get_Liability(paths["liabilities"])
+    assert len(liabilities.cash_flow_dates) == 12
+
+
+def test_compare_flags_regressions():
+    baseline = {"sizes": {"1000": {"import": 1.0, "pricing": 0.01, "projection": 1.0}}}
+    results = {"sizes": {"1000": {"import": 1.5, "pricing": 0.03, "projection": 1.1, "generate": 0.2}}}
+    rows = {row[1]: row for row in compare(results, baseline, tolerance=0.25, min_seconds=0.05)}
+    assert set(rows) == {"import", "pricing", "projection"}  # No baseline for generate
+    assert rows["import"][5]
+    assert rows["import"][4] == pytest.approx(1.5)
+    assert not rows["pricing"][5]  # Three times slower, but below min_seconds
+    assert not rows["projection"][5]
+
+
+def test_committed_baseline_covers_default_sizes(tmp_path):
+    with open(BASELINE, mode="r", encoding="utf-8") as json_file:
+        baseline = json.load(json_file)
+    assert set(baseline["sizes"]) == {"1000", "100000", "1000000"}
+    output = str(tmp_path / "benchmark.json")
+    assert main(["--sizes", "1000", "--output", output, "--tolerance", "1000"]) == 0
+    with open(output, mode="r", encoding="utf-8") as json_file:
+        assert list(json.load(json_file)["sizes"]["1000"]) == STAGES
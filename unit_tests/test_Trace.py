@@ -0,0 +1,73 @@
+from TraceClass import Trace
+import json
+
+PORTFOLIO = __name__ + ".Portfolio."
+
+
+class Portfolio:
+    tracer = Trace()
+
+    @tracer
+    def value(self, prices):
+        return sum(self.price(price) for price in prices)
+
+    @tracer
+    def price(self, price):
+        return price
+
+
+def test_disabled_tracer_returns_function():
+    tracer = Trace()
+
+    def value():
+        return 1
+
+    assert tracer(value) is value
+
+
+def test_configure_replaces_methods():
+    tracer = Portfolio.tracer
+    original = Portfolio.value
+    tracer.enabled = True
+    try:
+        assert Portfolio.value is not original
+        assert Portfolio().value([1.0, 2.0, 3.0]) == 6.0
+        stats = tracer.stats[PORTFOLIO + "value"]
+        assert stats.calls == 1
+        assert tracer.stats[PORTFOLIO + "price"].calls == 3
+        assert stats.total_time >= stats.self_time >= 0
+        assert stats.total_time >= tracer.stats[PORTFOLIO + "price"].total_time
+    finally:
+        tracer.enabled = False
+    assert Portfolio.value is original
+    Portfolio().value([1.0])
+    assert tracer.stats[PORTFOLIO + "value"].calls == 1
+
+
+def test_decorated_while_enabled():
+    tracer = Trace(enabled=True)
+
+    @tracer
+    def double(x):
+        return 2 * x
+
+    assert double(2) == 4
+    assert tracer.stats[Trace._key(double.__wrapped__)].calls == 1
+
+
+def test_summary_and_json(tmp_path):
+    tracer = Portfolio.tracer
+    tracer.reset()
+    tracer.enabled = True
+    try:
+        Portfolio().value([1.0, 2.0])
+    finally:
+        tracer.enabled = False
+    assert [stats.name for stats in tracer.sorted_stats("calls")] == [PORTFOLIO + "price",
+                                                                      PORTFOLIO + "value"]
+    assert PORTFOLIO + "price" in tracer.summary()
+    tracer.to_json(str(tmp_path / "trace.json"))
+    with open(tmp_path / "trace.json") as json_file:
+        stats = json.load(json_file)
+    assert {row["name"]: row["calls"] for row in stats} == {PORTFOLIO + "price": 2,
+                                                            PORTFOLIO + "value": 1}